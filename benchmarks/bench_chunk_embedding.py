@@ -0,0 +1,110 @@
+"""
+Tokens and time per diff: the old embedding input (the Python repr of the
+whole chunk list, sent as one text) vs per-chunk embeddings pooled into one
+vector.
+
+Diffs come from a repository's history, read with the same iter_commits as
+ingestion. Without --live, only chunking is timed and tokens are estimated
+locally. With --live (needs VOYAGEAI_API_KEY), both inputs are embedded with
+Voyage, and tokens are counted with the provider tokenizer.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chunk_embedding --repo . --max-diffs 300 [--live]
+"""
+import os
+import time
+import argparse
+import itertools
+import statistics
+from typing import Callable, List
+
+from chonkie import TokenChunker
+
+from benchmarks.bench_helix_search import percentile
+from src.kite_exclusive.commit_splitter.ingest import iter_commits
+from src.kite_exclusive.commit_splitter.services.voyage_service import (
+    CHUNK_CHARS,
+    MAX_TEXT_TOKENS,
+    chunk_diff,
+    embed_chunks,
+    embed_texts,
+)
+
+
+def legacy_text(code: str) -> str:
+    """What embed_code used to send: the repr of the chunk objects."""
+    return f"{TokenChunker(chunk_size=CHUNK_CHARS).chunk(code)}"
+
+
+def token_counter(live: bool) -> Callable[[List[str]], List[int]]:
+    if not live:
+        # Same ~3 chars/token estimate as the batch packer, without its cap
+        return lambda texts: [len(t) // 3 + 1 for t in texts]
+    import voyageai
+    from helix.embedding.voyageai_client import DEFAULT_MODEL
+
+    client = voyageai.Client(api_key=os.getenv("VOYAGEAI_API_KEY"))
+    return lambda texts: [client.count_tokens([t], model=DEFAULT_MODEL) for t in texts]
+
+
+def _summary(label: str, values: List[float], unit: str) -> None:
+    print(
+        f"{label:<28} mean {statistics.fmean(values):10.1f}  p50 {percentile(values, 50):10.1f}  "
+        f"p99 {percentile(values, 99):10.1f}  max {max(values):10.1f} {unit}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--rev", default="HEAD")
+    parser.add_argument("--max-diffs", type=int, default=300)
+    parser.add_argument("--live", action="store_true", help="embed with Voyage and count real tokens")
+    args = parser.parse_args()
+
+    diffs = list(
+        itertools.islice(
+            ((d.text, d.path) for c in iter_commits(args.repo, args.rev) for d in c.diffs),
+            args.max_diffs,
+        )
+    )
+    count_tokens = token_counter(args.live)
+    print(f"{len(diffs)} diffs from {args.repo} ({'live' if args.live else 'estimated tokens'})")
+
+    legacy_tokens, chunked_tokens, chunk_counts = [], [], []
+    legacy_ms, chunked_ms = [], []
+    truncated = 0
+    for text, path in diffs:
+        start = time.perf_counter()
+        old = legacy_text(text)
+        if args.live:
+            embed_texts([old])
+        legacy_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        chunks = chunk_diff(text, path)
+        if args.live:
+            embed_chunks([(path, chunks)])
+        chunked_ms.append((time.perf_counter() - start) * 1000)
+
+        (old_tokens,) = count_tokens([old])
+        truncated += old_tokens > MAX_TEXT_TOKENS
+        # The provider only reads the first MAX_TEXT_TOKENS of a text
+        legacy_tokens.append(min(old_tokens, MAX_TEXT_TOKENS))
+        chunked_tokens.append(sum(count_tokens(chunks)))
+        chunk_counts.append(len(chunks))
+
+    _summary("legacy tokens/diff", legacy_tokens, "tok")
+    _summary("chunked tokens/diff", chunked_tokens, "tok")
+    _summary("chunks/diff", chunk_counts, "")
+    _summary("legacy time/diff", legacy_ms, "ms")
+    _summary("chunked time/diff", chunked_ms, "ms")
+    print(f"legacy inputs over the {MAX_TEXT_TOKENS}-token cap: {truncated}/{len(diffs)}")
+    print(
+        f"total tokens: legacy {sum(legacy_tokens)}, chunked {sum(chunked_tokens)} "
+        f"({sum(chunked_tokens) / max(sum(legacy_tokens), 1):.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Chunking throughput in MB/s over real diffs: chunkers built per diff (the old
+embed_code path, which also retried a failing code parser on every diff) vs
+voyage_service.chunk_diff with cached chunkers and the known-bad language memo.
+
+Diffs come from a repository's history, read with the same iter_commits as
+ingestion.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_chunking --repo . --max-diffs 500 --rounds 3
+"""
+import time
+import argparse
+import itertools
+from typing import Callable, List, Optional, Tuple
+
+from chonkie import CodeChunker, TokenChunker
+
+from src.kite_exclusive.commit_splitter.ingest import iter_commits
+from src.kite_exclusive.commit_splitter.languages import language_for_path
+from src.kite_exclusive.commit_splitter.services.voyage_service import CHUNK_CHARS, chunk_diff
+
+
+def chunk_uncached(code: str, file_path: Optional[str]) -> List[str]:
+    language = language_for_path(file_path)
+    chunks = None
+    if language:
+        try:
+            chunks = CodeChunker(language=language, chunk_size=CHUNK_CHARS).chunk(code)
+        except Exception:
+            chunks = None
+    if chunks is None:
+        chunks = TokenChunker(chunk_size=CHUNK_CHARS).chunk(code)
+    return [chunk.text for chunk in chunks]
+
+
+def throughput(
+    label: str,
+    fn: Callable[[str, Optional[str]], List[str]],
+    diffs: List[Tuple[str, str]],
+    rounds: int,
+) -> float:
+    size = sum(len(text.encode("utf-8")) for text, _ in diffs) * rounds
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text, path in diffs:
+            fn(text, path)
+    elapsed = time.perf_counter() - start
+    rate = size / elapsed / 1e6 if elapsed else 0.0
+    print(f"{label:<10} {rate:10.2f} MB/s  ({size / 1e6:.2f} MB in {elapsed:.2f} s)")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--rev", default="HEAD")
+    parser.add_argument("--max-diffs", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    diffs = list(
+        itertools.islice(
+            ((d.text, d.path) for c in iter_commits(args.repo, args.rev) for d in c.diffs),
+            args.max_diffs,
+        )
+    )
+    code = sum(1 for _, path in diffs if language_for_path(path))
+    print(f"{len(diffs)} diffs ({code} in a code-chunker language)")
+
+    uncached = throughput("uncached", chunk_uncached, diffs, args.rounds)
+    cached = throughput("cached", chunk_diff, diffs, args.rounds)
+    print(f"{'speedup':<10} {cached / uncached if uncached else 0.0:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
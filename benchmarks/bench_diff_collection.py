@@ -0,0 +1,104 @@
+"""
+Compare per-file diff collection (the old split_commit loop) with the single-pass
+collector in git_diff.collect_file_diffs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_diff_collection --files 500
+"""
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict
+
+from src.kite_exclusive.commit_splitter.git_diff import collect_file_diffs
+
+
+def _git(args, cwd):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def make_repo(root: str, n_files: int) -> None:
+    """Create a repo with n_files tracked files, then change all of them."""
+    _git(["init", "-q"], root)
+    _git(["config", "user.email", "bench@example.com"], root)
+    _git(["config", "user.name", "bench"], root)
+    for i in range(n_files):
+        path = os.path.join(root, f"pkg{i % 20}", f"module_{i}.py")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("".join(f"def fn_{j}():\n    return {j}\n\n" for j in range(40)))
+    _git(["add", "-A"], root)
+    _git(["commit", "-q", "-m", "initial"], root)
+
+    for i in range(n_files):
+        path = os.path.join(root, f"pkg{i % 20}", f"module_{i}.py")
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"\ndef added_{i}():\n    return {i}\n")
+    # Stage half of the changes so both diff sources are exercised
+    staged = [f"pkg{i % 20}/module_{i}.py" for i in range(0, n_files, 2)]
+    _git(["add", "--", *staged], root)
+
+
+async def _run(args, cwd) -> subprocess.CompletedProcess:
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    out, err = await process.communicate()
+    return subprocess.CompletedProcess(args, process.returncode, out.decode(), err.decode())
+
+
+async def collect_per_file(root: str) -> Dict[str, str]:
+    """The pre-batching approach: name listings, then 1-2 `git diff` calls per path."""
+    changed = set()
+    for args in (
+        ["git", "diff", "--cached", "--name-only"],
+        ["git", "diff", "--name-only"],
+        ["git", "ls-files", "--others", "--exclude-standard"],
+    ):
+        p = await _run(args, root)
+        changed.update(line.strip() for line in p.stdout.splitlines() if line.strip())
+
+    file_to_diff: Dict[str, str] = {}
+    for path in changed:
+        p = await _run(["git", "diff", "--cached", "--", path], root)
+        if p.returncode == 0 and p.stdout.strip():
+            file_to_diff[path] = p.stdout
+            continue
+        p = await _run(["git", "diff", "--", path], root)
+        if p.returncode == 0 and p.stdout.strip():
+            file_to_diff[path] = p.stdout
+    return file_to_diff
+
+
+def _time(label: str, fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = asyncio.run(fn())
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<12} {best * 1000:9.1f} ms  ({len(result)} files)")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        make_repo(root, args.files)
+        old = _time("per-file", lambda: collect_per_file(root), args.repeat)
+        new = _time("single-pass", lambda: collect_file_diffs(root), args.repeat)
+        print(f"speedup      {old / new:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
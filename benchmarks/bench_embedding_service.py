@@ -0,0 +1,102 @@
+"""
+Throughput of embedding many small concurrent requests: one provider call per
+request (the old embed_file_diffs path, with a hard timeout and no retry) vs
+the micro-batching EmbeddingService.
+
+The provider is simulated: each call takes --latency-ms plus a small per-text
+cost, and calls beyond --rpm in a rolling minute fail with a 429, like the
+real API. Failed requests are counted, not retried, on the direct path.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_embedding_service --requests 400 --texts 3 --rpm 300
+"""
+import time
+import asyncio
+import argparse
+import threading
+import collections
+from typing import List
+
+from src.kite_exclusive.commit_splitter.services.embedding_service import EmbeddingService
+
+
+class RateLimitError(Exception):
+    http_status = 429
+
+
+class FakeProvider:
+    def __init__(self, rpm: int, latency_s: float, dim: int = 8):
+        self.rpm = rpm
+        self.latency_s = latency_s
+        self.dim = dim
+        self.calls = 0
+        self.rejected = 0
+        self._sent: collections.deque = collections.deque()
+        self._lock = threading.Lock()
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            now = time.monotonic()
+            while self._sent and now - self._sent[0] > 60:
+                self._sent.popleft()
+            self.calls += 1
+            if len(self._sent) >= self.rpm:
+                self.rejected += 1
+                raise RateLimitError("rate limit exceeded")
+            self._sent.append(now)
+        time.sleep(self.latency_s + 0.0001 * len(texts))
+        return [[float(len(t))] * self.dim for t in texts]
+
+
+async def direct(provider: FakeProvider, requests: List[List[str]], concurrency: int) -> int:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(texts: List[str]) -> bool:
+        async with limit:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(provider, texts), timeout=30)
+                return True
+            except Exception:
+                return False
+
+    return sum(await asyncio.gather(*(one(texts) for texts in requests)))
+
+
+async def batched(service: EmbeddingService, requests: List[List[str]]) -> int:
+    results = await asyncio.gather(*(service.embed(texts) for texts in requests), return_exceptions=True)
+    return sum(not isinstance(r, BaseException) for r in results)
+
+
+def run(label: str, coro, provider: FakeProvider, total: int) -> None:
+    start = time.perf_counter()
+    ok = asyncio.run(coro)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<8} {ok}/{total} ok in {elapsed:6.2f} s ({ok / elapsed:8.1f} req/s)  "
+        f"provider calls {provider.calls}, 429s {provider.rejected}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--texts", type=int, default=3, help="texts per request")
+    parser.add_argument("--rpm", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    requests = [[f"def f{i}_{j}(): pass" for j in range(args.texts)] for i in range(args.requests)]
+    total = len(requests)
+
+    provider = FakeProvider(args.rpm, args.latency_ms / 1000)
+    run("direct", direct(provider, requests, args.concurrency), provider, total)
+
+    provider = FakeProvider(args.rpm, args.latency_ms / 1000)
+    service = EmbeddingService(provider, rpm=args.rpm, concurrency=args.concurrency)
+    run("service", batched(service, requests), provider, total)
+    print(f"service stats: {service.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Compare single-row inserts (createCommit / createFile / createDiff, one request
+per row) with the batched createCommitsBatch / createFilesBatch /
+createDiffsBatch queries, in rows/s.
+
+Needs a local Helix instance with the queries in db/ deployed, e.g.
+`helix push dev`; the port is read from helix.toml [local.dev]. Every run
+inserts fresh synthetic rows under a new repository id.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_helix_insert --rows 2000 --dim 1024
+"""
+import time
+import uuid
+import random
+import tomllib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import helix
+
+from src.kite_exclusive.commit_splitter.services.helix_service import (
+    MAX_BATCH_BYTES,
+    MAX_BATCH_ROWS,
+    insert_batch,
+    iter_row_batches,
+)
+
+
+def local_port(config_path: str = "helix.toml", instance: str = "dev") -> int:
+    with open(config_path, "rb") as f:
+        config = tomllib.load(f)
+    return int(config.get("local", {}).get(instance, {}).get("port", 6969))
+
+
+def make_rows(run_id: str, n: int, dim: int) -> Dict[str, List[Dict[str, Any]]]:
+    rng = random.Random(0)
+    branch_id = f"{run_id}:main"
+    commits = [
+        {
+            "branch_id": branch_id,
+            "commit_id": f"{run_id}-c{i}",
+            "short_id": f"c{i}",
+            "author": "bench <bench@example.com>",
+            "message": f"feat: add module {i}\n\nSynthetic benchmark commit.",
+            "committed_at": "2024-01-01T00:00:00Z",
+            "is_merge": False,
+        }
+        for i in range(n)
+    ]
+    files = [
+        {"file_id": f"{run_id}:src/module_{i}.py", "path": f"src/module_{i}.py", "language": "python"}
+        for i in range(n)
+    ]
+    diffs = [
+        {
+            "repo_id": run_id,
+            "commit_id": f"{run_id}-c{i}",
+            "commit_message": f"feat: add module {i}",
+            "file_id": f"{run_id}:src/module_{i}.py",
+            "file_path": f"src/module_{i}.py",
+            "diff_id": f"{run_id}-c{i}:src/module_{i}.py",
+            "kind": "modified",
+            "additions": 3,
+            "deletions": 1,
+            "summary": f"@@ -1,3 +1,5 @@\n+def added_{i}():\n+    return {i}\n",
+            "vec": [rng.uniform(-1, 1) for _ in range(dim)],
+        }
+        for i in range(n)
+    ]
+    return {"commits": commits, "files": files, "diffs": diffs}
+
+
+def setup(db: helix.Client, run_id: str, label: str) -> None:
+    db.query("createRepository", {"repo_id": run_id, "name": f"bench-{label}"})
+    db.query("createBranch", {"repo_id": run_id, "branch_id": f"{run_id}:main", "name": "main"})
+
+
+def insert_single(db: helix.Client, query: str, rows: List[Dict[str, Any]], workers: int) -> int:
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(pool.map(lambda row: db.query(query, row), rows))
+    return sum(1 for r in results if not r or r[0] is None)
+
+
+def insert_batched(
+    db: helix.Client,
+    query: str,
+    key: str,
+    rows: List[Dict[str, Any]],
+    workers: int,
+    max_rows: int,
+    max_bytes: int,
+) -> int:
+    batches = list(iter_row_batches(rows, max_rows, max_bytes))
+    with ThreadPoolExecutor(workers) as pool:
+        statuses = list(pool.map(lambda batch: insert_batch(db, query, key, batch), batches))
+    if 404 in statuses:
+        raise RuntimeError(f"{query} is not deployed; push the queries in db/ first")
+    return sum(len(batch) for batch, status in zip(batches, statuses) if status != 200)
+
+
+def _time(label: str, fn, n: int) -> float:
+    start = time.perf_counter()
+    failed = fn()
+    elapsed = time.perf_counter() - start
+    rate = n / elapsed if elapsed else 0.0
+    print(f"{label:<24} {rate:10.1f} rows/s  ({n} rows, {failed} failed, {elapsed:.2f} s)")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimension")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent requests")
+    parser.add_argument("--batch-rows", type=int, default=MAX_BATCH_ROWS)
+    parser.add_argument("--batch-bytes", type=int, default=MAX_BATCH_BYTES)
+    parser.add_argument("--port", type=int, default=None, help="default: helix.toml [local.dev]")
+    args = parser.parse_args()
+
+    db = helix.Client(local=True, port=args.port or local_port(), verbose=False)
+
+    single_id, batch_id = f"bench-{uuid.uuid4().hex[:8]}", f"bench-{uuid.uuid4().hex[:8]}"
+    single_rows = make_rows(single_id, args.rows, args.dim)
+    batch_rows = make_rows(batch_id, args.rows, args.dim)
+    setup(db, single_id, "single")
+    setup(db, batch_id, "batched")
+
+    for single_query, batch_query, key in (
+        ("createCommit", "createCommitsBatch", "commits"),
+        ("createFile", "createFilesBatch", "files"),
+        ("createDiff", "createDiffsBatch", "diffs"),
+    ):
+        single = _time(
+            f"{single_query}",
+            lambda: insert_single(db, single_query, single_rows[key], args.workers),
+            args.rows,
+        )
+        batched = _time(
+            f"{batch_query}",
+            lambda: insert_batched(
+                db, batch_query, key, batch_rows[key], args.workers, args.batch_rows, args.batch_bytes
+            ),
+            args.rows,
+        )
+        print(f"{'speedup':<24} {batched / single if single else 0.0:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
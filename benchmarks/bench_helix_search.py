@@ -0,0 +1,98 @@
+"""
+Compare p50/p99 latency of the traversal-based similarity query
+(getSimilarDiffsByVector: vector -> Diff -> Commit -> File per hit) with the
+lean getSimilarDiffsLean, which reads the denormalized fields stored on the
+vector itself.
+
+Needs a local Helix instance with the queries in db/ deployed, e.g.
+`helix push dev`; the port is read from helix.toml [local.dev]. The run first
+loads --rows synthetic diffs under a new repository id, then issues the same
+random query vectors against both queries.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_helix_search --rows 5000 --queries 500 --k 8
+"""
+import math
+import time
+import uuid
+import random
+import argparse
+import statistics
+from typing import Any, Dict, List
+
+import helix
+
+from benchmarks.bench_helix_insert import insert_batched, local_port, make_rows, setup
+from src.kite_exclusive.commit_splitter.services.helix_service import (
+    MAX_BATCH_BYTES,
+    MAX_BATCH_ROWS,
+)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of samples."""
+    ordered = sorted(samples)
+    rank = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def time_query(db: helix.Client, query: str, payloads: List[Dict[str, Any]]) -> List[float]:
+    """Latency in ms of each request, issued one at a time."""
+    latencies = []
+    for payload in payloads:
+        start = time.perf_counter()
+        db.query(query, payload)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def _report(label: str, latencies: List[float]) -> float:
+    p50, p99 = percentile(latencies, 50), percentile(latencies, 99)
+    print(
+        f"{label:<28} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+        f"mean {statistics.fmean(latencies):8.2f} ms  ({len(latencies)} queries)"
+    )
+    return p50
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000, help="diffs to load before querying")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--dim", type=int, default=1024, help="embedding dimension")
+    parser.add_argument("--warmup", type=int, default=20, help="untimed queries per variant")
+    parser.add_argument("--port", type=int, default=None, help="default: helix.toml [local.dev]")
+    args = parser.parse_args()
+
+    db = helix.Client(local=True, port=args.port or local_port(), verbose=False)
+
+    run_id = f"bench-{uuid.uuid4().hex[:8]}"
+    rows = make_rows(run_id, args.rows, args.dim)
+    setup(db, run_id, "search")
+    for query, key in (
+        ("createCommitsBatch", "commits"),
+        ("createFilesBatch", "files"),
+        ("createDiffsBatch", "diffs"),
+    ):
+        failed = insert_batched(db, query, key, rows[key], 8, MAX_BATCH_ROWS, MAX_BATCH_BYTES)
+        if failed:
+            print(f"{query}: {failed} rows failed to load")
+
+    rng = random.Random(1)
+    payloads = [
+        {"vec": [rng.uniform(-1, 1) for _ in range(args.dim)], "k": args.k}
+        for _ in range(args.queries + args.warmup)
+    ]
+    warmup, timed = payloads[: args.warmup], payloads[args.warmup :]
+
+    results = {}
+    for query in ("getSimilarDiffsByVector", "getSimilarDiffsLean"):
+        time_query(db, query, warmup)
+        results[query] = _report(query, time_query(db, query, timed))
+    traversal, lean = results["getSimilarDiffsByVector"], results["getSimilarDiffsLean"]
+    print(f"{'p50 speedup':<28} {traversal / lean if lean else 0.0:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Throughput and 429s of Cerebras chat() under a burst: no admission control,
+a limit fixed at the stub's real capacity (the best case, which a client
+cannot know in advance), and the adaptive limiter discovering it.
+
+Runs the real Cerebras SDK against a local stub server that serves at most
+--capacity requests at once and answers the rest with 429 and a Retry-After
+of --retry-after-ms, like a provider enforcing a concurrency limit. Both modes
+retry 429s the same way (GLIDE_LLM_MAX_RETRIES); only the admission control
+differs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_concurrency --requests 400 --capacity 8
+"""
+import json
+import time
+import asyncio
+import argparse
+from typing import List
+
+from cerebras.cloud.sdk import AsyncCerebras
+
+import src.core.LLM.cerebras_inference as cerebras_inference
+from benchmarks.bench_helix_search import percentile
+from benchmarks.bench_streaming_completion import StubServer, reply_tokens
+from src.core.LLM.concurrency import AdaptiveLimiter
+
+
+class LimitedStub(StubServer):
+    """StubServer that rejects requests beyond `capacity` in flight with 429 + Retry-After."""
+
+    def __init__(self, tokens: List[str], token_s: float, capacity: int, retry_after_s: float):
+        super().__init__(tokens, token_s)
+        self.capacity = capacity
+        self.retry_after_s = retry_after_s
+        self.active = 0
+        self.rejected = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.active < self.capacity:
+            self.active += 1
+            try:
+                await super().handle(reader, writer)
+            finally:
+                self.active -= 1
+            return
+        self.rejected += 1
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            for line in head.decode("latin-1").split("\r\n"):
+                if line.lower().startswith("content-length:"):
+                    await reader.readexactly(int(line.split(":", 1)[1]))
+            payload = json.dumps({"error": {"message": "rate limited", "type": "too_many_requests"}}).encode()
+            writer.write(
+                b"HTTP/1.1 429 Too Many Requests\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                + f"Retry-After-Ms: {int(self.retry_after_s * 1000)}\r\n".encode()
+                + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                + payload
+            )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def run_mode(label: str, stub: LimitedStub, limiter: AdaptiveLimiter, requests: int) -> None:
+    cerebras_inference._limiter = limiter
+    stub.rejected = 0
+    latencies: List[float] = []
+    failures = 0
+
+    async def one(i: int) -> None:
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            await cerebras_inference.complete(f"diff {i}", temperature=0.0, cache=False)
+        except Exception:
+            failures += 1
+            return
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stats = limiter.stats()
+    p50, p95 = (percentile(latencies, 50), percentile(latencies, 95)) if latencies else (0.0, 0.0)
+    print(
+        f"{label:<10} {len(latencies) / elapsed:7.1f} req/s  failed {failures:4d}  429s {stub.rejected:5d}  "
+        f"p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  limit {stats['limit']:5.1f}  "
+        f"peak {stats['peak_in_flight']:4d}  queue wait avg {stats['wait_s_avg'] * 1000:7.1f} ms"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    stub = LimitedStub(reply_tokens(20), args.token_ms / 1000, args.capacity, args.retry_after_ms / 1000)
+    listener = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    cerebras_inference._async_client = AsyncCerebras(
+        api_key="stub", base_url=f"http://127.0.0.1:{port}", warm_tcp_connection=False, max_retries=0
+    )
+    print(f"{args.requests} requests at once, stub capacity {args.capacity}, Retry-After {args.retry_after_ms} ms")
+
+    unlimited, capacity = args.requests + 1, args.capacity
+    limiters = (
+        ("unlimited", AdaptiveLimiter(unlimited, min_limit=unlimited, max_limit=unlimited)),
+        ("fixed", AdaptiveLimiter(capacity, min_limit=capacity, max_limit=capacity)),
+        ("adaptive", AdaptiveLimiter()),
+    )
+    for label, limiter in limiters:
+        await run_mode(label, stub, limiter, args.requests)
+    listener.close()
+    await listener.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--capacity", type=int, default=8, help="concurrent requests the stub serves")
+    parser.add_argument("--token-ms", type=float, default=2.0, help="per reply token; 20 tokens per reply")
+    parser.add_argument("--retry-after-ms", type=float, default=200.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Tail latency of the LLM router with and without hedged requests, against
+local stub servers speaking the OpenAI chat completions API.
+
+The primary stub answers in --fast-ms, except for --slow-fraction of requests
+that stall for --slow-ms first (a heavy tail, like a provider under load). The
+secondary stub always answers in --backup-ms. With hedging, once the primary
+has taken longer than its rolling p95, a second request goes to the
+secondary and the first answer wins.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_llm_router --requests 300 --slow-fraction 0.04
+"""
+import time
+import random
+import asyncio
+import argparse
+from typing import List
+
+from benchmarks.bench_helix_search import percentile
+from benchmarks.bench_streaming_completion import StubServer, reply_tokens
+from src.core.LLM.cerebras_inference import first_line
+from src.core.LLM.router import LLMRouter, OpenAICompatibleProvider
+
+
+class DelayedStub(StubServer):
+    """StubServer that waits before answering: `slow_s` with probability `slow_fraction`, else `fast_s`."""
+
+    def __init__(self, tokens: List[str], fast_s: float, slow_s: float = 0.0, slow_fraction: float = 0.0):
+        super().__init__(tokens, token_s=0.0)
+        self.fast_s = fast_s
+        self.slow_s = slow_s
+        self.slow_fraction = slow_fraction
+        self.rng = random.Random(0)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        slow = self.rng.random() < self.slow_fraction
+        await asyncio.sleep(self.slow_s if slow else self.fast_s)
+        try:
+            await super().handle(reader, writer)
+        except asyncio.IncompleteReadError:
+            # The router cancelled this request before it was read
+            writer.close()
+
+
+async def serve(stub: StubServer) -> str:
+    listener = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+    return f"http://127.0.0.1:{listener.sockets[0].getsockname()[1]}/v1"
+
+
+async def run_mode(label: str, router: LLMRouter, requests: int, concurrency: int) -> None:
+    latencies: List[float] = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with limit:
+            start = time.perf_counter()
+            await router.complete(f"diff {i}", temperature=0.0, until=first_line, cache=False)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    stats = router.stats()
+    print(
+        f"{label:<10} p50 {percentile(latencies, 50):7.1f} ms  p95 {percentile(latencies, 95):7.1f} ms  "
+        f"p99 {percentile(latencies, 99):7.1f} ms  max {max(latencies):7.1f} ms  "
+        f"hedged {stats['hedged']}  hedge wins {stats['hedge_wins']}"
+    )
+
+
+async def run(args: argparse.Namespace) -> None:
+    tokens = reply_tokens(20)
+    primary_url = await serve(
+        DelayedStub(tokens, args.fast_ms / 1000, args.slow_ms / 1000, args.slow_fraction)
+    )
+    backup_url = await serve(DelayedStub(tokens, args.backup_ms / 1000))
+
+    for label, hedge in (("primary", False), ("hedged", True)):
+        router = LLMRouter(
+            [
+                OpenAICompatibleProvider("stub-primary", base_url=primary_url),
+                OpenAICompatibleProvider("stub-backup", base_url=backup_url),
+            ],
+            hedge=hedge,
+        )
+        await run_mode(label, router, args.requests, args.concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fast-ms", type=float, default=40.0)
+    parser.add_argument("--slow-ms", type=float, default=1500.0)
+    parser.add_argument("--slow-fraction", type=float, default=0.04)
+    parser.add_argument("--backup-ms", type=float, default=120.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Throughput and a rough quality check of the offline HashingEmbedder
+(GLIDE_EMBED_BACKEND=local), on one core and with no network.
+
+Diffs come from a repository's history, read with the same iter_commits as
+ingestion, and are chunked with voyage_service.chunk_diff the way the pipeline
+embeds them. Throughput is measured cold (empty token memo) and warm. As a
+sanity check of the vectors, it reports how often a diff's nearest neighbour
+(by pooled vector, excluding itself) touches the same file.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_local_embedder --repo . --max-diffs 2000 [--idf]
+"""
+import time
+import argparse
+import itertools
+from typing import List
+
+import numpy as np
+
+from src.kite_exclusive.commit_splitter.ingest import iter_commits
+from src.kite_exclusive.commit_splitter.services.local_embedder import DEFAULT_DIMENSIONS, HashingEmbedder
+from src.kite_exclusive.commit_splitter.services.voyage_service import chunk_diff, pool_vectors
+
+
+def throughput(label: str, embedder: HashingEmbedder, texts: List[str], batch: int) -> None:
+    size = sum(len(t.encode("utf-8")) for t in texts)
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        embedder.embed_batch(texts[i : i + batch])
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<6} {len(texts) / elapsed:10.0f} chunks/s  {size / elapsed / 1e6:6.2f} MB/s  "
+        f"({len(texts)} chunks in {elapsed:.2f} s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--rev", default="HEAD")
+    parser.add_argument("--max-diffs", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=DEFAULT_DIMENSIONS)
+    parser.add_argument("--batch", type=int, default=256, help="chunks per embed_batch call")
+    parser.add_argument("--idf", action="store_true", help="fit IDF weights on the same diffs first")
+    args = parser.parse_args()
+
+    diffs = list(
+        itertools.islice(
+            ((d.text, d.path) for c in iter_commits(args.repo, args.rev) for d in c.diffs),
+            args.max_diffs,
+        )
+    )
+    chunked = [chunk_diff(text, path) for text, path in diffs]
+    texts = [chunk for chunks in chunked for chunk in chunks]
+    print(f"{len(diffs)} diffs, {len(texts)} chunks from {args.repo}")
+
+    idf = HashingEmbedder(args.dim).fit_idf(texts) if args.idf else None
+    embedder = HashingEmbedder(args.dim, idf)
+    throughput("cold", embedder, texts, args.batch)
+    throughput("warm", embedder, texts, args.batch)
+
+    flat = embedder.embed_matrix(texts)
+    vectors, start = [], 0
+    for chunks in chunked:
+        vectors.append(pool_vectors(flat[start : start + len(chunks)], [len(c) for c in chunks]))
+        start += len(chunks)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    nearest = scores.argmax(axis=1)
+    paths = [path for _, path in diffs]
+    has_peer = [i for i, path in enumerate(paths) if paths.count(path) > 1]
+    same = sum(paths[nearest[i]] == paths[i] for i in has_peer)
+    print(
+        f"{embedder.model}: nearest neighbour touches the same file for "
+        f"{same}/{len(has_peer)} diffs whose file changed more than once"
+    )
+
+
+if __name__ == "__main__":
+    main()
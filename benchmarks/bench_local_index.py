@@ -0,0 +1,107 @@
+"""
+Latency and recall of the offline LocalVectorIndex: exact matrix-multiply
+search vs the IVF index, on synthetic clustered unit vectors.
+
+The index is written to a temporary directory through the same createDiffsBatch
+path ingestion uses, then searched with one query vector per call
+(getSimilarDiffsByVector). Recall@k is the IVF result measured against exact
+search.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_local_index --rows 100000 --dim 1024 --queries 500
+"""
+import time
+import argparse
+import tempfile
+from typing import List, Tuple
+
+import numpy as np
+
+from benchmarks.bench_helix_search import percentile
+from src.kite_exclusive.commit_splitter.services.local_index import DEFAULT_NPROBE, LocalVectorIndex
+
+
+def clustered(rng: np.random.Generator, n: int, dim: int, centers: np.ndarray) -> np.ndarray:
+    picks = rng.integers(0, len(centers), size=n)
+    return (centers[picks] + 0.5 * rng.standard_normal((n, dim), dtype=np.float32)).astype(np.float32)
+
+
+def load(index: LocalVectorIndex, rows: int, dim: int, centers: np.ndarray, batch: int = 2000) -> None:
+    rng = np.random.default_rng(0)
+    for start in range(0, rows, batch):
+        vecs = clustered(rng, min(batch, rows - start), dim, centers)
+        index.add_diffs(
+            [
+                {
+                    "repo_id": "bench",
+                    "commit_id": f"c{start + i}",
+                    "commit_message": f"feat: change {start + i}",
+                    "file_id": f"bench:src/module_{start + i}.py",
+                    "file_path": f"src/module_{start + i}.py",
+                    "diff_id": f"c{start + i}:src/module_{start + i}.py",
+                    "kind": "modified",
+                    "additions": 1,
+                    "deletions": 0,
+                    "summary": "",
+                    "vec": vec,
+                }
+                for i, vec in enumerate(vecs)
+            ]
+        )
+
+
+def time_searches(index: LocalVectorIndex, queries: np.ndarray, k: int) -> Tuple[List[float], List[List[str]]]:
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        (rows,) = index.query("getSimilarDiffsByVector", {"vec": q, "k": k})[0].values()
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([r["diff_id"] for r in rows])
+    return latencies, results
+
+
+def _report(label: str, latencies: List[float]) -> None:
+    print(
+        f"{label:<10} p50 {percentile(latencies, 50):8.3f} ms  "
+        f"p99 {percentile(latencies, 99):8.3f} ms  ({len(latencies)} queries)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    centers = rng.standard_normal((args.clusters, args.dim), dtype=np.float32)
+    queries = clustered(rng, args.queries, args.dim, centers)
+
+    with tempfile.TemporaryDirectory(prefix="glide-index-") as path:
+        # Keep the IVF out of the way while loading, then build it once
+        index = LocalVectorIndex(path, ivf_threshold=args.rows + 1, nprobe=args.nprobe)
+        start = time.perf_counter()
+        load(index, args.rows, args.dim, centers)
+        print(f"loaded {args.rows} x {args.dim} in {time.perf_counter() - start:.1f} s")
+
+        exact_ms, exact = time_searches(index, queries.tolist(), args.k)
+        _report("exact", exact_ms)
+
+        start = time.perf_counter()
+        index.build_ivf()
+        stats = index.stats()
+        print(f"built IVF ({stats['ivf_lists']} lists) in {time.perf_counter() - start:.1f} s")
+        ivf_ms, ivf = time_searches(index, queries.tolist(), args.k)
+        _report(f"ivf/{args.nprobe}", ivf_ms)
+
+        recall = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(exact, ivf)])
+        print(f"recall@{args.k} of IVF vs exact: {recall:.4f}")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
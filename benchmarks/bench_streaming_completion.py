@@ -0,0 +1,167 @@
+"""
+Time to commit message and generated tokens: complete() waiting for the whole
+reply vs complete_until() streaming and cancelling after the first line.
+
+Runs the real Cerebras SDK against a local stub server that streams a
+commit-message-style reply (an empty <think> block, the title line, then an
+explanation the prompt asked the model not to write) one token every
+--token-ms. The stub counts the tokens it actually sent before the client
+hung up, standing in for billed output tokens.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_streaming_completion --rounds 20 --tail-tokens 120
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+from typing import List, Tuple
+
+from cerebras.cloud.sdk import AsyncCerebras
+
+import src.core.LLM.cerebras_inference as cerebras_inference
+from benchmarks.bench_helix_search import percentile
+
+
+class StubServer:
+    """Minimal OpenAI-style chat completions endpoint, streaming or not."""
+
+    def __init__(self, tokens: List[str], token_s: float):
+        self.tokens = tokens
+        self.token_s = token_s
+        self.sent: List[int] = []
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        head = await reader.readuntil(b"\r\n\r\n")
+        length = 0
+        for line in head.decode("latin-1").split("\r\n"):
+            if line.lower().startswith("content-length:"):
+                length = int(line.split(":", 1)[1])
+        body = json.loads(await reader.readexactly(length)) if length else {}
+        hung_up = asyncio.ensure_future(reader.read())
+        sent = 0
+        try:
+            if body.get("stream"):
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n"
+                )
+                for token in self.tokens:
+                    if hung_up.done():
+                        break
+                    chunk = {
+                        "id": "stub",
+                        "object": "chat.completion.chunk",
+                        "created": 0,
+                        "model": body.get("model", "stub"),
+                        "system_fingerprint": "stub",
+                        "choices": [{"index": 0, "delta": {"content": token}}],
+                    }
+                    writer.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    await writer.drain()
+                    sent += 1
+                    await asyncio.sleep(self.token_s)
+                else:
+                    writer.write(b"data: [DONE]\n\n")
+            else:
+                await asyncio.sleep(self.token_s * len(self.tokens))
+                sent = len(self.tokens)
+                payload = json.dumps(
+                    {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "finish_reason": "stop",
+                                "message": {"role": "assistant", "content": "".join(self.tokens)},
+                            }
+                        ],
+                    }
+                ).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nConnection: close\r\n"
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.sent.append(sent)
+            hung_up.cancel()
+            writer.close()
+
+
+def reply_tokens(tail_tokens: int) -> List[str]:
+    title = "feat(upload): add a retry budget to the upload client"
+    tail = " ".join(f"word{i}" for i in range(tail_tokens))
+    text = f"<think>\n\n</think>\n\n{title}\n\nThis change {tail}"
+    # Roughly one token per word or tag, keeping the separators
+    tokens, word = [], ""
+    for ch in text:
+        word += ch
+        if ch in " \n>":
+            tokens.append(word)
+            word = ""
+    return tokens + ([word] if word else [])
+
+
+async def measure(label: str, server: StubServer, call, rounds: int) -> Tuple[List[float], List[int]]:
+    latencies = []
+    server.sent.clear()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        message = await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    await asyncio.sleep(0.05)  # let the stub record the last request
+    print(
+        f"{label:<15} p50 {percentile(latencies, 50):8.1f} ms  p99 {percentile(latencies, 99):8.1f} ms  "
+        f"tokens/reply {statistics.fmean(server.sent):6.1f}  -> {message.strip().splitlines()[-1][:60]!r}"
+    )
+    return latencies, list(server.sent)
+
+
+async def run(args: argparse.Namespace) -> None:
+    tokens = reply_tokens(args.tail_tokens)
+    server = StubServer(tokens, args.token_ms / 1000)
+    listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+    cerebras_inference._async_client = AsyncCerebras(
+        api_key="stub", base_url=f"http://127.0.0.1:{port}", warm_tcp_connection=False
+    )
+    print(f"reply of {len(tokens)} tokens at {args.token_ms} ms/token")
+
+    prompt = "Generate a commit message for this diff."
+    full_ms, full_tokens = await measure(
+        "complete",
+        server,
+        lambda: cerebras_inference.complete(prompt, temperature=0.0, cache=False),
+        args.rounds,
+    )
+    until_ms, until_tokens = await measure(
+        "complete_until",
+        server,
+        lambda: cerebras_inference.complete_until(prompt, temperature=0.0, cache=False),
+        args.rounds,
+    )
+    print(
+        f"speedup {statistics.median(full_ms) / statistics.median(until_ms):.1f}x, "
+        f"tokens generated {sum(until_tokens) / max(sum(full_tokens), 1):.2f}x"
+    )
+    listener.close()
+    await listener.wait_closed()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=2.0)
+    parser.add_argument("--tail-tokens", type=int, default=120, help="tokens after the title line")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
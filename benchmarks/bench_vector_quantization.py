@@ -0,0 +1,103 @@
+"""
+Recall@k of float32 and int8-quantized diff embeddings against the float64
+baseline, plus the per-vector size of each format: bytes stored by the local
+index (vector_codec.encode_vector, int8 with its scale) and JSON bytes sent to
+Helix. Helix itself stores every vector as [F64]; int8 goes to it as f32.
+
+The diffs of an ingested repository (read with the same iter_commits as
+ingestion) are embedded once with Voyage; pass --vectors to keep the matrix
+in a .npy file and reuse it on later runs. A random sample of diffs is used
+as queries against all the others with exact cosine search, so the numbers
+isolate quantization error from ANN approximation.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_vector_quantization --repo . --vectors /tmp/glide-vectors.npy
+"""
+import os
+import json
+import argparse
+import itertools
+from typing import List
+
+import numpy as np
+
+from src.kite_exclusive.commit_splitter.ingest import iter_commits
+from src.kite_exclusive.commit_splitter.services.vector_codec import (
+    VECTOR_DTYPES,
+    decode_vector,
+    encode_vector,
+    wire_vector,
+)
+from src.kite_exclusive.commit_splitter.services.voyage_service import embed_codes
+
+
+def load_vectors(repo: str, rev: str, max_commits: int, path: str = "") -> np.ndarray:
+    if path and os.path.exists(path):
+        return np.load(path)
+    diffs = [
+        (d.text, d.path)
+        for c in itertools.islice(iter_commits(repo, rev), max_commits)
+        for d in c.diffs
+    ]
+    vectors = []
+    for start in range(0, len(diffs), 128):
+        vectors.extend(embed_codes(diffs[start : start + 128]))
+    matrix = np.asarray(vectors, dtype=np.float64)
+    if path:
+        np.save(path, matrix)
+    return matrix
+
+
+def top_k(stored: np.ndarray, queries: np.ndarray, query_rows: np.ndarray, k: int) -> np.ndarray:
+    """Exact cosine top-k for each query, excluding the query's own row."""
+    stored = stored / np.maximum(np.linalg.norm(stored, axis=1, keepdims=True), 1e-12)
+    scores = queries @ stored.T
+    scores[np.arange(len(query_rows)), query_rows] = -np.inf
+    return np.argsort(-scores, axis=1, kind="stable")[:, :k]
+
+
+def recall(baseline: np.ndarray, candidate: np.ndarray) -> float:
+    k = baseline.shape[1]
+    return float(np.mean([len(set(b) & set(c)) / k for b, c in zip(baseline, candidate)]))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repo", default=".")
+    parser.add_argument("--rev", default="HEAD")
+    parser.add_argument("--max-commits", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", default="1,5,10", help="comma-separated k values")
+    parser.add_argument("--vectors", default="", help=".npy file to cache the embedded diffs in")
+    args = parser.parse_args()
+
+    ks: List[int] = [int(k) for k in args.k.split(",")]
+    matrix = load_vectors(args.repo, args.rev, args.max_commits, args.vectors)
+    if len(matrix) <= max(ks):
+        raise SystemExit(f"need more than {max(ks)} diffs, got {len(matrix)}")
+
+    rng = np.random.default_rng(0)
+    query_rows = rng.choice(len(matrix), size=min(args.queries, len(matrix)), replace=False)
+    queries = matrix[query_rows] / np.linalg.norm(matrix[query_rows], axis=1, keepdims=True)
+    print(f"{len(matrix)} diffs, {len(query_rows)} queries, dim {matrix.shape[1]}")
+
+    baseline = {k: top_k(matrix, queries, query_rows, k) for k in ks}
+    sample = matrix[0]
+    header = "".join(f"  recall@{k:<3}" for k in ks)
+    print(f"{'dtype':<6} {'stored B':>9} {'JSON B':>9}{header}")
+    for dtype in VECTOR_DTYPES:
+        stored = np.stack([decode_vector(encode_vector(v, dtype), dtype) for v in matrix]).astype(np.float64)
+        # Query vectors are sent as float32 in the compact modes
+        q = queries if dtype == "f64" else queries.astype(np.float32).astype(np.float64)
+        recalls = "".join(
+            f"  {recall(baseline[k], top_k(stored, q, query_rows, k)):<10.4f}" for k in ks
+        )
+        wire = "f64" if dtype == "f64" else "f32"
+        print(
+            f"{dtype:<6} {len(encode_vector(sample, dtype)):>9} "
+            f"{len(json.dumps(wire_vector(sample, wire))):>9}{recalls}"
+        )
+
+
+if __name__ == "__main__":
+    main()
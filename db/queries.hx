@@ -27,6 +27,7 @@ QUERY createCommit(
     commit_id: String,
     short_id: String,
     author: String,
+    message: String,
     committed_at: Date,
     is_merge: Boolean
 ) =>
@@ -35,6 +36,7 @@ QUERY createCommit(
         commit_id: commit_id,
         short_id: short_id,
         author: author,
+        message: message,
         committed_at: committed_at,
         is_merge: is_merge
     })
@@ -60,10 +62,14 @@ QUERY createFile(file_id: String, path: String, language: String) =>
     RETURN file
 
 
-// createDiff: attaches a diff with a precomputed Voyage vector
+// createDiff: attaches a diff with a precomputed Voyage vector; the vector
+// carries the repo and a copy of the fields similarity search returns
 QUERY createDiff(
+    repo_id: String,
     commit_id: String,
+    commit_message: String,
     file_id: String,
+    file_path: String,
     diff_id: String,
     kind: String,
     additions: I64,
@@ -80,13 +86,154 @@ QUERY createDiff(
         deletions: deletions,
         summary: summary
     })
-    embedding <- AddV<DiffEmbedding>(vec)
+    embedding <- AddV<DiffEmbedding>(vec, {
+        repo_id: repo_id,
+        diff_id: diff_id,
+        commit_id: commit_id,
+        commit_message: commit_message,
+        file_path: file_path,
+        kind: kind,
+        additions: additions,
+        deletions: deletions,
+        summary: summary
+    })
     AddE<HAS_DIFF>()::From(commit)::To(diff)
     AddE<AFFECTS_FILE>()::From(diff)::To(file)
     AddE<HAS_EMBEDDING>()::From(diff)::To(embedding)
     RETURN diff
 
 
+// Batched ingestion: one request inserts many records. Rows in one batch
+// must not depend on each other (commits and files before diffs and parents).
+
+// createCommitsBatch: createCommit for many commits
+QUERY createCommitsBatch(
+    commits: [{
+        branch_id: String,
+        commit_id: String,
+        short_id: String,
+        author: String,
+        message: String,
+        committed_at: Date,
+        is_merge: Boolean
+    }]
+) =>
+    FOR {branch_id, commit_id, short_id, author, message, committed_at, is_merge} IN commits {
+        branch <- N<Branch>({branch_id: branch_id})
+        commit <- AddN<Commit>({
+            commit_id: commit_id,
+            short_id: short_id,
+            author: author,
+            message: message,
+            committed_at: committed_at,
+            is_merge: is_merge
+        })
+        AddE<HAS_COMMIT>()::From(branch)::To(commit)
+    }
+    RETURN "OK"
+
+
+// linkParentCommitsBatch: linkParentCommit for many child/parent pairs
+QUERY linkParentCommitsBatch(links: [{child_commit_id: String, parent_commit_id: String}]) =>
+    FOR {child_commit_id, parent_commit_id} IN links {
+        child <- N<Commit>({commit_id: child_commit_id})
+        parent <- N<Commit>({commit_id: parent_commit_id})
+        AddE<PARENT>()::From(child)::To(parent)
+    }
+    RETURN "OK"
+
+
+// createFilesBatch: createFile for many files
+QUERY createFilesBatch(files: [{file_id: String, path: String, language: String}]) =>
+    FOR {file_id, path, language} IN files {
+        AddN<File>({
+            file_id: file_id,
+            path: path,
+            language: language
+        })
+    }
+    RETURN "OK"
+
+
+// createDiffsBatch: createDiff for many diffs, each with its vector
+QUERY createDiffsBatch(
+    diffs: [{
+        repo_id: String,
+        commit_id: String,
+        commit_message: String,
+        file_id: String,
+        file_path: String,
+        diff_id: String,
+        kind: String,
+        additions: I64,
+        deletions: I64,
+        summary: String,
+        vec: [F64]
+    }]
+) =>
+    FOR {repo_id, commit_id, commit_message, file_id, file_path, diff_id, kind, additions, deletions, summary, vec} IN diffs {
+        commit <- N<Commit>({commit_id: commit_id})
+        file <- N<File>({file_id: file_id})
+        diff <- AddN<Diff>({
+            diff_id: diff_id,
+            kind: kind,
+            additions: additions,
+            deletions: deletions,
+            summary: summary
+        })
+        embedding <- AddV<DiffEmbedding>(vec, {
+            repo_id: repo_id,
+            diff_id: diff_id,
+            commit_id: commit_id,
+            commit_message: commit_message,
+            file_path: file_path,
+            kind: kind,
+            additions: additions,
+            deletions: deletions,
+            summary: summary
+        })
+        AddE<HAS_DIFF>()::From(commit)::To(diff)
+        AddE<AFFECTS_FILE>()::From(diff)::To(file)
+        AddE<HAS_EMBEDDING>()::From(diff)::To(embedding)
+    }
+    RETURN "OK"
+
+
+// Lookups used by incremental ingestion to avoid creating duplicate nodes
+
+// getRepository: returns the repository node if it exists
+QUERY getRepository(repo_id: String) =>
+    repo <- N<Repository>({repo_id: repo_id})
+    RETURN repo
+
+// getBranch: returns the branch node if it exists
+QUERY getBranch(branch_id: String) =>
+    branch <- N<Branch>({branch_id: branch_id})
+    RETURN branch
+
+// getCommit: returns the commit node if it exists
+QUERY getCommit(commit_id: String) =>
+    commit <- N<Commit>({commit_id: commit_id})
+    RETURN commit
+
+// getFile: returns the file node if it exists
+QUERY getFile(file_id: String) =>
+    file <- N<File>({file_id: file_id})
+    RETURN file
+
+// getCommitParents: parents already linked to a commit, so a resumed run
+// only adds the missing PARENT edges
+QUERY getCommitParents(commit_id: String) =>
+    parents <- N<Commit>({commit_id: commit_id})::Out<PARENT>
+    RETURN parents::{ commit_id: commit_id }
+
+// getCommitIdsForRepo: ids of every commit loaded for a repository, so
+// ingestion checks which commits exist in one request instead of one each
+QUERY getCommitIdsForRepo(repo_id: String) =>
+    commits <- N<Repository>({repo_id: repo_id})::Out<HAS_BRANCH>::Out<HAS_COMMIT>
+    RETURN commits::{ commit_id: commit_id }
+
+
 
 
 // Search & retrieval
@@ -107,6 +254,38 @@ QUERY getSimilarDiffsByVector(vec: [F64], k: I64) =>
     }
 
 
+// getSimilarDiffsLean: getSimilarDiffsByVector without traversals; every
+// field comes from the denormalized copy stored on the vector at ingestion
+QUERY getSimilarDiffsLean(vec: [F64], k: I64) =>
+    embeddings <- SearchV<DiffEmbedding>(vec, k)
+    RETURN embeddings::{
+        diff_id: diff_id,
+        kind: kind,
+        additions: additions,
+        deletions: deletions,
+        summary: summary,
+        commit_id: commit_id,
+        commit_message: commit_message,
+        file_path: file_path
+    }
+
+
+// getSimilarDiffsInRepo: lean ANN restricted to one repository's diffs; the
+// repo_id pre-filter keeps other projects out of the top-k
+QUERY getSimilarDiffsInRepo(vec: [F64], k: I64, repo_id: String) =>
+    embeddings <- SearchV<DiffEmbedding>(vec, k)::PREFILTER(_::{repo_id}::EQ(repo_id))
+    RETURN embeddings::{
+        diff_id: diff_id,
+        kind: kind,
+        additions: additions,
+        deletions: deletions,
+        summary: summary,
+        commit_id: commit_id,
+        commit_message: commit_message,
+        file_path: file_path
+    }
+
+
 // getDiffIdsForRepo: collects diff IDs under a repo
 QUERY getDiffIdsForRepo(repo_id: String) =>
     diffs <- N<Repository>({repo_id: repo_id})::Out<HAS_BRANCH>::Out<HAS_COMMIT>::Out<HAS_DIFF>
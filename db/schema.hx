@@ -34,8 +34,19 @@ N::Diff {
   summary: String
 }
 
-// Vector type for embeddings
+// Vector type for embeddings; repo_id lets searches pre-filter to one repository.
+// The remaining fields are a denormalized copy of the diff, its commit subject
+// and its file path, so similarity search can answer without graph traversals.
 V::DiffEmbedding {
+  repo_id: String,
+  diff_id: String,
+  commit_id: String,
+  commit_message: String,
+  file_path: String,
+  kind: String,
+  additions: I64,
+  deletions: I64,
+  summary: String,
   vector: [F64]
 }
 
@@ -1,8 +1,16 @@
 import os
+import re
+import time
+import random
 import asyncio
-from typing import Any, Dict, List, Optional
+import itertools
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple, TypeVar
 from dotenv import load_dotenv
 from cerebras.cloud.sdk import AsyncCerebras
+from src.core.env import env_int
+from src.core.LLM.completion_cache import completion_key, get_completion_cache
+from src.core.LLM.concurrency import DEFAULT_INITIAL_LIMIT, DEFAULT_MAX_LIMIT, DEFAULT_MAX_QUEUE, AdaptiveLimiter, Permit
 
 load_dotenv()
 
@@ -10,6 +18,17 @@ load_dotenv()
 DEFAULT_MODEL_ID: str = os.getenv("CEREBRAS_MODEL_ID", "qwen-3-coder-480b")
 
 _async_client: Optional[AsyncCerebras] = None
+_limiter: Optional[AdaptiveLimiter] = None
+
+T = TypeVar("T")
+
+# Retries of a request the API pushed back on (429/5xx)
+DEFAULT_MAX_RETRIES = 3
+
+# Reasoning tags some models wrap their thinking in before the answer
+_REASONING_TAG = re.compile(r"<\s*(/)?\s*(?:think|thinking|reasoning)\b[^>]*>", re.IGNORECASE)
+# A "<" is held back until this many characters show whether it starts a tag
+_MAX_TAG_CHARS = 32
 
 
 def _get_api_key(explicit_api_key: Optional[str] = None) -> str:
@@ -26,10 +45,12 @@ def init_cerebras_async_client(api_key: Optional[str] = None) -> AsyncCerebras:
     Initialize and cache a global AsyncCerebras client.
 
     Safe to call multiple times; subsequent calls return the cached instance.
+    The SDK's own retries are off: chat() and chat_stream() retry through the
+    adaptive limiter instead, so it sees every 429.
     """
     global _async_client
     if _async_client is None:
-        _async_client = AsyncCerebras(api_key=_get_api_key(api_key))
+        _async_client = AsyncCerebras(api_key=_get_api_key(api_key), max_retries=0)
     return _async_client
 
 
@@ -38,6 +59,98 @@ def get_cerebras_async_client() -> AsyncCerebras:
     return init_cerebras_async_client()
 
 
+def get_cerebras_limiter() -> AdaptiveLimiter:
+    """
+    Get or create the adaptive concurrency limiter shared by all Cerebras
+    calls in this process (lazy initialization).
+
+    GLIDE_CEREBRAS_CONCURRENCY sets the starting limit,
+    GLIDE_CEREBRAS_MAX_CONCURRENCY its ceiling and GLIDE_CEREBRAS_MAX_QUEUE
+    how many requests may wait before new ones are rejected.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = AdaptiveLimiter(
+            env_int("GLIDE_CEREBRAS_CONCURRENCY", DEFAULT_INITIAL_LIMIT),
+            max_limit=env_int("GLIDE_CEREBRAS_MAX_CONCURRENCY", DEFAULT_MAX_LIMIT),
+            max_queue=env_int("GLIDE_CEREBRAS_MAX_QUEUE", DEFAULT_MAX_QUEUE),
+        )
+    return _limiter
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Seconds to wait from Retry-After (seconds or HTTP date) or retry-after-ms."""
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _overload(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """Whether an API error means "slow down" (429 or 5xx), and the Retry-After if any."""
+    status = getattr(exc, "status_code", None)
+    if status != 429 and not (isinstance(status, int) and status >= 500):
+        return False, None
+    response = getattr(exc, "response", None)
+    return True, _retry_after(response.headers) if response is not None else None
+
+
+async def _admitted(create: Callable[[], Awaitable[T]]) -> Tuple[T, Permit]:
+    """
+    Make an API call under the shared limiter, retrying 429/5xx responses
+    after their Retry-After (or exponential backoff with jitter) up to
+    GLIDE_LLM_MAX_RETRIES times. Returns the result with its still-held
+    permit; the caller releases it when the response is consumed.
+    """
+    limiter = get_cerebras_limiter()
+    max_retries = env_int("GLIDE_LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)
+    for attempt in itertools.count():
+        permit = await limiter.acquire()
+        try:
+            return await create(), permit
+        except BaseException as exc:
+            overloaded, retry_after = _overload(exc)
+            permit.release(overloaded=overloaded, retry_after=retry_after, ok=False)
+            if not overloaded or attempt >= max_retries:
+                raise
+        await asyncio.sleep(
+            retry_after if retry_after is not None else random.uniform(0, min(8.0, 0.5 * 2**attempt))
+        )
+
+
+def _generation_params(
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+    extra_params: Optional[Dict[str, Any]],
+) -> Dict[str, Any]:
+    return {
+        **({"temperature": temperature} if temperature is not None else {}),
+        **({"max_tokens": max_tokens} if max_tokens is not None else {}),
+        **(extra_params or {}),
+    }
+
+
+def _prompt_messages(prompt: str, system: Optional[str]) -> List[Dict[str, str]]:
+    messages: List[Dict[str, str]] = []
+    if system:
+        messages.append({"role": "system", "content": system})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
 async def chat(
     messages: List[Dict[str, str]],
     *,
@@ -46,25 +159,41 @@ async def chat(
     max_tokens: Optional[int] = None,
     api_key: Optional[str] = None,
     extra_params: Optional[Dict[str, Any]] = None,
+    cache: bool = True,
 ) -> str:
     """
     Send a structured chat to Cerebras and return the assistant's message content.
 
+    Requests wait for a slot in the shared adaptive limiter (see
+    get_cerebras_limiter) and are retried when the API answers 429/5xx.
+
     messages: List of {"role": "user"|"system"|"assistant", "content": str}
     model: Model name; defaults to DEFAULT_MODEL_ID
     temperature, max_tokens: Optional generation controls
     api_key: Optional override for API key (avoids relying on env)
     extra_params: Additional keyword arguments passed through to the API
+    cache: Serve and store deterministic (temperature 0) calls from the
+        on-disk completion cache; other calls always go to the API
     """
+    model = model or DEFAULT_MODEL_ID
+    params = _generation_params(temperature, max_tokens, extra_params)
+    key = None
+    if cache and temperature == 0 and not params.get("stream"):
+        key = completion_key(model, messages, params)
+        cached = await asyncio.to_thread(get_completion_cache().get, key)
+        if cached is not None:
+            return cached
+
     client = init_cerebras_async_client(api_key)
-    response = await client.chat.completions.create(
-        messages=messages,
-        model=model or DEFAULT_MODEL_ID,
-        **({"temperature": temperature} if temperature is not None else {}),
-        **({"max_tokens": max_tokens} if max_tokens is not None else {}),
-        **(extra_params or {}),
+    start = time.perf_counter()
+    response, permit = await _admitted(
+        lambda: client.chat.completions.create(messages=messages, model=model, **params)
     )
-    return response.choices[0].message.content
+    permit.release()
+    content = response.choices[0].message.content
+    if key is not None and content is not None:
+        await asyncio.to_thread(get_completion_cache().put, key, content, time.perf_counter() - start)
+    return content
 
 
 async def complete(
@@ -76,15 +205,181 @@ async def complete(
     max_tokens: Optional[int] = None,
     api_key: Optional[str] = None,
     extra_params: Optional[Dict[str, Any]] = None,
+    cache: bool = True,
 ) -> str:
     """
     Convenience wrapper for single-turn prompts. Builds messages from `system` and `prompt`.
     """
-    messages: List[Dict[str, str]] = []
-    if system:
-        messages.append({"role": "system", "content": system})
-    messages.append({"role": "user", "content": prompt})
     return await chat(
+        _prompt_messages(prompt, system),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        api_key=api_key,
+        extra_params=extra_params,
+        cache=cache,
+    )
+
+
+class ReasoningFilter:
+    """
+    Incremental filter for streamed text that drops <think>...</think> (and
+    <thinking>, <reasoning>) spans, including tags split across chunks. A
+    stray closing tag outside a span is dropped too.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._inside = False
+
+    def feed(self, text: str) -> str:
+        """Add a chunk of streamed text; returns the part that is safe to emit."""
+        self._buffer += text
+        out: List[str] = []
+        while True:
+            match = _REASONING_TAG.search(self._buffer)
+            if match is None:
+                break
+            if not self._inside:
+                out.append(self._buffer[: match.start()])
+            self._inside = match.group(1) is None
+            self._buffer = self._buffer[match.end():]
+
+        # Hold back a trailing "<" that may still become a tag
+        tail = self._buffer.rfind("<")
+        if tail < 0 or len(self._buffer) - tail >= _MAX_TAG_CHARS or ">" in self._buffer[tail:]:
+            tail = len(self._buffer)
+        if not self._inside:
+            out.append(self._buffer[:tail])
+        self._buffer = self._buffer[tail:]
+        return "".join(out)
+
+    def flush(self) -> str:
+        """Emit what is held back at the end of the stream (nothing inside a reasoning span)."""
+        text = "" if self._inside else self._buffer
+        self._buffer = ""
+        return text
+
+
+async def chat_stream(
+    messages: List[Dict[str, str]],
+    *,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    api_key: Optional[str] = None,
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a chat from Cerebras, yielding the assistant's content as it arrives
+    with reasoning spans removed.
+
+    Closing the generator early (e.g. breaking out of `async for` inside
+    contextlib.aclosing) closes the HTTP response, which cancels the rest of
+    the generation. Streamed calls are never cached.
+    """
+    client = init_cerebras_async_client(api_key)
+    stream, permit = await _admitted(
+        lambda: client.chat.completions.create(
+            messages=messages,
+            model=model or DEFAULT_MODEL_ID,
+            stream=True,
+            **_generation_params(temperature, max_tokens, extra_params),
+        )
+    )
+    reasoning = ReasoningFilter()
+    try:
+        async for chunk in stream:
+            choices = getattr(chunk, "choices", None)
+            if not choices:
+                continue
+            delta = choices[0].delta
+            text = reasoning.feed((delta.content if delta else None) or "")
+            if text:
+                yield text
+        text = reasoning.flush()
+        if text:
+            yield text
+    except Exception as exc:
+        overloaded, retry_after = _overload(exc)
+        permit.release(overloaded=overloaded, retry_after=retry_after, ok=False)
+        raise
+    finally:
+        # Stopping early is a success: the permit only tracks provider pushback
+        permit.release()
+        await stream.close()
+
+
+def complete_stream(
+    prompt: str,
+    *,
+    system: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    api_key: Optional[str] = None,
+    extra_params: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[str]:
+    """
+    Streaming counterpart of complete(); see chat_stream.
+    """
+    return chat_stream(
+        _prompt_messages(prompt, system),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        api_key=api_key,
+        extra_params=extra_params,
+    )
+
+
+def first_line(text: str) -> Optional[str]:
+    """The first non-empty line of text, once it is complete (followed by a newline)."""
+    for line in text.split("\n")[:-1]:
+        if line.strip():
+            return line.strip()
+    return None
+
+
+async def complete_until(
+    prompt: str,
+    until: Callable[[str], Optional[str]] = first_line,
+    *,
+    system: Optional[str] = None,
+    model: Optional[str] = None,
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+    api_key: Optional[str] = None,
+    extra_params: Optional[Dict[str, Any]] = None,
+    cache: bool = True,
+) -> str:
+    """
+    Stream a single-turn completion and stop as soon as `until` finds what it
+    needs in the text so far, cancelling the rest of the generation.
+
+    until: Called with the text received so far (reasoning removed); returns
+        the result to stop with, or None to keep reading. Defaults to the
+        first complete non-empty line.
+    cache: Deterministic (temperature 0) calls go through the completion
+        cache like complete(), keyed by `until` as well
+
+    Returns until's result, or all of the text if the stream ends first.
+    """
+    model = model or DEFAULT_MODEL_ID
+    messages = _prompt_messages(prompt, system)
+    key = None
+    if cache and temperature == 0:
+        params = _generation_params(temperature, max_tokens, extra_params)
+        params["until"] = f"{until.__module__}.{until.__qualname__}"
+        key = completion_key(model, messages, params)
+        cached = await asyncio.to_thread(get_completion_cache().get, key)
+        if cached is not None:
+            return cached
+
+    start = time.perf_counter()
+    text = ""
+    result = None
+    stream = chat_stream(
         messages,
         model=model,
         temperature=temperature,
@@ -92,13 +387,32 @@ async def complete(
         api_key=api_key,
         extra_params=extra_params,
     )
+    try:
+        async for piece in stream:
+            text += piece
+            result = until(text)
+            if result is not None:
+                break
+    finally:
+        await stream.aclose()
+    if result is None:
+        result = text
+    if key is not None and result:
+        await asyncio.to_thread(get_completion_cache().put, key, result, time.perf_counter() - start)
+    return result
 
 
 __all__ = [
     "init_cerebras_async_client",
     "get_cerebras_async_client",
     "chat",
+    "chat_stream",
+    "get_cerebras_limiter",
     "complete",
+    "complete_stream",
+    "complete_until",
+    "first_line",
+    "ReasoningFilter",
     "DEFAULT_MODEL_ID",
 ]
 
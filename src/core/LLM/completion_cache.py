@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "glide", "completions.sqlite3"
+)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_S = 7 * 24 * 3600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS completions (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    latency_s REAL NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS completions_last_used ON completions(last_used);
+"""
+
+
+def completion_key(model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """Content address for a completion: sha256 over (model, messages, generation params)."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    SQLite-backed cache of deterministic LLM responses.
+
+    Entries older than ttl_s are treated as misses and dropped. Once stored
+    responses exceed max_bytes, entries are evicted least-recently-used first.
+    Each entry keeps the latency of the call that produced it, so hits can
+    report the time they saved. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_s: float = DEFAULT_TTL_S,
+    ):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.saved_s = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(CAST(response AS BLOB))), 0) FROM completions"
+        ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response if present and fresh; bumps its recency."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency_s, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[2] > self.ttl_s:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._size -= len(row[0].encode("utf-8"))
+                self.expired += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            self.saved_s += row[1]
+            return row[0]
+
+    def put(self, key: str, response: str, latency_s: float) -> None:
+        """Store a response with the latency it took, and evict LRU entries beyond the size cap."""
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT LENGTH(CAST(response AS BLOB)) FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, response, latency_s, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, latency_s, now, now),
+            )
+            self._size += len(response.encode("utf-8")) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Expired entries go first, then LRU down to 90% of the cap
+        cutoff = time.time() - self.ttl_s
+        rows = self._conn.execute(
+            "SELECT key, LENGTH(CAST(response AS BLOB)) FROM completions WHERE created < ?", (cutoff,)
+        ).fetchall()
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", [(key,) for key, _ in rows])
+        self._size -= sum(size for _, size in rows)
+        self.evictions += len(rows)
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(CAST(response AS BLOB)) FROM completions ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+            doomed = []
+            for key, size in rows:
+                doomed.append((key,))
+                self._size -= size
+                if self._size <= target:
+                    break
+            self._conn.executemany("DELETE FROM completions WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and saved latency for this process, plus current on-disk usage."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_s": round(self.saved_s, 3),
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[CompletionCache] = None
+
+
+def get_completion_cache() -> CompletionCache:
+    """
+    Get or create the process-wide completion cache (lazy initialization).
+
+    Location, size cap and entry lifetime come from GLIDE_LLM_CACHE_PATH,
+    GLIDE_LLM_CACHE_MAX_MB and GLIDE_LLM_CACHE_TTL_HOURS. Falls back to an
+    in-memory cache if the on-disk database cannot be opened.
+    """
+    global _cache
+    if _cache is None:
+        path = os.getenv("GLIDE_LLM_CACHE_PATH", DEFAULT_CACHE_PATH)
+        try:
+            max_bytes = int(float(os.getenv("GLIDE_LLM_CACHE_MAX_MB", "")) * 1024 * 1024)
+        except ValueError:
+            max_bytes = DEFAULT_MAX_BYTES
+        try:
+            ttl_s = float(os.getenv("GLIDE_LLM_CACHE_TTL_HOURS", "")) * 3600
+        except ValueError:
+            ttl_s = DEFAULT_TTL_S
+        try:
+            _cache = CompletionCache(path, max_bytes, ttl_s)
+        except (OSError, sqlite3.Error):
+            _cache = CompletionCache(":memory:", max_bytes, ttl_s)
+    return _cache
+
+
+__all__ = [
+    "CompletionCache",
+    "completion_key",
+    "get_completion_cache",
+]
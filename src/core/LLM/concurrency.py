@@ -0,0 +1,185 @@
+import time
+import asyncio
+import collections
+from typing import Any, Deque, Dict, Optional
+
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MAX_LIMIT = 32
+DEFAULT_MAX_QUEUE = 1000
+# Multiplicative decrease applied on an overload signal
+DEFAULT_BACKOFF_RATIO = 0.5
+
+
+class Permit:
+    """One admitted request; release it exactly once with how the request went."""
+
+    def __init__(self, limiter: "AdaptiveLimiter", epoch: int):
+        self._limiter = limiter
+        self._epoch = epoch
+        self._released = False
+
+    def release(self, overloaded: bool = False, retry_after: Optional[float] = None, ok: bool = True) -> None:
+        """
+        overloaded: the provider pushed back (429/5xx); shrinks the limit
+        retry_after: seconds the provider asked everyone to wait
+        ok: the request succeeded (only successes grow the limit)
+        """
+        if not self._released:
+            self._released = True
+            self._limiter._release(self._epoch, overloaded, retry_after, ok)
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for calls to one provider.
+
+    At most `limit` requests are in flight; the rest wait in FIFO order, and
+    beyond `max_queue` waiters new requests are rejected with RuntimeError.
+    A freed slot is handed straight to the oldest waiter, and newcomers queue
+    whenever anyone is waiting, so nobody can take a slot meant for a waiter.
+    Each success while the limit is in use adds 1/limit (about +1 per round
+    trip of a full window); an overload multiplies the limit by
+    `backoff_ratio`, at most once per window so a burst of 429s from the same
+    requests counts once. A Retry-After pauses all admissions until it passes.
+
+    Not tied to an event loop: waiters from a loop that has since closed are
+    skipped.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = DEFAULT_INITIAL_LIMIT,
+        *,
+        min_limit: float = 1,
+        max_limit: float = DEFAULT_MAX_LIMIT,
+        backoff_ratio: float = DEFAULT_BACKOFF_RATIO,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.backoff_ratio = backoff_ratio
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.successes = 0
+        self.overloads = 0
+        self.decreases = 0
+        self.rejections = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+        self._epoch = 0
+        self._blocked_until = 0.0
+        self._wake_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self._blocked_until
+
+    async def acquire(self) -> Permit:
+        """Wait for a slot; raises RuntimeError if too many requests are already queued."""
+        if (self._waiters or not self._has_room()) and len(self._waiters) >= self.max_queue:
+            self.rejections += 1
+            raise RuntimeError(f"Too many queued LLM requests ({len(self._waiters)} waiting)")
+        start = time.monotonic()
+        if self._waiters or not self._has_room():
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._wake()
+            try:
+                # Resolved by _hand_over once _wake has reserved a slot for us
+                await waiter
+            except BaseException:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.done() and not waiter.cancelled():
+                    # Handed a slot but giving up: pass it on
+                    self.in_flight -= 1
+                    self._wake()
+                raise
+        else:
+            self.in_flight += 1
+        waited = time.monotonic() - start
+        self.wait_s_total += waited
+        self.wait_s_max = max(self.wait_s_max, waited)
+        self.admitted += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return Permit(self, self._epoch)
+
+    def _release(self, epoch: int, overloaded: bool, retry_after: Optional[float], ok: bool) -> None:
+        saturated = self.in_flight >= int(self.limit)
+        self.in_flight -= 1
+        if overloaded:
+            self.overloads += 1
+            if epoch == self._epoch:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self.decreases += 1
+                self._epoch += 1
+        elif ok:
+            self.successes += 1
+            if saturated:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        if retry_after:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Hand free slots to the oldest waiters, reserving each before it is delivered."""
+        paused = self._blocked_until - time.monotonic()
+        if paused > 0:
+            self._wake_after(paused)
+            return
+        while self.in_flight < int(self.limit) and self._waiters:
+            waiter = self._waiters.popleft()
+            if waiter.done() or waiter.get_loop().is_closed():
+                continue
+            self.in_flight += 1
+            waiter.get_loop().call_soon_threadsafe(_hand_over, self, waiter)
+
+    def _wake_after(self, delay: float) -> None:
+        """Call _wake once a Retry-After pause ends, on the loop of a live waiter."""
+        if self._wake_loop is not None and not self._wake_loop.is_closed():
+            return
+        loop = next((w.get_loop() for w in self._waiters if not w.get_loop().is_closed()), None)
+        self._wake_loop = loop
+        if loop is None:
+            return
+
+        def wake() -> None:
+            self._wake_loop = None
+            self._wake()
+
+        loop.call_soon_threadsafe(loop.call_later, delay, wake)
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limit and queue, plus counters and queue wait times for this process."""
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "decreases": self.decreases,
+            "rejections": self.rejections,
+            "wait_s_avg": round(self.wait_s_total / self.admitted, 4) if self.admitted else 0.0,
+            "wait_s_max": round(self.wait_s_max, 4),
+            "paused_s": round(max(0.0, self._blocked_until - time.monotonic()), 3),
+        }
+
+
+def _hand_over(limiter: AdaptiveLimiter, waiter: asyncio.Future) -> None:
+    if waiter.done():
+        # Cancelled after its slot was reserved: return the slot
+        limiter.in_flight -= 1
+        limiter._wake()
+    else:
+        waiter.set_result(None)
+
+
+__all__ = [
+    "AdaptiveLimiter",
+    "Permit",
+]
@@ -0,0 +1,473 @@
+import os
+import math
+import time
+import asyncio
+import collections
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Sequence
+
+import ollama
+from openai import AsyncOpenAI
+from cerebras.cloud.sdk import AsyncCerebras
+
+from src.core.LLM.cerebras_inference import (
+    DEFAULT_MODEL_ID,
+    ReasoningFilter,
+    _generation_params,
+    _prompt_messages,
+    chat_stream,
+)
+from src.core.LLM.completion_cache import completion_key, get_completion_cache
+
+# Latency samples kept per provider
+DEFAULT_WINDOW = 200
+# Samples needed before a provider's p95 is trusted as its hedge delay
+DEFAULT_MIN_SAMPLES = 10
+# Failed providers are tried last for this long
+DEFAULT_COOLDOWN_S = 30.0
+
+PROVIDER_KINDS = ("cerebras", "ollama", "openai")
+
+
+async def _without_reasoning(pieces: AsyncIterator[str]) -> AsyncIterator[str]:
+    reasoning = ReasoningFilter()
+    async for piece in pieces:
+        text = reasoning.feed(piece)
+        if text:
+            yield text
+    text = reasoning.flush()
+    if text:
+        yield text
+
+
+class Provider(ABC):
+    """
+    One LLM endpoint behind the router. Subclasses stream the assistant's
+    content for a list of chat messages, with reasoning spans removed.
+    """
+
+    name: str
+
+    @abstractmethod
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> AsyncIterator[str]:
+        ...
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        until: Optional[Callable[[str], Optional[str]]] = None,
+    ) -> str:
+        """
+        Collect a reply. With `until`, stop (and cancel the request) as soon as
+        it returns a result for the text so far; see complete_until.
+        """
+        text = ""
+        pieces = self.stream(messages, temperature=temperature, max_tokens=max_tokens)
+        try:
+            async for piece in pieces:
+                text += piece
+                if until is not None:
+                    result = until(text)
+                    if result is not None:
+                        return result
+        finally:
+            await pieces.aclose()
+        return text
+
+
+class CerebrasProvider(Provider):
+    """
+    Cerebras Cloud. Without a base_url, requests go through chat_stream() and
+    so share the process-wide client and its adaptive concurrency limiter.
+    """
+
+    def __init__(
+        self,
+        model: Optional[str] = None,
+        *,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        self.model = model or DEFAULT_MODEL_ID
+        self.name = f"cerebras:{self.model}"
+        self._client = (
+            AsyncCerebras(
+                api_key=api_key or os.getenv("CEREBRAS_API_KEY") or "unused",
+                base_url=base_url,
+                warm_tcp_connection=False,
+            )
+            if base_url
+            else None
+        )
+        self._api_key = api_key
+
+    async def stream(self, messages, *, temperature=None, max_tokens=None):
+        if self._client is None:
+            async for text in chat_stream(
+                messages,
+                model=self.model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                api_key=self._api_key,
+            ):
+                yield text
+            return
+        response = await self._client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            stream=True,
+            **_generation_params(temperature, max_tokens, None),
+        )
+
+        async def pieces() -> AsyncIterator[str]:
+            async for chunk in response:
+                choices = getattr(chunk, "choices", None)
+                delta = choices[0].delta if choices else None
+                if delta is not None and delta.content:
+                    yield delta.content
+
+        try:
+            async for text in _without_reasoning(pieces()):
+                yield text
+        finally:
+            await response.close()
+
+
+class OllamaProvider(Provider):
+    """A model served by Ollama (OLLAMA_HOST unless a host is given)."""
+
+    def __init__(self, model: str, *, host: Optional[str] = None):
+        self.model = model
+        self.name = f"ollama:{model}"
+        self._client = ollama.AsyncClient(host=host)
+
+    async def stream(self, messages, *, temperature=None, max_tokens=None):
+        options: Dict[str, Any] = {}
+        if temperature is not None:
+            options["temperature"] = temperature
+        if max_tokens is not None:
+            options["num_predict"] = max_tokens
+        response = await self._client.chat(
+            model=self.model, messages=messages, stream=True, options=options or None
+        )
+
+        async def pieces() -> AsyncIterator[str]:
+            async for chunk in response:
+                content = chunk["message"]["content"]
+                if content:
+                    yield content
+
+        try:
+            async for text in _without_reasoning(pieces()):
+                yield text
+        finally:
+            await response.aclose()
+
+
+class OpenAICompatibleProvider(Provider):
+    """Any endpoint that speaks the OpenAI chat completions API."""
+
+    def __init__(self, model: str, *, base_url: str, api_key: Optional[str] = None):
+        self.model = model
+        self.name = f"openai:{model}@{base_url}"
+        # The router does its own fallback, so the SDK should not retry
+        self._client = AsyncOpenAI(
+            api_key=api_key or os.getenv("OPENAI_API_KEY") or "unused",
+            base_url=base_url,
+            max_retries=0,
+        )
+
+    async def stream(self, messages, *, temperature=None, max_tokens=None):
+        response = await self._client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **_generation_params(temperature, max_tokens, None),
+        )
+
+        async def pieces() -> AsyncIterator[str]:
+            async for chunk in response:
+                delta = chunk.choices[0].delta if chunk.choices else None
+                if delta is not None and delta.content:
+                    yield delta.content
+
+        try:
+            async for text in _without_reasoning(pieces()):
+                yield text
+        finally:
+            await response.close()
+
+
+def parse_provider(spec: str) -> Provider:
+    """
+    Build a provider from "kind[:model][@base_url]", e.g. "cerebras",
+    "ollama:qwen3:4b", "ollama:llama3.2@http://gpu-box:11434" or
+    "openai:gpt-4o-mini@https://api.openai.com/v1".
+    """
+    kind, _, rest = spec.strip().partition(":")
+    model, _, base_url = rest.rpartition("@") if "@" in rest else (rest, "", "")
+    kind = kind.strip().lower()
+    if kind == "cerebras":
+        return CerebrasProvider(model or None, base_url=base_url or None)
+    if kind == "ollama":
+        if not model:
+            raise RuntimeError(f"Ollama provider needs a model: {spec!r}")
+        return OllamaProvider(model, host=base_url or None)
+    if kind == "openai":
+        if not model or not base_url:
+            raise RuntimeError(f"OpenAI-compatible provider needs model@base_url: {spec!r}")
+        return OpenAICompatibleProvider(model, base_url=base_url)
+    raise RuntimeError(f"Unknown LLM provider kind {kind!r} in {spec!r}; expected one of {', '.join(PROVIDER_KINDS)}")
+
+
+def _percentile(samples: Sequence[float], pct: float) -> float:
+    # Nearest-rank percentile
+    ordered = sorted(samples)
+    return ordered[max(1, math.ceil(len(ordered) * pct / 100)) - 1]
+
+
+class _ProviderStats:
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = collections.deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+        self.failed_at = 0.0
+
+    def p(self, pct: float) -> Optional[float]:
+        return _percentile(self.latencies, pct) if self.latencies else None
+
+
+class LLMRouter:
+    """
+    Routes chat requests across providers in priority order.
+
+    The first provider not cooling down after a failure is the primary. If it
+    has not answered by its rolling p95 latency (or `initial_hedge_s` until
+    it has `min_samples` samples), one hedged request goes to the next
+    provider and whichever answers first wins; the other is cancelled. An
+    error from an in-flight request immediately starts the next untried
+    provider. With a single provider, hedging re-sends to the same provider
+    only if `hedge_same_provider` is set.
+
+    Args:
+        providers: In priority order
+        hedge: Send hedged requests at all
+        initial_hedge_s: Hedge delay while a provider's latency is unknown
+            (None: no hedging until it is known)
+        cooldown_s: How long a failed provider is tried last
+    """
+
+    def __init__(
+        self,
+        providers: Sequence[Provider],
+        *,
+        hedge: bool = True,
+        hedge_same_provider: bool = False,
+        window: int = DEFAULT_WINDOW,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        initial_hedge_s: Optional[float] = None,
+        cooldown_s: float = DEFAULT_COOLDOWN_S,
+    ):
+        if not providers:
+            raise RuntimeError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_same_provider = hedge_same_provider
+        self.min_samples = min_samples
+        self.initial_hedge_s = initial_hedge_s
+        self.cooldown_s = cooldown_s
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._stats = {id(p): _ProviderStats(window) for p in self.providers}
+
+    def _ranked(self) -> List[Provider]:
+        now = time.monotonic()
+        return sorted(
+            self.providers,
+            key=lambda p: now - self._stats[id(p)].failed_at < self.cooldown_s,
+        )
+
+    def _hedge_delay(self, provider: Provider) -> Optional[float]:
+        stats = self._stats[id(provider)]
+        if len(stats.latencies) >= self.min_samples:
+            return stats.p(95)
+        return self.initial_hedge_s
+
+    async def _timed(self, provider: Provider, messages, params) -> str:
+        stats = self._stats[id(provider)]
+        stats.requests += 1
+        start = time.monotonic()
+        try:
+            result = await provider.chat(messages, **params)
+        except asyncio.CancelledError:
+            # Lost a hedge race: its latency is at least this long. Dropping it
+            # would leave only fast samples and bias p95 (the hedge delay) low
+            stats.latencies.append(time.monotonic() - start)
+            raise
+        except Exception:
+            stats.errors += 1
+            stats.failed_at = time.monotonic()
+            raise
+        stats.latencies.append(time.monotonic() - start)
+        return result
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        *,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        until: Optional[Callable[[str], Optional[str]]] = None,
+        cache: bool = True,
+    ) -> str:
+        """
+        Route one chat. `until` stops streaming early as in complete_until, and
+        deterministic (temperature 0) calls go through the completion cache.
+        """
+        key = None
+        if cache and temperature == 0:
+            params_key = _generation_params(temperature, max_tokens, None)
+            params_key["providers"] = [p.name for p in self.providers]
+            if until is not None:
+                params_key["until"] = f"{until.__module__}.{until.__qualname__}"
+            key = completion_key("router", messages, params_key)
+            cached = await asyncio.to_thread(get_completion_cache().get, key)
+            if cached is not None:
+                return cached
+
+        start = time.monotonic()
+        params = {"temperature": temperature, "max_tokens": max_tokens, "until": until}
+        ranked = self._ranked()
+        queue = list(ranked)
+        running: Dict[asyncio.Task, Provider] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch(provider: Provider) -> None:
+            task = asyncio.ensure_future(self._timed(provider, messages, params))
+            running[task] = provider
+
+        primary = queue.pop(0)
+        launch(primary)
+        try:
+            while running:
+                delay = None
+                if self.hedge and not hedged:
+                    delay = self._hedge_delay(primary)
+                    if delay is not None:
+                        delay = max(0.0, delay - (time.monotonic() - start))
+                done, _ = await asyncio.wait(
+                    running, timeout=delay, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    # The primary is slower than its p95: hedge once
+                    hedged = True
+                    target = queue.pop(0) if queue else (primary if self.hedge_same_provider else None)
+                    if target is not None:
+                        self.hedged += 1
+                        launch(target)
+                    continue
+                for task in done:
+                    provider = running.pop(task)
+                    if task.exception() is None:
+                        self._stats[id(provider)].wins += 1
+                        if hedged and provider is not primary:
+                            self.hedge_wins += 1
+                        result = task.result()
+                        if key is not None and result:
+                            await asyncio.to_thread(
+                                get_completion_cache().put, key, result, time.monotonic() - start
+                            )
+                        return result
+                    errors.append(f"{provider.name}: {task.exception()}")
+                    if queue:
+                        launch(queue.pop(0))
+            raise RuntimeError("All LLM providers failed: " + "; ".join(errors))
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def complete(
+        self,
+        prompt: str,
+        *,
+        system: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        until: Optional[Callable[[str], Optional[str]]] = None,
+        cache: bool = True,
+    ) -> str:
+        """Single-turn convenience wrapper around chat()."""
+        return await self.chat(
+            _prompt_messages(prompt, system),
+            temperature=temperature,
+            max_tokens=max_tokens,
+            until=until,
+            cache=cache,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-provider request/error/win counts and rolling p50/p95 latency, plus hedge counts."""
+        providers = {}
+        for provider in self.providers:
+            s = self._stats[id(provider)]
+            p50, p95 = s.p(50), s.p(95)
+            providers[provider.name] = {
+                "requests": s.requests,
+                "errors": s.errors,
+                "wins": s.wins,
+                "p50_s": round(p50, 3) if p50 is not None else None,
+                "p95_s": round(p95, 3) if p95 is not None else None,
+            }
+        return {"providers": providers, "hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+def router_from_env(variable: str, default: str) -> LLMRouter:
+    """
+    Build a router from a comma-separated provider list in `variable` (see
+    parse_provider). GLIDE_LLM_HEDGE=0 turns hedging off, and
+    GLIDE_LLM_HEDGE_INITIAL_S sets the hedge delay used until a provider's
+    p95 is known.
+    """
+    specs = [s for s in os.getenv(variable, default).split(",") if s.strip()]
+    try:
+        initial_hedge_s: Optional[float] = float(os.getenv("GLIDE_LLM_HEDGE_INITIAL_S", ""))
+    except ValueError:
+        initial_hedge_s = None
+    return LLMRouter(
+        [parse_provider(spec) for spec in specs],
+        hedge=os.getenv("GLIDE_LLM_HEDGE", "1").strip().lower() not in ("0", "false", "no"),
+        initial_hedge_s=initial_hedge_s,
+    )
+
+
+_routers: Dict[str, LLMRouter] = {}
+
+
+def get_router(variable: str, default: str) -> LLMRouter:
+    """Get or create the router configured by an environment variable (lazy initialization)."""
+    if variable not in _routers:
+        _routers[variable] = router_from_env(variable, default)
+    return _routers[variable]
+
+
+__all__ = [
+    "CerebrasProvider",
+    "LLMRouter",
+    "OllamaProvider",
+    "OpenAICompatibleProvider",
+    "Provider",
+    "get_router",
+    "parse_provider",
+    "router_from_env",
+]
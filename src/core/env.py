@@ -0,0 +1,12 @@
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """Positive integer from environment variable `name`; `default` if unset or not a number."""
+    try:
+        return max(1, int(os.getenv(name, "")))
+    except ValueError:
+        return default
+
+
+__all__ = ["env_int"]
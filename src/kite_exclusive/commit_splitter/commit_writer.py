@@ -0,0 +1,256 @@
+import os
+import asyncio
+import tempfile
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+
+@dataclass
+class CommitSpec:
+    """
+    One commit of a split.
+
+    paths are staged whole from the working tree (missing paths are removed);
+    patches are partial diffs applied to the index with `git apply --cached`.
+    """
+
+    message: str
+    paths: List[str] = field(default_factory=list)
+    patches: List[str] = field(default_factory=list)
+
+
+async def _git(
+    args: List[str],
+    cwd: str,
+    *,
+    env: Optional[Dict[str, str]] = None,
+    input: Optional[str] = None,
+) -> str:
+    """Run git and return stdout; raises CalledProcessError on failure."""
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        env=env,
+        stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout_data, stderr_data = await process.communicate(
+        input.encode("utf-8") if input is not None else None
+    )
+    stdout = stdout_data.decode("utf-8", errors="replace")
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(
+            process.returncode,
+            ["git", *args],
+            stdout,
+            stderr_data.decode("utf-8", errors="replace"),
+        )
+    return stdout
+
+
+async def _rev_parse(cwd: str, *args: str) -> Optional[str]:
+    try:
+        return (await _git(["rev-parse", "-q", "--verify", *args], cwd)).strip() or None
+    except subprocess.CalledProcessError:
+        return None
+
+
+async def _run_hook(name: str, cwd: str, env: Dict[str, str], *hook_args: str) -> None:
+    args = ["hook", "run", "--ignore-missing", name]
+    if hook_args:
+        args += ["--", *hook_args]
+    await _git(args, cwd, env=env)
+
+
+def _patched_paths(specs: List[CommitSpec]) -> List[str]:
+    paths = []
+    for spec in specs:
+        for patch in spec.patches:
+            for line in patch.splitlines():
+                if line.startswith("+++ b/"):
+                    paths.append(line[len("+++ b/") :])
+    return paths
+
+
+async def write_commits_plumbing(
+    workspace_root: str,
+    specs: List[CommitSpec],
+    *,
+    run_hooks: bool = True,
+) -> List[str]:
+    """
+    Create a chain of commits without touching the index or running `git commit`.
+
+    Each tree is built in a temporary index (GIT_INDEX_FILE) seeded from HEAD
+    with update-index / apply --cached, written with write-tree and committed
+    with commit-tree on top of the previous one. The current branch is then
+    moved once with update-ref, so either every commit lands or none does.
+    Afterwards the real index entries of the committed paths are reset to the
+    new HEAD; the working tree is never modified.
+
+    Args:
+        workspace_root: Path to the git repository root
+        specs: Commits to create, oldest first
+        run_hooks: Run the pre-commit and commit-msg hooks for every commit
+                   (against the temporary index) and post-commit once at the end
+
+    Returns:
+        The new commit ids, oldest first
+
+    Raises:
+        subprocess.CalledProcessError: if any git step or hook fails; HEAD is
+            left untouched in that case
+    """
+    head = await _rev_parse(workspace_root, "HEAD")
+    try:
+        ref = (await _git(["symbolic-ref", "-q", "HEAD"], workspace_root)).strip()
+    except subprocess.CalledProcessError:
+        ref = "HEAD"  # detached HEAD
+
+    fd, index_path = tempfile.mkstemp(prefix="glide-index-")
+    os.close(fd)
+    os.unlink(index_path)
+    env = {**os.environ, "GIT_INDEX_FILE": index_path}
+    commits: List[str] = []
+    try:
+        if head:
+            await _git(["read-tree", head], workspace_root, env=env)
+        else:
+            await _git(["read-tree", "--empty"], workspace_root, env=env)
+
+        parent = head
+        for spec in specs:
+            if spec.paths:
+                await _git(
+                    ["update-index", "--add", "--remove", "--", *spec.paths],
+                    workspace_root,
+                    env=env,
+                )
+            for patch in spec.patches:
+                await _git(
+                    ["apply", "--cached", "--whitespace=nowarn", "-"],
+                    workspace_root,
+                    env=env,
+                    input=patch,
+                )
+
+            message = spec.message
+            if run_hooks:
+                await _run_hook("pre-commit", workspace_root, env)
+                with tempfile.NamedTemporaryFile(
+                    "w", suffix=".msg", delete=False, encoding="utf-8"
+                ) as f:
+                    f.write(message + "\n")
+                try:
+                    await _run_hook("commit-msg", workspace_root, env, f.name)
+                    with open(f.name, "r", encoding="utf-8") as msg_file:
+                        message = msg_file.read().strip() or message
+                finally:
+                    os.unlink(f.name)
+
+            tree = (await _git(["write-tree"], workspace_root, env=env)).strip()
+            commit = (
+                await _git(
+                    ["commit-tree", tree, *(["-p", parent] if parent else []), "-F", "-"],
+                    workspace_root,
+                    input=message + "\n",
+                )
+            ).strip()
+            commits.append(commit)
+            parent = commit
+    finally:
+        if os.path.exists(index_path):
+            os.unlink(index_path)
+
+    if not commits:
+        return commits
+
+    # Compare-and-swap against the HEAD we started from
+    await _git(
+        ["update-ref", "-m", f"glide: split into {len(commits)} commits", ref, commits[-1], head or ""],
+        workspace_root,
+    )
+
+    touched = sorted({p for spec in specs for p in spec.paths} | set(_patched_paths(specs)))
+    if touched:
+        await _git(["reset", "-q", "--", *touched], workspace_root)
+    if run_hooks:
+        await _run_hook("post-commit", workspace_root, dict(os.environ))
+    return commits
+
+
+async def write_commits_porcelain(workspace_root: str, specs: List[CommitSpec]) -> List[str]:
+    """
+    Create the commits one by one with `git update-index` / `git apply --cached` / `git commit`.
+
+    Hooks run as usual, but a failure part-way leaves the earlier commits in place.
+    When any spec carries partial patches every commit records the index: the
+    paths the specs touch are reset to HEAD first, and changes staged for any
+    other path are set aside and staged again once the commits are written.
+    Otherwise each commit is limited to its paths.
+
+    Returns:
+        The new commit ids, oldest first
+
+    Raises:
+        subprocess.CalledProcessError: if any git step fails
+    """
+    index_commits = any(spec.patches for spec in specs)
+    if not index_commits:
+        return await _commit_specs(workspace_root, specs, index_commits)
+
+    touched = sorted({p for spec in specs for p in spec.paths} | set(_patched_paths(specs)))
+    staged = (
+        await _git(["diff", "--cached", "--no-renames", "--name-only", "-z"], workspace_root)
+    ).split("\0")
+    others = sorted({p for p in staged if p} - set(touched))
+    # --literal-pathspecs: these are file names, not globs
+    set_aside = ""
+    if others:
+        set_aside = await _git(
+            ["--literal-pathspecs", "diff", "--cached", "--no-renames", "--binary", "--", *others],
+            workspace_root,
+        )
+    reset = touched + others
+    if reset:
+        await _git(["--literal-pathspecs", "reset", "-q", "--", *reset], workspace_root)
+    try:
+        return await _commit_specs(workspace_root, specs, index_commits)
+    finally:
+        if set_aside:
+            await _git(
+                ["apply", "--cached", "--binary", "--whitespace=nowarn", "-"],
+                workspace_root,
+                input=set_aside,
+            )
+
+
+async def _commit_specs(
+    workspace_root: str, specs: List[CommitSpec], index_commits: bool
+) -> List[str]:
+    commits: List[str] = []
+    for spec in specs:
+        if spec.paths:
+            # Not `git add`: it rejects paths gone from both the worktree and
+            # the index, like the old side of a staged rename
+            await _git(["update-index", "--add", "--remove", "--", *spec.paths], workspace_root)
+        for patch in spec.patches:
+            await _git(
+                ["apply", "--cached", "--whitespace=nowarn", "-"],
+                workspace_root,
+                input=patch,
+            )
+        pathspec = [] if index_commits else ["--", *spec.paths]
+        await _git(["commit", "-m", spec.message, *pathspec], workspace_root)
+        commits.append((await _git(["rev-parse", "HEAD"], workspace_root)).strip())
+    return commits
+
+
+__all__ = [
+    "CommitSpec",
+    "write_commits_plumbing",
+    "write_commits_porcelain",
+]
@@ -0,0 +1,217 @@
+import os
+import re
+import fnmatch
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.core.env import env_int
+from src.kite_exclusive.commit_splitter.git_diff import FileDiff, Hunk
+
+# Prompt token budget unless GLIDE_PROMPT_TOKEN_BUDGET sets one
+DEFAULT_TOKEN_BUDGET = 6000
+
+# Files whose contents say little about intent; only their stats are sent
+GENERATED_PATTERNS = (
+    "*.lock",
+    "*-lock.json",
+    "*-lock.yaml",
+    "*.lockb",
+    "go.sum",
+    "*.min.js",
+    "*.min.css",
+    "*.map",
+    "*.pb.go",
+    "*_pb2.py",
+    "*.snap",
+    "*.svg",
+)
+# Files with more changed lines than this are summarized as stats
+MAX_CHANGED_LINES = 2000
+# Below this much remaining budget, hunks are counted instead of truncated
+MIN_PARTIAL_HUNK_TOKENS = 200
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SIGNATURE_RE = re.compile(
+    r"^\s*(?:export\s+|pub(?:\(\w+\))?\s+|async\s+|static\s+|public\s+|private\s+|protected\s+)*"
+    r"(?:def|class|function|fn|func|interface|struct|enum|trait|impl|module|QUERY|type)\b"
+)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate LLM token count: one token per identifier/number run and per
+    punctuation character. Tracks BPE tokenizers closely enough for budgeting
+    code without shipping a model-specific tokenizer.
+    """
+    return len(_TOKEN_RE.findall(text))
+
+
+@dataclass
+class CompactedDiff:
+    path: str
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+
+    @property
+    def saved_tokens(self) -> int:
+        return self.original_tokens - self.compacted_tokens
+
+
+def is_generated(path: str) -> bool:
+    name = os.path.basename(path)
+    return any(fnmatch.fnmatch(name, pattern) for pattern in GENERATED_PATTERNS)
+
+
+def _is_whitespace_only(hunk: Hunk) -> bool:
+    removed = "".join("".join(l[1:].split()) for l in hunk.lines if l.startswith("-"))
+    added = "".join("".join(l[1:].split()) for l in hunk.lines if l.startswith("+"))
+    return removed == added
+
+
+def _stats_summary(file_diff: FileDiff, reason: str) -> str:
+    return (
+        f"diff --git a/{file_diff.path} b/{file_diff.path}\n"
+        f"[{reason}: {file_diff.status}, {len(file_diff.hunks)} hunks, "
+        f"+{file_diff.additions} -{file_diff.deletions} lines; contents omitted]\n"
+    )
+
+
+def _compact_hunk(hunk: Hunk) -> List[str]:
+    """Keep changed lines and signature-like context; collapse the rest."""
+    out = [hunk.header]
+    skipped = 0
+    for line in hunk.lines:
+        if line.startswith(("+", "-", "\\")) or _SIGNATURE_RE.match(line[1:]):
+            if skipped:
+                out.append(f" ... ({skipped} context lines)")
+                skipped = 0
+            out.append(line)
+        else:
+            skipped += 1
+    if skipped:
+        out.append(f" ... ({skipped} context lines)")
+    return out
+
+
+def token_budget() -> int:
+    """
+    Prompt token budget: GLIDE_PROMPT_TOKEN_BUDGET or DEFAULT_TOKEN_BUDGET.
+
+    Read on every call rather than at import, so a value loaded from .env
+    after this module was imported still applies.
+    """
+    return env_int("GLIDE_PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+
+
+def compact_diff(file_diff: FileDiff, budget: Optional[int] = None) -> CompactedDiff:
+    """
+    Shrink one file's diff for a commit-message prompt.
+
+    Generated files and huge diffs are reduced to stats and whitespace-only
+    hunks are dropped. If the diff is still over budget, context lines are
+    collapsed (keeping signatures) and hunks that do not fit are truncated or
+    replaced by a count of what was omitted. `budget` defaults to token_budget().
+    """
+    if budget is None:
+        budget = token_budget()
+    original = file_diff.text
+    original_tokens = count_tokens(original)
+    hunks = [h for h in file_diff.hunks if not _is_whitespace_only(h)]
+    dropped_ws = len(file_diff.hunks) - len(hunks)
+
+    if is_generated(file_diff.path):
+        text = _stats_summary(file_diff, "generated file")
+    elif file_diff.additions + file_diff.deletions > MAX_CHANGED_LINES:
+        text = _stats_summary(file_diff, "large change")
+    elif not dropped_ws and original_tokens <= budget:
+        text = original
+    else:
+        header = [l for l in file_diff.header if not l.startswith("index ")]
+        lines = list(header)
+        used = count_tokens("\n".join(lines))
+        over_budget = used + sum(count_tokens(h.text) for h in hunks) > budget
+        omitted: List[Hunk] = []
+        for hunk in hunks:
+            kept_lines = _compact_hunk(hunk) if over_budget else [hunk.header, *hunk.lines]
+            cost = count_tokens("\n".join(kept_lines))
+            if used + cost <= budget:
+                lines.extend(kept_lines)
+                used += cost
+            elif budget - used >= MIN_PARTIAL_HUNK_TOKENS:
+                # Keep the leading lines of a hunk that does not fit whole
+                kept = 0
+                for line in kept_lines:
+                    line_cost = count_tokens(line) + 1
+                    if used + line_cost > budget:
+                        break
+                    lines.append(line)
+                    used += line_cost
+                    kept += 1
+                lines.append(f" ... (hunk truncated, {len(kept_lines) - kept} lines omitted)")
+            else:
+                omitted.append(hunk)
+        if dropped_ws:
+            lines.append(f"[{dropped_ws} whitespace-only hunks omitted]")
+        if omitted:
+            lines.append(
+                f"[{len(omitted)} hunks omitted: "
+                f"+{sum(h.additions for h in omitted)} -{sum(h.deletions for h in omitted)} lines]"
+            )
+        text = "\n".join(lines) + "\n"
+
+    return CompactedDiff(
+        path=file_diff.path,
+        text=text,
+        original_tokens=original_tokens,
+        compacted_tokens=count_tokens(text),
+    )
+
+
+def compact_diffs(
+    file_diffs: Sequence[FileDiff],
+    budget: Optional[int] = None,
+) -> List[CompactedDiff]:
+    """
+    Compact the diffs that make up one prompt so that together they fit `budget`.
+
+    Each diff gets an equal share; shares left unused by small diffs are passed
+    on to the following ones. `budget` defaults to token_budget().
+    """
+    if budget is None:
+        budget = token_budget()
+    results: List[CompactedDiff] = []
+    remaining = budget
+    for i, file_diff in enumerate(file_diffs):
+        share = max(remaining // (len(file_diffs) - i), 1)
+        compacted = compact_diff(file_diff, share)
+        remaining -= min(compacted.compacted_tokens, share)
+        results.append(compacted)
+    return results
+
+
+def savings_report(compacted: Dict[str, CompactedDiff]) -> Dict[str, Any]:
+    """Per-unit token counts before and after compaction, plus the total saved."""
+    return {
+        "saved_tokens": sum(c.saved_tokens for c in compacted.values()),
+        "files": {
+            unit: {
+                "original_tokens": c.original_tokens,
+                "compacted_tokens": c.compacted_tokens,
+                "saved_tokens": c.saved_tokens,
+            }
+            for unit, c in compacted.items()
+        },
+    }
+
+
+__all__ = [
+    "DEFAULT_TOKEN_BUDGET",
+    "token_budget",
+    "CompactedDiff",
+    "count_tokens",
+    "is_generated",
+    "compact_diff",
+    "compact_diffs",
+    "savings_report",
+]
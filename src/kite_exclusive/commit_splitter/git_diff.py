@@ -0,0 +1,399 @@
+import os
+import re
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Flags that keep `git diff` output machine-parseable regardless of user config
+_DIFF_FLAGS = ["--no-color", "--no-ext-diff", "--src-prefix=a/", "--dst-prefix=b/"]
+
+_HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@(.*)$")
+_DIFF_HEADER_RE = re.compile(r'^diff --git (?:"?a/)(.*?)"? (?:"?b/)(.*?)"?$')
+_ESCAPES = {"n": "\n", "t": "\t", '"': '"', "\\": "\\", "a": "\a", "b": "\b", "f": "\f", "r": "\r", "v": "\v"}
+
+
+@dataclass
+class Hunk:
+    """A single `@@` hunk of a unified diff."""
+
+    header: str
+    old_start: int
+    old_lines: int
+    new_start: int
+    new_lines: int
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def additions(self) -> int:
+        return sum(1 for line in self.lines if line.startswith("+"))
+
+    @property
+    def deletions(self) -> int:
+        return sum(1 for line in self.lines if line.startswith("-"))
+
+    @property
+    def text(self) -> str:
+        return "\n".join([self.header, *self.lines]) + "\n"
+
+
+@dataclass
+class FileDiff:
+    """
+    Per-file record parsed out of a combined unified diff.
+
+    status is one of: added, deleted, modified, renamed, copied, untracked.
+    staged is True when the record came from `git diff --cached`.
+    """
+
+    path: str
+    status: str
+    old_path: Optional[str] = None
+    header: List[str] = field(default_factory=list)
+    hunks: List[Hunk] = field(default_factory=list)
+    binary: bool = False
+    staged: bool = False
+
+    @property
+    def additions(self) -> int:
+        return sum(h.additions for h in self.hunks)
+
+    @property
+    def deletions(self) -> int:
+        return sum(h.deletions for h in self.hunks)
+
+    @property
+    def text(self) -> str:
+        """The file's diff rendered back to unified diff text."""
+        out = "\n".join(self.header) + "\n"
+        return out + "".join(h.text for h in self.hunks)
+
+    @property
+    def splittable(self) -> bool:
+        """Whether the diff can be committed hunk by hunk with `git apply --cached`."""
+        return self.status == "modified" and not self.binary and len(self.hunks) > 1
+
+    def hunk_text(self, index: int) -> str:
+        """A standalone diff containing only one hunk."""
+        return "\n".join(self.header) + "\n" + self.hunks[index].text
+
+    def partial_patch(self, indices: Iterable[int], applied: Iterable[int] = ()) -> str:
+        """
+        Render a patch with only the selected hunks, for `git apply --cached`.
+
+        Hunk headers are rebased onto a pre-image that already contains the
+        `applied` hunks, so a file's hunks can be spread over several commits.
+        """
+        selected = sorted(set(indices))
+        applied = set(applied)
+        lines = list(self.header)
+        delta_in_patch = 0
+        for i in selected:
+            hunk = self.hunks[i]
+            shift = sum(
+                self.hunks[j].new_lines - self.hunks[j].old_lines for j in applied if j < i
+            )
+            old_start = hunk.old_start + shift
+            new_start = old_start + delta_in_patch
+            # Pure insertions/deletions anchor on the line before, see `diff -u`
+            if hunk.old_lines == 0 and hunk.new_lines > 0:
+                new_start += 1
+            elif hunk.new_lines == 0 and hunk.old_lines > 0:
+                new_start -= 1
+            section = _HUNK_HEADER_RE.match(hunk.header).group(5)
+            lines.append(
+                f"@@ -{old_start},{hunk.old_lines} +{new_start},{hunk.new_lines} @@{section}"
+            )
+            lines.extend(hunk.lines)
+            delta_in_patch += hunk.new_lines - hunk.old_lines
+        return "\n".join(lines) + "\n"
+
+
+def _unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of paths with special characters."""
+    if len(path) < 2 or not (path.startswith('"') and path.endswith('"')):
+        return path
+    body = path[1:-1]
+    out = bytearray()
+    i = 0
+    while i < len(body):
+        ch = body[i]
+        if ch == "\\" and i + 1 < len(body):
+            nxt = body[i + 1]
+            if nxt in "01234567" and i + 4 <= len(body):
+                out.append(int(body[i + 1 : i + 4], 8))
+                i += 4
+                continue
+            out.extend(_ESCAPES.get(nxt, nxt).encode("utf-8"))
+            i += 2
+            continue
+        out.extend(ch.encode("utf-8"))
+        i += 1
+    return out.decode("utf-8", errors="replace")
+
+
+def _strip_prefix(path: str) -> Optional[str]:
+    path = _unquote_path(path.split("\t", 1)[0])
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+def iter_hunks(lines: Iterable[str]) -> Iterator[Hunk]:
+    """
+    Lazily split the body of a single-file diff into hunks.
+
+    Lines before the first `@@` header are ignored, so this can be fed the
+    whole file block or just its body. Only one hunk is held at a time.
+    """
+    current: Optional[Hunk] = None
+    for line in lines:
+        hm = _HUNK_HEADER_RE.match(line)
+        if hm:
+            if current is not None:
+                yield current
+            current = Hunk(
+                header=line,
+                old_start=int(hm.group(1)),
+                old_lines=int(hm.group(2)) if hm.group(2) is not None else 1,
+                new_start=int(hm.group(3)),
+                new_lines=int(hm.group(4)) if hm.group(4) is not None else 1,
+            )
+        elif current is not None:
+            current.lines.append(line)
+    if current is not None:
+        yield current
+
+
+def _parse_file_block(lines: List[str], staged: bool) -> FileDiff:
+    header: List[str] = []
+    hunks: List[Hunk] = []
+    status = "modified"
+    old_path: Optional[str] = None
+    new_path: Optional[str] = None
+    binary = False
+
+    m = _DIFF_HEADER_RE.match(lines[0])
+    if m:
+        old_path, new_path = m.group(1), m.group(2)
+
+    i = 0
+    while i < len(lines) and not lines[i].startswith("@@"):
+        line = lines[i]
+        header.append(line)
+        if line.startswith("new file mode"):
+            status = "added"
+        elif line.startswith("deleted file mode"):
+            status = "deleted"
+        elif line.startswith("rename from "):
+            status = "renamed"
+            old_path = _unquote_path(line[len("rename from ") :])
+        elif line.startswith("rename to "):
+            new_path = _unquote_path(line[len("rename to ") :])
+        elif line.startswith("copy from "):
+            status = "copied"
+            old_path = _unquote_path(line[len("copy from ") :])
+        elif line.startswith("copy to "):
+            new_path = _unquote_path(line[len("copy to ") :])
+        elif line.startswith("--- "):
+            old_path = _strip_prefix(line[4:]) or old_path
+        elif line.startswith("+++ "):
+            new_path = _strip_prefix(line[4:]) or new_path
+        elif line.startswith("Binary files ") or line == "GIT binary patch":
+            binary = True
+        i += 1
+
+    hunks = list(iter_hunks(itertools.islice(lines, i, None)))
+
+    path = new_path if status != "deleted" else old_path
+    return FileDiff(
+        path=path or old_path or "",
+        status=status,
+        old_path=old_path if status in ("renamed", "copied") else None,
+        header=header,
+        hunks=hunks,
+        binary=binary,
+        staged=staged,
+    )
+
+
+def parse_unified_diff(diff_text: str, *, staged: bool = False) -> List[FileDiff]:
+    """
+    Parse the output of `git diff` covering many files into per-file records.
+
+    Args:
+        diff_text: Combined unified diff as produced by `git diff`
+        staged: Whether the diff came from the index (`--cached`)
+
+    Returns:
+        One FileDiff per `diff --git` block, in output order
+    """
+    if not diff_text:
+        return []
+    lines = diff_text.split("\n")
+    if lines and lines[-1] == "":
+        lines.pop()
+
+    records: List[FileDiff] = []
+    block: List[str] = []
+    for line in lines:
+        if line.startswith("diff --git ") and block:
+            records.append(_parse_file_block(block, staged))
+            block = []
+        if block or line.startswith("diff --git "):
+            block.append(line)
+    if block:
+        records.append(_parse_file_block(block, staged))
+    return records
+
+
+def untracked_file_diff(workspace_root: str, path: str) -> Optional[FileDiff]:
+    """Build a new-file diff for an untracked path, or None if it is unreadable."""
+    full_path = os.path.join(workspace_root, path) if not os.path.isabs(path) else path
+    try:
+        with open(full_path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except (FileNotFoundError, IsADirectoryError, UnicodeDecodeError):
+        return None
+
+    body = content.split("\n")
+    if body and body[-1] == "":
+        body.pop()
+    hunks = []
+    if body:
+        hunks.append(
+            Hunk(
+                header=f"@@ -0,0 +1,{len(body)} @@",
+                old_start=0,
+                old_lines=0,
+                new_start=1,
+                new_lines=len(body),
+                lines=["+" + line for line in body],
+            )
+        )
+        if not content.endswith("\n"):
+            hunks[0].lines.append("\\ No newline at end of file")
+    return FileDiff(
+        path=path,
+        status="untracked",
+        header=[
+            f"diff --git a/{path} b/{path}",
+            "new file mode 100644",
+            "--- /dev/null",
+            f"+++ b/{path}",
+        ],
+        hunks=hunks,
+    )
+
+
+async def _git(args: List[str], cwd: str) -> Tuple[int, str, str]:
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        *args,
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout_data, stderr_data = await process.communicate()
+    return (
+        process.returncode,
+        stdout_data.decode("utf-8", errors="replace"),
+        stderr_data.decode("utf-8", errors="replace"),
+    )
+
+
+async def collect_file_diffs(workspace_root: str) -> Dict[str, FileDiff]:
+    """
+    Collect per-file diffs for every changed path with three git invocations:
+    one `git diff --cached`, one `git diff` and one untracked-file listing.
+
+    Staged changes win over unstaged ones for the same path, matching the order
+    in which the per-file lookups used to be tried.
+
+    Args:
+        workspace_root: Path to the git repository root
+
+    Returns:
+        Mapping of path -> FileDiff, sorted by path
+
+    Raises:
+        RuntimeError: if git fails for the staged diff (e.g. not a repository)
+    """
+    (staged_rc, staged_out, staged_err), (unstaged_rc, unstaged_out, _), (
+        untracked_rc,
+        untracked_out,
+        _,
+    ) = await asyncio.gather(
+        _git(["diff", "--cached", *_DIFF_FLAGS], workspace_root),
+        _git(["diff", *_DIFF_FLAGS], workspace_root),
+        _git(["ls-files", "--others", "--exclude-standard", "-z"], workspace_root),
+    )
+    if staged_rc != 0:
+        raise RuntimeError(staged_err.strip() or f"git diff --cached exited with {staged_rc}")
+
+    file_diffs: Dict[str, FileDiff] = {}
+    for record in parse_unified_diff(staged_out, staged=True):
+        file_diffs.setdefault(record.path, record)
+    if unstaged_rc == 0:
+        for record in parse_unified_diff(unstaged_out):
+            file_diffs.setdefault(record.path, record)
+    if untracked_rc == 0:
+        for path in untracked_out.split("\0"):
+            if path and path not in file_diffs:
+                record = untracked_file_diff(workspace_root, path)
+                if record is not None:
+                    file_diffs[path] = record
+
+    return dict(sorted(file_diffs.items()))
+
+
+async def ancestor_commits(
+    workspace_root: str,
+    commit_ids: Iterable[str],
+    rev: str = "HEAD",
+) -> Set[str]:
+    """
+    The subset of commit_ids that are ancestors of (or equal to) rev.
+
+    One `git rev-list rev` walk, stopped as soon as every candidate has been
+    seen. Commits unknown to the local repository are not ancestors.
+    """
+    wanted = {c for c in commit_ids if c}
+    if not wanted:
+        return set()
+    process = await asyncio.create_subprocess_exec(
+        "git",
+        "rev-list",
+        rev,
+        cwd=workspace_root,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    found: Set[str] = set()
+    try:
+        async for line in process.stdout:
+            commit_id = line.decode("ascii", errors="replace").strip()
+            if commit_id in wanted:
+                found.add(commit_id)
+                if len(found) == len(wanted):
+                    break
+    finally:
+        if process.returncode is None:
+            process.kill()
+        await process.wait()
+    return found
+
+
+__all__ = [
+    "Hunk",
+    "FileDiff",
+    "iter_hunks",
+    "parse_unified_diff",
+    "untracked_file_diff",
+    "collect_file_diffs",
+    "ancestor_commits",
+]
@@ -0,0 +1,114 @@
+import posixpath
+from typing import List, Optional, Sequence
+import numpy as np
+
+# Similarity threshold used when hunks are grouped without an explicit one
+DEFAULT_HUNK_THRESHOLD = 0.8
+
+
+def cosine_similarity_matrix(vectors: Sequence[Sequence[float]]) -> np.ndarray:
+    """Pairwise cosine similarity of row vectors."""
+    mat = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    mat = mat / np.maximum(norms, 1e-12)
+    return mat @ mat.T
+
+
+def path_proximity_matrix(paths: Sequence[str]) -> np.ndarray:
+    """
+    Pairwise path proximity in [0, 1]: shared leading directories over the
+    deeper of the two directory depths. Files in the same directory score 1.
+    """
+    dirs = [[p for p in posixpath.dirname(path).split("/") if p] for path in paths]
+    n = len(dirs)
+    prox = np.ones((n, n), dtype=np.float32)
+    for i in range(n):
+        for j in range(i + 1, n):
+            a, b = dirs[i], dirs[j]
+            depth = max(len(a), len(b))
+            if depth == 0:
+                continue
+            shared = 0
+            for x, y in zip(a, b):
+                if x != y:
+                    break
+                shared += 1
+            prox[i, j] = prox[j, i] = shared / depth
+    return prox
+
+
+def cluster_by_similarity(similarity: np.ndarray, threshold: float) -> List[List[int]]:
+    """
+    Average-linkage agglomerative clustering.
+
+    Repeatedly merges the two most similar clusters until no pair has an
+    average similarity of at least `threshold`.
+
+    Returns:
+        Clusters as sorted index lists, ordered by their smallest index
+    """
+    n = similarity.shape[0]
+    sim = similarity.astype(np.float64, copy=True)
+    np.fill_diagonal(sim, -np.inf)
+    sizes = np.ones(n)
+    members = {i: [i] for i in range(n)}
+
+    while len(members) > 1:
+        flat = int(np.argmax(sim))
+        a, b = divmod(flat, n)
+        if sim[a, b] < threshold:
+            break
+        if b < a:
+            a, b = b, a
+        # Lance-Williams update for average linkage; b is merged into a
+        merged = (sizes[a] * sim[a] + sizes[b] * sim[b]) / (sizes[a] + sizes[b])
+        sim[a] = merged
+        sim[:, a] = merged
+        sim[a, a] = -np.inf
+        sim[b] = -np.inf
+        sim[:, b] = -np.inf
+        sizes[a] += sizes[b]
+        members[a].extend(members.pop(b))
+
+    return sorted((sorted(m) for m in members.values()), key=lambda m: m[0])
+
+
+def group_files(
+    paths: Sequence[str],
+    vectors: Sequence[Sequence[float]],
+    threshold: float,
+    path_weight: float = 0.0,
+    file_paths: Optional[Sequence[str]] = None,
+) -> List[List[str]]:
+    """
+    Cluster changed files into commit groups from their diff embeddings.
+
+    Args:
+        paths: File paths (or other unit ids, e.g. single hunks), one per vector
+        vectors: Diff embeddings
+        threshold: Minimum average similarity for two groups to be merged
+        path_weight: Weight in [0, 1] given to directory proximity versus
+                     embedding similarity
+        file_paths: File path of each unit for directory proximity, when
+                    `paths` are not plain file paths; defaults to `paths`
+
+    Returns:
+        Groups of paths; groups and the paths inside them keep input order
+    """
+    if not paths:
+        return []
+    similarity = cosine_similarity_matrix(vectors)
+    if path_weight > 0:
+        similarity = (1 - path_weight) * similarity + path_weight * path_proximity_matrix(
+            file_paths if file_paths is not None else paths
+        )
+    return [[paths[i] for i in cluster] for cluster in cluster_by_similarity(similarity, threshold)]
+
+
+__all__ = [
+    "DEFAULT_HUNK_THRESHOLD",
+    "cosine_similarity_matrix",
+    "path_proximity_matrix",
+    "cluster_by_similarity",
+    "group_files",
+]
@@ -0,0 +1,756 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import hashlib
+import itertools
+import threading
+import subprocess
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.kite_exclusive.commit_splitter.compaction import compact_diff
+from src.kite_exclusive.commit_splitter.git_diff import _DIFF_FLAGS, parse_unified_diff
+from src.kite_exclusive.commit_splitter.languages import language_for_path
+from src.kite_exclusive.commit_splitter.services.embedding_service import get_embedding_service
+from src.kite_exclusive.commit_splitter.services.helix_service import (
+    get_helix_client,
+    insert_batch,
+    iter_row_batches,
+    lookup_rows,
+)
+from src.kite_exclusive.commit_splitter.services.ingest_state import IngestState, get_ingest_state
+from src.kite_exclusive.commit_splitter.services.vector_codec import wire_dtype, wire_vector
+
+# Diff lines kept per file; longer diffs are truncated (counts stay exact)
+MAX_FILE_DIFF_LINES = 4000
+# Token budget of the stored per-diff summary shown as a retrieval example
+SUMMARY_TOKENS = 400
+
+_COMMIT_START = "\x1e"
+_FIELD_SEP = "\x1f"
+_COMMIT_END = "\x1d"
+_LOG_FORMAT = "%x1e%H%x1f%h%x1f%P%x1f%an <%ae>%x1f%cI%x1f%B%x1d"
+
+
+@dataclass
+class DiffRecord:
+    """One file's change within a historical commit."""
+
+    path: str
+    kind: str
+    additions: int
+    deletions: int
+    text: str
+    summary: str
+
+
+@dataclass
+class CommitRecord:
+    commit_id: str
+    short_id: str
+    parents: List[str]
+    author: str
+    committed_at: str
+    message: str
+    diffs: List[DiffRecord] = field(default_factory=list)
+
+    @property
+    def is_merge(self) -> bool:
+        return len(self.parents) > 1
+
+    @property
+    def subject(self) -> str:
+        """First line of the message; the copy stored with each diff vector."""
+        return self.message.split("\n", 1)[0]
+
+
+@dataclass
+class IngestStats:
+    commits: int = 0
+    skipped: int = 0
+    diffs: int = 0
+    files: int = 0
+    failed_rows: int = 0
+    seconds: float = 0.0
+
+    @property
+    def commits_per_s(self) -> float:
+        return self.commits / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "commits": self.commits,
+            "skipped": self.skipped,
+            "diffs": self.diffs,
+            "files": self.files,
+            "failed_rows": self.failed_rows,
+            "seconds": round(self.seconds, 2),
+            "commits_per_s": round(self.commits_per_s, 2),
+        }
+
+
+def _diff_id(commit: CommitRecord, diff: DiffRecord) -> str:
+    return f"{commit.commit_id}:{diff.path}"
+
+
+def _file_record(block: List[str], additions: int, deletions: int) -> Optional[DiffRecord]:
+    while block and not block[-1]:
+        block.pop()
+    parsed = parse_unified_diff("\n".join(block))
+    if not parsed:
+        return None
+    file_diff = parsed[0]
+    return DiffRecord(
+        path=file_diff.path,
+        kind=file_diff.status,
+        additions=additions,
+        deletions=deletions,
+        text=file_diff.text,
+        summary=compact_diff(file_diff, SUMMARY_TOKENS).text,
+    )
+
+
+def iter_commits(
+    workspace_root: str,
+    rev: str = "HEAD",
+    exclude: Sequence[str] = (),
+) -> Iterator[CommitRecord]:
+    """
+    Stream the history reachable from `rev` but not from any commit in
+    `exclude`, oldest first (parents before children), one commit at a time.
+
+    Runs a single `git log --patch` and parses it line by line, so memory use
+    depends on the largest commit (each file capped at MAX_FILE_DIFF_LINES),
+    not on the length of the history. Merge commits carry no diffs.
+
+    Raises:
+        RuntimeError: if git exits with an error
+    """
+    process = subprocess.Popen(
+        [
+            "git",
+            "-c",
+            "core.quotepath=false",
+            "log",
+            "--reverse",
+            "--topo-order",
+            "-M",
+            "--patch",
+            *_DIFF_FLAGS,
+            f"--format={_LOG_FORMAT}",
+            rev,
+            *(["--not", *exclude] if exclude else []),
+            "--",
+        ],
+        cwd=workspace_root,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+    )
+    commit: Optional[CommitRecord] = None
+    header: List[str] = []
+    block: List[str] = []
+    additions = deletions = 0
+    in_hunks = False
+
+    def flush_block() -> None:
+        nonlocal block, additions, deletions, in_hunks
+        if commit is not None and block:
+            record = _file_record(block, additions, deletions)
+            if record is not None:
+                commit.diffs.append(record)
+        block, additions, deletions, in_hunks = [], 0, 0, False
+
+    try:
+        for raw in process.stdout:
+            line = raw.rstrip("\n")
+            if header or line.startswith(_COMMIT_START):
+                header.append(line.lstrip(_COMMIT_START) if not header else line)
+                if _COMMIT_END not in line:
+                    continue
+                flush_block()
+                if commit is not None:
+                    yield commit
+                commit_id, short_id, parents, author, committed_at, message = (
+                    "\n".join(header).split(_COMMIT_END)[0].split(_FIELD_SEP, 5)
+                )
+                commit = CommitRecord(
+                    commit_id=commit_id,
+                    short_id=short_id,
+                    parents=parents.split(),
+                    author=author,
+                    committed_at=committed_at,
+                    message=message.strip(),
+                )
+                header = []
+            elif line.startswith("diff --git "):
+                flush_block()
+                block.append(line)
+            elif block:
+                if line.startswith("@@"):
+                    in_hunks = True
+                elif in_hunks and line.startswith("+"):
+                    additions += 1
+                elif in_hunks and line.startswith("-"):
+                    deletions += 1
+                if len(block) < MAX_FILE_DIFF_LINES:
+                    block.append(line)
+        flush_block()
+        if commit is not None:
+            yield commit
+    finally:
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode != 0:
+        raise RuntimeError(f"git log failed: {stderr.strip()}")
+
+
+def _git_out(args: List[str], cwd: str) -> str:
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    return result.stdout.strip() if result.returncode == 0 else ""
+
+
+def repository_id(workspace_root: str, rev: str = "HEAD") -> str:
+    """Stable repository id: the oldest root commit, so clones share one id."""
+    roots = _git_out(["rev-list", "--max-parents=0", rev], workspace_root).split()
+    if roots:
+        return sorted(roots)[0]
+    return hashlib.sha256(os.path.abspath(workspace_root).encode("utf-8")).hexdigest()
+
+
+def existing_commits(workspace_root: str, commit_ids: Sequence[str]) -> List[str]:
+    """Drop ids that no longer resolve to a commit (e.g. rewritten history that was gc'd)."""
+    if not commit_ids:
+        return []
+    result = subprocess.run(
+        ["git", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+        cwd=workspace_root,
+        input="\n".join(commit_ids) + "\n",
+        capture_output=True,
+        text=True,
+    )
+    return [
+        line.split()[0]
+        for line in result.stdout.splitlines()
+        if line.endswith(" commit")
+    ]
+
+
+def branch_identity(workspace_root: str, branch: Optional[str] = None) -> Tuple[str, str, str]:
+    """(repo_id, branch name, branch_id) for a repository; branch defaults to the current one."""
+    repo_id = repository_id(workspace_root)
+    branch = branch or _git_out(["rev-parse", "--abbrev-ref", "HEAD"], workspace_root) or "HEAD"
+    return repo_id, branch, f"{repo_id}:{branch}"
+
+
+def file_language(path: str) -> str:
+    return language_for_path(path) or "text"
+
+
+# Single-row insert query -> (batched variant, name of its array parameter)
+_BATCH_QUERIES = {
+    "createCommit": ("createCommitsBatch", "commits"),
+    "createFile": ("createFilesBatch", "files"),
+    "linkParentCommit": ("linkParentCommitsBatch", "links"),
+    "createDiff": ("createDiffsBatch", "diffs"),
+}
+
+
+class _Loader:
+    """
+    Sends Helix insert queries with at most `concurrency` requests in flight.
+
+    When batching is on, rows for queries with a batched variant are grouped
+    by iter_row_batches and sent as one request per batch. If the instance
+    answers 404 for a batched query it does not have it deployed; that
+    batch and every later row for the query are sent one by one. Any other
+    failed batch counts all of its rows as failed, since retrying row by row
+    could duplicate whatever part was applied.
+    """
+
+    def __init__(self, db: Any, concurrency: int, stats: IngestStats, batched: bool = True):
+        self.db = db
+        self.stats = stats
+        self.batched = batched
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._batch_missing: Set[str] = set()
+
+    async def _send(self, query: str, payload: Dict[str, Any]) -> None:
+        async with self.semaphore:
+            try:
+                responses = await asyncio.to_thread(self.db.query, query, payload)
+            except Exception:
+                responses = None
+        if not responses or responses[0] is None:
+            self.stats.failed_rows += 1
+
+    async def _send_batch(self, query: str, batch_query: str, key: str, rows: List[Dict[str, Any]]) -> None:
+        async with self.semaphore:
+            try:
+                status = await asyncio.to_thread(insert_batch, self.db, batch_query, key, rows)
+            except Exception:
+                status = 0
+        if status == 404:
+            self._batch_missing.add(batch_query)
+            await asyncio.gather(*(self._send(query, row) for row in rows))
+        elif status != 200:
+            self.stats.failed_rows += len(rows)
+
+    async def run(self, query: str, payloads: List[Dict[str, Any]]) -> None:
+        batch = _BATCH_QUERIES.get(query) if self.batched else None
+        if batch and batch[0] not in self._batch_missing:
+            await asyncio.gather(
+                *(self._send_batch(query, *batch, rows) for rows in iter_row_batches(payloads))
+            )
+        else:
+            await asyncio.gather(*(self._send(query, payload) for payload in payloads))
+
+    async def _lookup(self, query: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+        async with self.semaphore:
+            return await asyncio.to_thread(lookup_rows, self.db, query, payload)
+
+    async def lookup(self, query: str, payloads: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Rows per payload; a failed lookup raises RuntimeError rather than reading as "missing"."""
+        return list(await asyncio.gather(*(self._lookup(query, payload) for payload in payloads)))
+
+    async def exists(self, query: str, payloads: List[Dict[str, Any]]) -> List[bool]:
+        return [bool(rows) for rows in await self.lookup(query, payloads)]
+
+    async def known_commits(self, repo_id: str) -> Optional[Set[str]]:
+        """
+        Ids of the commits already loaded for a repository, in one request;
+        None if the instance does not answer getCommitIdsForRepo (e.g. it is
+        not deployed there), in which case commits are looked up one by one.
+        """
+        try:
+            (rows,) = await self.lookup("getCommitIdsForRepo", [{"repo_id": repo_id}])
+        except RuntimeError:
+            return None
+        return {row["commit_id"] for row in rows if row.get("commit_id")}
+
+    async def pending(
+        self, commits: List[CommitRecord], known: Optional[Set[str]] = None
+    ) -> Tuple[List[CommitRecord], Set[str]]:
+        """
+        What is left to write for `commits`, and the ids of those whose commit
+        node already exists.
+
+        A commit node can exist without all of its diffs or parent links if
+        a run stopped part-way through its batch; such a commit comes back
+        holding only the missing ones. Fully loaded commits are left out.
+
+        Args:
+            commits: One batch of commits
+            known: Commit ids already loaded (see known_commits); None looks
+                   every commit up with getCommit
+        """
+        if known is not None:
+            found = [c.commit_id in known for c in commits]
+        else:
+            found = await self.exists("getCommit", [{"commit_id": c.commit_id} for c in commits])
+        existing = [c for c, exists in zip(commits, found) if exists]
+        keys = [{"commit_id": c.commit_id} for c in existing]
+        diff_rows, parent_rows = await asyncio.gather(
+            self.lookup("getCommitDiffSummaries", keys),
+            self.lookup("getCommitParents", keys),
+        )
+        partial: Dict[str, CommitRecord] = {}
+        for commit, diffs, parents in zip(existing, diff_rows, parent_rows):
+            loaded_diffs = {row.get("diff_id") for row in diffs}
+            linked = {row.get("commit_id") for row in parents}
+            rest = replace(
+                commit,
+                parents=[p for p in commit.parents if p not in linked],
+                diffs=[d for d in commit.diffs if _diff_id(commit, d) not in loaded_diffs],
+            )
+            if rest.parents or rest.diffs:
+                partial[commit.commit_id] = rest
+        fresh = [
+            partial.get(c.commit_id, c)
+            for c, exists in zip(commits, found)
+            if not exists or c.commit_id in partial
+        ]
+        return fresh, {c.commit_id for c in existing}
+
+
+async def ingest_history(
+    workspace_root: str,
+    rev: str = "HEAD",
+    *,
+    branch: Optional[str] = None,
+    db: Any = None,
+    batch_size: int = 64,
+    concurrency: int = 8,
+    state: Optional[IngestState] = None,
+    skip_existing: bool = True,
+    batched: bool = True,
+    on_batch: Optional[Callable[[IngestStats, int], Awaitable[None]]] = None,
+) -> IngestStats:
+    """
+    Load a repository's history into the Helix graph.
+
+    Commits are streamed from `git log` in batches of `batch_size`. While one
+    batch is being written (commits and new files first, then parent links and
+    diffs with their vectors), the next one is already being embedded; at most
+    two batches are held in memory at any time. Vectors are sent in the
+    GLIDE_VECTOR_DTYPE wire format (see vector_codec.wire_dtype).
+
+    With a `state`, only commits beyond the repository's recorded watermarks
+    are read, and the branch watermark is checkpointed after every loaded
+    batch; a run that is killed resumes from its last completed batch.
+    A batch in which any row failed to load is not checkpointed: the run
+    stops with RuntimeError and the next one retries from there.
+
+    Args:
+        workspace_root: Path to the git repository root
+        rev: Revision whose history is ingested
+        branch: Branch name to record; defaults to the current branch
+        db: Helix client; defaults to get_helix_client()
+        batch_size: Commits per embedding/loading batch
+        concurrency: Max in-flight Helix requests
+        state: Watermark store for incremental runs; None ingests everything
+        skip_existing: Skip what is already in Helix: the repository's
+                       commit ids are fetched once up front, and each file
+                       not seen in this run is looked up; a commit left
+                       without some of its diffs or parent links, e.g. by a
+                       run killed part-way through a batch, gets only the
+                       missing ones
+        batched: Insert many rows per request with the *Batch queries
+        on_batch: Awaited after every loaded batch with (stats, total_commits)
+
+    Returns:
+        Counts of what was loaded and skipped, and the throughput in commits/s
+
+    Raises:
+        RuntimeError: if git fails or rows of a batch could not be loaded
+    """
+    db = db or get_helix_client()
+    stats = IngestStats()
+    loader = _Loader(db, concurrency, stats, batched)
+    started = time.perf_counter()
+    dtype = wire_dtype()
+
+    repo_id, branch, branch_id = branch_identity(workspace_root, branch)
+    exclude = existing_commits(workspace_root, state.repo_tips(repo_id)) if state else []
+    tips: Set[str] = set(exclude)
+    total = int(
+        _git_out(["rev-list", "--count", rev, *(["--not", *exclude] if exclude else [])], workspace_root)
+        or 0
+    )
+
+    (repo_exists,) = await loader.exists("getRepository", [{"repo_id": repo_id}])
+    if not repo_exists:
+        await loader.run(
+            "createRepository",
+            [{"repo_id": repo_id, "name": os.path.basename(os.path.abspath(workspace_root))}],
+        )
+    (branch_exists,) = await loader.exists("getBranch", [{"branch_id": branch_id}])
+    if not branch_exists:
+        await loader.run("createBranch", [{"repo_id": repo_id, "branch_id": branch_id, "name": branch}])
+    known: Optional[Set[str]] = None
+    if skip_existing:
+        known = await loader.known_commits(repo_id) if repo_exists else set()
+
+    commits = iter_commits(workspace_root, rev, exclude)
+    # Held while a batch is read in a worker thread, so the generator is
+    # never closed while it is running
+    commits_lock = threading.Lock()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+    service = get_embedding_service()
+
+    def read_batch() -> List[CommitRecord]:
+        with commits_lock:
+            return list(itertools.islice(commits, batch_size))
+
+    def close_commits() -> None:
+        with commits_lock:
+            commits.close()
+
+    async def produce() -> None:
+        try:
+            while True:
+                batch = await asyncio.to_thread(read_batch)
+                if not batch:
+                    break
+                fresh, existing = batch, set()
+                if skip_existing:
+                    fresh, existing = await loader.pending(batch, known)
+                diffs = [d for c in fresh for d in c.diffs]
+                embedded = await service.embed_codes([(d.text, d.path) for d in diffs]) if diffs else []
+                vectors = await asyncio.to_thread(lambda: [wire_vector(vec, dtype) for vec in embedded])
+                await queue.put((batch, fresh, existing, vectors))
+            await queue.put(None)
+        except BaseException:
+            # Failed, or cancelled by a consumer that has stopped: never block
+            # on a full queue nobody may drain. The queued batch is dropped;
+            # the run fails anyway and the watermark stays before it
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(None)
+            raise
+
+    seen_files = set()
+
+    async def load(
+        batch: List[CommitRecord],
+        fresh: List[CommitRecord],
+        existing: Set[str],
+        vectors: List[List[float]],
+    ) -> None:
+        failed_before = stats.failed_rows
+        new_files = {}
+        for commit in fresh:
+            for diff in commit.diffs:
+                file_id = f"{repo_id}:{diff.path}"
+                if file_id not in seen_files:
+                    new_files[file_id] = diff.path
+        seen_files.update(new_files)
+        if skip_existing and new_files:
+            found = await loader.exists("getFile", [{"file_id": f} for f in new_files])
+            new_files = {f: p for (f, p), exists in zip(new_files.items(), found) if not exists}
+
+        await asyncio.gather(
+            loader.run(
+                "createCommit",
+                [
+                    {
+                        "branch_id": branch_id,
+                        "commit_id": c.commit_id,
+                        "short_id": c.short_id,
+                        "author": c.author,
+                        "message": c.message,
+                        "committed_at": c.committed_at,
+                        "is_merge": c.is_merge,
+                    }
+                    for c in fresh
+                    if c.commit_id not in existing
+                ],
+            ),
+            loader.run(
+                "createFile",
+                [
+                    {"file_id": file_id, "path": path, "language": file_language(path)}
+                    for file_id, path in new_files.items()
+                ],
+            ),
+        )
+        diff_vectors = iter(vectors)
+        await asyncio.gather(
+            loader.run(
+                "linkParentCommit",
+                [
+                    {"child_commit_id": c.commit_id, "parent_commit_id": parent}
+                    for c in fresh
+                    for parent in c.parents
+                ],
+            ),
+            loader.run(
+                "createDiff",
+                [
+                    {
+                        "repo_id": repo_id,
+                        "commit_id": c.commit_id,
+                        "commit_message": c.subject,
+                        "file_id": f"{repo_id}:{d.path}",
+                        "file_path": d.path,
+                        "diff_id": _diff_id(c, d),
+                        "kind": d.kind,
+                        "additions": d.additions,
+                        "deletions": d.deletions,
+                        "summary": d.summary,
+                        "vec": next(diff_vectors),
+                    }
+                    for c in fresh
+                    for d in c.diffs
+                ],
+            ),
+        )
+
+        failed = stats.failed_rows - failed_before
+        if failed:
+            # Checkpointing now would move the watermark past the failed rows
+            raise RuntimeError(
+                f"{failed} Helix rows failed to load in the batch ending at {batch[-1].short_id}; "
+                "the watermark was left at the last complete batch"
+            )
+
+        # Parents come before children, so the batch's childless commits now
+        # cover everything ingested so far
+        tips.update(c.commit_id for c in batch)
+        tips.difference_update(p for c in batch for p in c.parents)
+        if state is not None:
+            await asyncio.to_thread(state.checkpoint, repo_id, branch_id, tips, len(fresh))
+
+        stats.commits += len(fresh)
+        stats.skipped += len(batch) - len(fresh)
+        stats.diffs += sum(len(c.diffs) for c in fresh)
+        stats.files += len(new_files)
+        stats.seconds = time.perf_counter() - started
+        if on_batch is not None:
+            await on_batch(stats, total)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await queue.get()) is not None:
+            await load(*item)
+        await producer
+    finally:
+        if not producer.done():
+            producer.cancel()
+        # Ends the `git log` child, which may still be streaming
+        await asyncio.to_thread(close_commits)
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+async def ingest_incremental(
+    workspace_root: str,
+    *,
+    branch: Optional[str] = None,
+    state: Optional[IngestState] = None,
+    **kwargs: Any,
+) -> Optional[IngestStats]:
+    """
+    Ingest whatever the branch gained since its watermark, one run at a time.
+
+    If another process is already ingesting the branch this returns None
+    immediately. Otherwise it repeats until a pass finds nothing new, so
+    commits made while a run was in progress are not left behind.
+
+    Args:
+        workspace_root: Path to the git repository root
+        branch: Branch name to record; defaults to the current branch
+        state: Watermark store; defaults to get_ingest_state()
+        **kwargs: Passed on to ingest_history
+
+    Returns:
+        Totals over all passes, or None if the branch was locked
+    """
+    state = state or get_ingest_state()
+    _, branch, branch_id = branch_identity(workspace_root, branch)
+    with state.exclusive(branch_id) as acquired:
+        if not acquired:
+            return None
+        totals = IngestStats()
+        while True:
+            stats = await ingest_history(
+                workspace_root, "HEAD", branch=branch, state=state, **kwargs
+            )
+            totals.commits += stats.commits
+            totals.skipped += stats.skipped
+            totals.diffs += stats.diffs
+            totals.files += stats.files
+            totals.failed_rows += stats.failed_rows
+            totals.seconds += stats.seconds
+            if stats.commits + stats.skipped == 0:
+                return totals
+
+
+_HOOK_MARKER = "# glide: incremental history ingestion"
+
+
+def install_post_commit_hook(workspace_root: str) -> str:
+    """
+    Add a post-commit hook that runs incremental ingestion in the background.
+
+    The hook only forks a detached process, so committing stays fast; that
+    process needs the usual HELIX_* / VOYAGEAI_API_KEY settings in the
+    environment git runs hooks with. An existing hook is kept and the line is
+    appended once.
+
+    Returns:
+        Path of the hook file
+    """
+    hook_path = _git_out(["rev-parse", "--git-path", "hooks/post-commit"], workspace_root)
+    if not os.path.isabs(hook_path):
+        hook_path = os.path.join(workspace_root, hook_path)
+    line = (
+        f'{_HOOK_MARKER}\n'
+        f'(cd "$(git rev-parse --show-toplevel)" && '
+        f'nohup "{sys.executable}" -P -m src.kite_exclusive.commit_splitter.ingest --quiet . '
+        f">/dev/null 2>&1 &)\n"
+    )
+    existing = ""
+    if os.path.exists(hook_path):
+        with open(hook_path, "r", encoding="utf-8") as f:
+            existing = f.read()
+    if _HOOK_MARKER not in existing:
+        os.makedirs(os.path.dirname(hook_path), exist_ok=True)
+        with open(hook_path, "w", encoding="utf-8") as f:
+            if not existing:
+                f.write("#!/bin/sh\n")
+            elif not existing.endswith("\n"):
+                existing += "\n"
+            f.write(existing + line)
+    os.chmod(hook_path, os.stat(hook_path).st_mode | 0o111)
+    return hook_path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingest a repository's git history into Helix.")
+    parser.add_argument("workspace_root", nargs="?", default=".")
+    parser.add_argument("--rev", default=None, help="ingest this revision's full history, ignoring watermarks")
+    parser.add_argument("--branch", default=None, help="branch name to record")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--full", action="store_true", help="forget the branch watermark first")
+    parser.add_argument("--no-batch", action="store_true", help="insert one row per request")
+    parser.add_argument("--install-hook", action="store_true", help="install the post-commit hook and exit")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.install_hook:
+        print(install_post_commit_hook(args.workspace_root))
+        return
+
+    async def report(stats: IngestStats, total: int) -> None:
+        if not args.quiet:
+            print(
+                f"{stats.commits + stats.skipped}/{total} commits, {stats.diffs} diffs, "
+                f"{stats.commits_per_s:.1f} commits/s",
+                file=sys.stderr,
+            )
+
+    options = dict(
+        branch=args.branch,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        batched=not args.no_batch,
+        on_batch=report,
+    )
+    if args.rev:
+        stats = asyncio.run(ingest_history(args.workspace_root, args.rev, **options))
+    else:
+        state = get_ingest_state()
+        if args.full:
+            state.reset(branch_identity(args.workspace_root, args.branch)[2])
+        stats = asyncio.run(ingest_incremental(args.workspace_root, state=state, **options))
+    if not args.quiet:
+        print(json.dumps(stats.as_dict() if stats else {"locked": True}, indent=2))
+
+
+__all__ = [
+    "CommitRecord",
+    "DiffRecord",
+    "IngestStats",
+    "iter_commits",
+    "existing_commits",
+    "repository_id",
+    "branch_identity",
+    "file_language",
+    "ingest_history",
+    "ingest_incremental",
+    "install_post_commit_hook",
+]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import posixpath
+from typing import Dict, Optional
+
+# File extension (with dot, lower case) -> chonkie code-chunker language
+EXTENSION_LANGUAGES: Dict[str, str] = {
+    ".py": "python",
+    ".js": "javascript",
+    ".ts": "typescript",
+    ".jsx": "javascript",
+    ".tsx": "typescript",
+    ".java": "java",
+    ".cpp": "cpp",
+    ".c": "c",
+    ".cs": "csharp",
+    ".go": "go",
+    ".rs": "rust",
+    ".rb": "ruby",
+    ".php": "php",
+    ".swift": "swift",
+    ".kt": "kotlin",
+    ".scala": "scala",
+    ".sh": "bash",
+    ".hx": "python",
+}
+
+
+def language_for_path(path: Optional[str]) -> Optional[str]:
+    """Code language of a file from its extension, or None for anything else."""
+    if not path:
+        return None
+    ext = posixpath.splitext(path)[1]
+    return EXTENSION_LANGUAGES.get(ext) or EXTENSION_LANGUAGES.get(ext.lower())
+
+
+__all__ = [
+    "EXTENSION_LANGUAGES",
+    "language_for_path",
+]
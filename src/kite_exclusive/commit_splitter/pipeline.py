@@ -0,0 +1,104 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Sequence, TypeVar, Union
+
+from src.core.env import env_int
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Stages of split_commit, in the order they complete
+SPLIT_STAGES = ("diffed", "embedded", "searched", "generated", "committed")
+
+
+@dataclass
+class StageLimits:
+    """
+    Maximum number of in-flight calls per backend in the split pipeline.
+
+    Defaults can be overridden with GLIDE_EMBED_CONCURRENCY,
+    GLIDE_SEARCH_CONCURRENCY and GLIDE_LLM_CONCURRENCY.
+    """
+
+    embed: int = 4
+    search: int = 8
+    llm: int = 4
+
+    @classmethod
+    def from_env(
+        cls,
+        *,
+        embed: Optional[int] = None,
+        search: Optional[int] = None,
+        llm: Optional[int] = None,
+    ) -> "StageLimits":
+        """Build limits from explicit values, falling back to env vars and defaults."""
+        defaults = cls()
+        return cls(
+            embed=max(1, embed) if embed else env_int("GLIDE_EMBED_CONCURRENCY", defaults.embed),
+            search=max(1, search) if search else env_int("GLIDE_SEARCH_CONCURRENCY", defaults.search),
+            llm=max(1, llm) if llm else env_int("GLIDE_LLM_CONCURRENCY", defaults.llm),
+        )
+
+
+class StageSemaphores:
+    """One asyncio.Semaphore per backend, created from StageLimits."""
+
+    def __init__(self, limits: StageLimits):
+        self.limits = limits
+        self.embed = asyncio.Semaphore(limits.embed)
+        self.search = asyncio.Semaphore(limits.search)
+        self.llm = asyncio.Semaphore(limits.llm)
+
+
+class StageProgress:
+    """
+    Stage-level progress reporting for a pipeline run.
+
+    Progress is reported as `stage index + fraction done` out of the number of
+    stages, with a message such as "embedded 12/40". Updates are forwarded to a
+    FastMCP Context when one is attached and are dropped otherwise; a client
+    that does not support progress never breaks the run.
+    """
+
+    def __init__(self, ctx: Optional[Any] = None, stages: Sequence[str] = SPLIT_STAGES):
+        self._ctx = ctx
+        self._stages = list(stages)
+
+    async def update(self, stage: str, done: int, total: int, detail: Optional[str] = None) -> None:
+        """Report that `done` of `total` items have finished `stage`."""
+        if self._ctx is None:
+            return
+        fraction = min(done / total, 1.0) if total else 1.0
+        message = f"{stage} {done}/{total}"
+        if detail:
+            message += f": {detail}"
+        try:
+            await self._ctx.report_progress(
+                self._stages.index(stage) + fraction, len(self._stages), message
+            )
+        except Exception:
+            pass
+
+
+async def map_ordered(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+) -> List[Union[R, BaseException]]:
+    """
+    Run worker over every item concurrently and return results in input order.
+
+    A failing item yields its exception in place of a result; it does not cancel
+    the other in-flight items. Concurrency is bounded by the semaphores the
+    worker acquires, not here.
+    """
+    return await asyncio.gather(*(worker(item) for item in items), return_exceptions=True)
+
+
+__all__ = [
+    "SPLIT_STAGES",
+    "StageLimits",
+    "StageProgress",
+    "StageSemaphores",
+    "map_ordered",
+]
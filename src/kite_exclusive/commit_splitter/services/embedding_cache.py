@@ -0,0 +1,176 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "glide", "embeddings.sqlite3"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings(last_used);
+"""
+
+
+def cache_key(text: str, chunking: str, model: str) -> str:
+    """Content address for an embedding: sha256 over (model, chunking mode, text)."""
+    h = hashlib.sha256()
+    for part in (model, chunking, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    SQLite-backed LRU cache of float32 embedding vectors.
+
+    Entries are evicted least-recently-used first once the stored vectors
+    exceed max_bytes. Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings"
+        ).fetchone()[0]
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, List[float]]:
+        """Return cached vectors for the keys that are present; bumps their recency."""
+        keys = list(dict.fromkeys(keys))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[List[float]]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]) -> None:
+        """Store vectors as float32 and evict LRU entries beyond the size cap."""
+        now = time.time()
+        rows = [(key, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            for key, blob, ts in rows:
+                old = self._conn.execute(
+                    "SELECT LENGTH(vector) FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    (key, blob, ts),
+                )
+                self._size += len(blob) - (old[0] if old else 0)
+            self._conn.execute("COMMIT")
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def put(self, key: str, vector: List[float]) -> None:
+        self.put_many([(key, vector)])
+
+    def _evict(self) -> None:
+        # Trim to 90% of the cap so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self._size = 0
+                break
+            doomed = []
+            for key, size in rows:
+                doomed.append((key,))
+                self._size -= size
+                if self._size <= target:
+                    break
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+            self.evictions += len(doomed)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters for this process plus current on-disk usage."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Get or create the process-wide cache (lazy initialization).
+
+    Location and size cap come from GLIDE_EMBED_CACHE_PATH and
+    GLIDE_EMBED_CACHE_MAX_MB. Falls back to an in-memory cache if the
+    on-disk database cannot be opened.
+    """
+    global _cache
+    if _cache is None:
+        path = os.getenv("GLIDE_EMBED_CACHE_PATH", DEFAULT_CACHE_PATH)
+        try:
+            max_bytes = int(float(os.getenv("GLIDE_EMBED_CACHE_MAX_MB", "")) * 1024 * 1024)
+        except ValueError:
+            max_bytes = DEFAULT_MAX_BYTES
+        try:
+            _cache = EmbeddingCache(path, max_bytes)
+        except (OSError, sqlite3.Error):
+            _cache = EmbeddingCache(":memory:", max_bytes)
+    return _cache
+
+
+__all__ = [
+    "EmbeddingCache",
+    "cache_key",
+    "get_embedding_cache",
+]
@@ -0,0 +1,319 @@
+import os
+import random
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from src.kite_exclusive.commit_splitter.services.embedding_cache import get_embedding_cache
+from src.kite_exclusive.commit_splitter.services.voyage_service import (
+    MAX_BATCH_TEXTS,
+    MAX_BATCH_TOKENS,
+    ChunkedEmbedding,
+    _estimate_tokens,
+    chunk_diff_keyed,
+    embed_texts,
+    embedding_backend,
+    embedding_cache_key,
+    pool_chunk_embeddings,
+)
+
+K = TypeVar("K")
+
+# Provider limits for the default Voyage model (voyage-3.5, tier 1)
+DEFAULT_RPM = 2000
+DEFAULT_TPM = 8_000_000
+# How long the dispatcher waits for more requests before sending a batch
+DEFAULT_WINDOW_S = 0.01
+DEFAULT_MAX_RETRIES = 6
+DEFAULT_CONCURRENCY = 4
+
+# HTTP statuses worth retrying
+_TRANSIENT_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Rate limits, timeouts, connection errors and 5xx responses from the provider."""
+    status = getattr(exc, "http_status", None) or getattr(exc, "status_code", None)
+    if status in _TRANSIENT_STATUSES:
+        return True
+    return type(exc).__name__ in {
+        "RateLimitError",
+        "ServiceUnavailableError",
+        "ServerError",
+        "Timeout",
+        "TryAgain",
+        "APIConnectionError",
+    } or isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """
+    Async token bucket for a per-minute limit.
+
+    Holds at most a tenth of the minute's budget, refilled continuously, so a
+    burst cannot spend the whole minute at once. A request larger than that
+    waits for a full bucket and then drives it negative, so oversize batches
+    still go through without exceeding the average rate.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(per_minute / 10.0, 1.0)
+        self._tokens = self.capacity
+        self._updated = asyncio.get_running_loop().time()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` tokens, waiting as long as needed; returns the seconds waited."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                needed = min(amount, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= amount
+                    return now - start
+                await asyncio.sleep((needed - self._tokens) / self.rate)
+
+
+@dataclass
+class _Request:
+    texts: List[str]
+    future: asyncio.Future
+    vectors: List[Optional[List[float]]]
+    remaining: int
+
+
+class EmbeddingService:
+    """
+    In-process micro-batching front end for the embedding provider.
+
+    Concurrent callers `await embed(texts)`. A dispatcher task gathers the
+    requests that arrive within `window` seconds, or until a batch is full,
+    packs their texts into provider-sized batches, and resolves each caller's
+    future with its own vectors in order. Every provider call first takes from
+    the RPM and TPM token buckets (None for no limit), and at most
+    `concurrency` calls are in flight. Transient failures (429, 5xx, timeouts) are retried with
+    exponential backoff and full jitter; other failures, or running out of
+    retries, fail only the requests in that batch.
+
+    The queue and dispatcher belong to the event loop that first uses them,
+    and are recreated if the service is used from a new loop.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        *,
+        rpm: Optional[float] = DEFAULT_RPM,
+        tpm: Optional[float] = DEFAULT_TPM,
+        window: float = DEFAULT_WINDOW_S,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_texts: int = MAX_BATCH_TEXTS,
+        max_tokens: int = MAX_BATCH_TOKENS,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        # Resolved on every call so the provider function can be swapped out
+        self._embed_fn = embed_fn or (lambda texts: embed_texts(texts))
+        self.rpm = rpm
+        self.tpm = tpm
+        self.window = window
+        self.concurrency = max(1, concurrency)
+        self.max_texts = max_texts
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_s = 0.0
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Set[asyncio.Task] = set()
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._worker is not None and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._rpm_bucket = TokenBucket(self.rpm) if self.rpm else None
+        self._tpm_bucket = TokenBucket(self.tpm) if self.tpm else None
+        self._calls = asyncio.Semaphore(self.concurrency)
+        self._inflight = set()
+        self._worker = loop.create_task(self._dispatch())
+
+    async def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Embed texts, batched with whatever other callers submit meanwhile."""
+        texts = list(texts)
+        if not texts:
+            return []
+        self._ensure_started()
+        future = self._loop.create_future()
+        self.requests += 1
+        self.texts += len(texts)
+        await self._queue.put(_Request(texts, future, [None] * len(texts), len(texts)))
+        return await future
+
+    async def embed_chunked(self, batch: List[Tuple[K, List[str]]]) -> List[ChunkedEmbedding]:
+        """Async counterpart of voyage_service.embed_chunks."""
+        flat = [chunk for _, chunks in batch for chunk in chunks]
+        return pool_chunk_embeddings(batch, await self.embed(flat))
+
+    async def embed_codes(self, items: List[Tuple[str, Optional[str]]]) -> List[List[float]]:
+        """Async counterpart of voyage_service.embed_codes, including the embedding cache."""
+        cache = get_embedding_cache()
+        keys = [embedding_cache_key(code, file_path) for code, file_path in items]
+        cached = await asyncio.to_thread(cache.get_many, keys)
+        vectors: List[Optional[List[float]]] = [cached.get(key) for key in keys]
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        if missing:
+            chunked = await asyncio.to_thread(lambda: [chunk_diff_keyed(*items[i]) for i in missing])
+            results = await self.embed_chunked([(i, chunks) for i, (chunks, _) in zip(missing, chunked)])
+            for i, result in zip(missing, results):
+                vectors[i] = result.vector
+            # Stored under the chunker actually used, which the lookup key may not match
+            await asyncio.to_thread(
+                cache.put_many, [(key, result.vector) for (_, key), result in zip(chunked, results)]
+            )
+        return vectors
+
+    async def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            texts = len(pending[0].texts)
+            deadline = loop.time() + self.window
+            while texts < self.max_texts:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(request)
+                texts += len(request.texts)
+
+            for batch in self._pack(pending):
+                task = loop.create_task(self._send(batch))
+                self._inflight.add(task)
+                task.add_done_callback(self._inflight.discard)
+
+    def _pack(self, requests: List[_Request]) -> List[List[Tuple[_Request, int, str, int]]]:
+        """Split the gathered texts into provider batches; a request may span several."""
+        batches: List[List[Tuple[_Request, int, str, int]]] = []
+        current: List[Tuple[_Request, int, str, int]] = []
+        tokens = 0
+        for request in requests:
+            if request.future.done():  # caller gave up
+                continue
+            for i, text in enumerate(request.texts):
+                cost = _estimate_tokens(text)
+                if current and (len(current) >= self.max_texts or tokens + cost > self.max_tokens):
+                    batches.append(current)
+                    current, tokens = [], 0
+                current.append((request, i, text, cost))
+                tokens += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _send(self, batch: List[Tuple[_Request, int, str, int]]) -> None:
+        texts = [text for _, _, text, _ in batch]
+        tokens = sum(cost for _, _, _, cost in batch)
+        attempt = 0
+        while True:
+            async with self._calls:
+                if self._rpm_bucket:
+                    self.throttled_s += await self._rpm_bucket.acquire(1)
+                if self._tpm_bucket:
+                    self.throttled_s += await self._tpm_bucket.acquire(tokens)
+                self.batches += 1
+                try:
+                    vectors = await asyncio.to_thread(self._embed_fn, texts)
+                    if len(vectors) != len(texts):
+                        raise RuntimeError(f"expected {len(texts)} embeddings, got {len(vectors)}")
+                    break
+                except Exception as exc:
+                    error = exc
+            if (
+                not _is_transient(error)
+                or attempt >= self.max_retries
+                or all(request.future.done() for request, _, _, _ in batch)
+            ):
+                self.failures += 1
+                for request, _, _, _ in batch:
+                    if not request.future.done():
+                        request.future.set_exception(error)
+                return
+            self.retries += 1
+            await asyncio.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt)))
+            attempt += 1
+
+        for (request, i, _, _), vector in zip(batch, vectors):
+            if request.future.done():
+                continue
+            request.vectors[i] = vector
+            request.remaining -= 1
+            if request.remaining == 0:
+                request.future.set_result(request.vectors)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for this process: caller requests vs provider batches, retries, throttling."""
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_s": round(self.throttled_s, 3),
+        }
+
+
+_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """
+    Get or create the process-wide embedding service (lazy initialization).
+
+    Limits come from GLIDE_EMBED_RPM, GLIDE_EMBED_TPM, GLIDE_EMBED_BATCH_WINDOW_MS
+    and GLIDE_EMBED_MAX_RETRIES. The local embedding backend has no rate limits.
+    """
+    global _service
+    if _service is None:
+        def env_float(name: str, default: float) -> float:
+            try:
+                return max(0.0, float(os.getenv(name, "")))
+            except ValueError:
+                return default
+
+        remote = embedding_backend() != "local"
+        _service = EmbeddingService(
+            rpm=(env_float("GLIDE_EMBED_RPM", DEFAULT_RPM) or DEFAULT_RPM) if remote else None,
+            tpm=(env_float("GLIDE_EMBED_TPM", DEFAULT_TPM) or DEFAULT_TPM) if remote else None,
+            window=env_float("GLIDE_EMBED_BATCH_WINDOW_MS", DEFAULT_WINDOW_S * 1000) / 1000,
+            max_retries=int(env_float("GLIDE_EMBED_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        )
+    return _service
+
+
+__all__ = [
+    "DEFAULT_RPM",
+    "DEFAULT_TPM",
+    "EmbeddingService",
+    "TokenBucket",
+    "get_embedding_service",
+]
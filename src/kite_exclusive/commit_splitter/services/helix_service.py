@@ -0,0 +1,213 @@
+import os
+import json
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from dotenv import load_dotenv
+import helix
+
+from src.kite_exclusive.commit_splitter.services.local_index import LocalVectorIndex, get_local_index
+from src.kite_exclusive.commit_splitter.services.vector_codec import wire_dtype, wire_vector
+
+load_dotenv()
+
+# Lazy-loaded client - only created when needed
+_helix_client: Optional[Union[helix.Client, LocalVectorIndex]] = None
+
+# Limits for one batched insert request: rows, and serialized JSON size
+MAX_BATCH_ROWS = 500
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+
+def get_helix_client() -> Union[helix.Client, LocalVectorIndex]:
+    """
+    Get or create the Helix client (lazy initialization).
+
+    With GLIDE_RETRIEVAL_BACKEND=local this is the offline LocalVectorIndex,
+    which answers the same queries without a server. Otherwise uses the local
+    Helix instance when HELIX_LOCAL=true, else HELIX_API_ENDPOINT.
+    """
+    global _helix_client
+    if _helix_client is None:
+        backend = os.getenv("GLIDE_RETRIEVAL_BACKEND", "helix").strip().lower()
+        if backend not in ("helix", "local"):
+            raise RuntimeError(f"GLIDE_RETRIEVAL_BACKEND must be 'helix' or 'local', got {backend!r}")
+        if backend == "local":
+            _helix_client = get_local_index()
+        elif os.getenv("HELIX_LOCAL", "false").lower() == "true":
+            _helix_client = helix.Client(local=True, verbose=False)
+        else:
+            api_endpoint = os.getenv("HELIX_API_ENDPOINT", "")
+            if not api_endpoint:
+                raise RuntimeError("HELIX_API_ENDPOINT is not set")
+            _helix_client = helix.Client(local=False, api_endpoint=api_endpoint, verbose=False)
+    return _helix_client
+
+
+def _flatten(value: Any) -> Any:
+    """Collapse traversal projections like [{"path": "a.py"}] to "a.py"."""
+    while isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if isinstance(value, dict) and len(value) == 1:
+        return _flatten(next(iter(value.values())))
+    return value
+
+
+def normalize_diff_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten the nested commit/file fields of a similarity-search row."""
+    return {key: _flatten(value) for key, value in row.items()}
+
+
+def _response_rows(response: Any) -> Any:
+    """Pull the returned collection out of a Helix response body."""
+    if isinstance(response, dict):
+        if "results" in response:
+            return response["results"]
+        if len(response) == 1:
+            return next(iter(response.values()))
+    return response
+
+
+def lookup_rows(db: helix.Client, query: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Rows returned by a lookup query such as getCommit or getCommitParents;
+    empty if nothing matched.
+
+    Raises:
+        RuntimeError: if the query failed, so an unreachable instance is not
+                      mistaken for one that lacks the node
+    """
+    responses = db.query(query, payload)
+    if not responses or responses[0] is None:
+        raise RuntimeError(f"Helix lookup {query} failed")
+    rows = _response_rows(responses[0])
+    if isinstance(rows, dict):
+        return [rows]
+    return [r for r in rows if isinstance(r, dict)] if isinstance(rows, list) else []
+
+
+def node_exists(db: helix.Client, query: str, payload: Dict[str, Any]) -> bool:
+    """
+    Whether a lookup query (getRepository, getBranch, getCommit, getFile) finds
+    its node.
+
+    Raises:
+        RuntimeError: if the query failed
+    """
+    return bool(lookup_rows(db, query, payload))
+
+
+def iter_row_batches(
+    rows: Iterable[Dict[str, Any]],
+    max_rows: int = MAX_BATCH_ROWS,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Lazily group insert rows into batches bounded by row count and JSON size.
+
+    A row that alone exceeds max_bytes is sent in a batch of its own.
+    """
+    batch: List[Dict[str, Any]] = []
+    size = 0
+    for row in rows:
+        row_bytes = len(json.dumps(row)) + 1
+        if batch and (len(batch) >= max_rows or size + row_bytes > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(row)
+        size += row_bytes
+    if batch:
+        yield batch
+
+
+def _post_status(db: helix.Client, query: str, payload: Dict[str, Any]) -> int:
+    """POST one request the way helix.Client does, returning its HTTP status (0 if unreachable)."""
+    request = urllib.request.Request(
+        db._construct_full_url(query),
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    if not db.local and db.api_key is not None:
+        request.add_header("x-api-key", db.api_key)
+    try:
+        with urllib.request.urlopen(request) as response:
+            response.read()
+            return response.getcode()
+    except urllib.error.HTTPError as e:
+        return e.code
+    except urllib.error.URLError:
+        return 0
+
+
+def insert_batch(db: helix.Client, query: str, key: str, rows: List[Dict[str, Any]]) -> int:
+    """
+    Send one batched insert such as createDiffsBatch({"diffs": rows}).
+
+    helix.Client.query reports every failure as None, which cannot tell an
+    instance without the query from one that rejected the rows, so against
+    Helix the request is posted directly and its status returned. Other
+    clients, like the offline LocalVectorIndex, give 200 or 500.
+
+    Returns:
+        HTTP status: 200 if Helix accepted the rows, 404 if the instance has
+        no such query deployed, 0 if it could not be reached
+    """
+    if isinstance(db, helix.Client):
+        return _post_status(db, query, {key: rows})
+    responses = db.query(query, {key: rows})
+    return 200 if responses and responses[0] is not None else 500
+
+
+def _query_vector(vec: List[float]) -> List[float]:
+    """Query vectors go out as float32 unless GLIDE_VECTOR_DTYPE=f64."""
+    return wire_vector(vec, wire_dtype())
+
+
+def _rows(responses: Any) -> Optional[List[Dict[str, Any]]]:
+    rows = _response_rows(responses[0]) if responses else None
+    if not isinstance(rows, list):
+        return None
+    return [normalize_diff_row(r) for r in rows if isinstance(r, dict)]
+
+
+def search_similar_diff(
+    db: helix.Client,
+    vec: List[float],
+    k: int = 8,
+    repo_id: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Nearest past diffs for one query vector.
+
+    With repo_id, only that repository's diffs are candidates
+    (getSimilarDiffsInRepo); otherwise every repository's are
+    (getSimilarDiffsLean). Both read the copy of the commit subject and file
+    path stored on each vector instead of traversing to them. If the instance
+    does not have the scoped query the search falls back to all repositories,
+    and if it lacks the lean query, or its vectors were ingested before the
+    copy was stored (no file_path), to the traversal query
+    getSimilarDiffsByVector.
+    """
+    vec = _query_vector(vec)
+    if repo_id:
+        rows = _rows(db.query("getSimilarDiffsInRepo", {"vec": vec, "k": k, "repo_id": repo_id}))
+        if rows is not None:
+            return rows
+    rows = _rows(db.query("getSimilarDiffsLean", {"vec": vec, "k": k}))
+    if rows is not None and all(row.get("file_path") for row in rows):
+        return rows
+    return _rows(db.query("getSimilarDiffsByVector", {"vec": vec, "k": k})) or []
+
+
+__all__ = [
+    "MAX_BATCH_ROWS",
+    "MAX_BATCH_BYTES",
+    "get_helix_client",
+    "iter_row_batches",
+    "insert_batch",
+    "lookup_rows",
+    "node_exists",
+    "normalize_diff_row",
+    "search_similar_diff",
+]
@@ -0,0 +1,159 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs are not serialized
+    fcntl = None
+
+DEFAULT_STATE_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "glide", "ingest_state.sqlite3"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS branch_tips (
+    branch_id TEXT NOT NULL,
+    repo_id TEXT NOT NULL,
+    commit_id TEXT NOT NULL,
+    PRIMARY KEY (branch_id, commit_id)
+);
+CREATE INDEX IF NOT EXISTS branch_tips_repo ON branch_tips(repo_id);
+CREATE TABLE IF NOT EXISTS branch_checkpoints (
+    branch_id TEXT PRIMARY KEY,
+    repo_id TEXT NOT NULL,
+    commits INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class IngestState:
+    """
+    Durable per-branch ingestion watermarks in a local SQLite file.
+
+    A branch's watermark is the set of ingested commits that have no ingested
+    child ("tips"). Because history is ingested parents-first, everything
+    reachable from the tips is already in Helix, so the next run only needs
+    `HEAD --not <tips>`. A plain `watermark..HEAD` range is the single-tip case;
+    keeping several tips also covers merges and checkpoints taken part-way
+    through a side branch. Each checkpoint is one transaction, so a killed run
+    resumes from its last completed batch.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+
+    def tips(self, branch_id: str) -> List[str]:
+        """Watermark of one branch; empty if it was never ingested."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT commit_id FROM branch_tips WHERE branch_id = ? ORDER BY commit_id",
+                (branch_id,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def repo_tips(self, repo_id: str) -> List[str]:
+        """Watermarks of every branch of a repository, for history shared between branches."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT commit_id FROM branch_tips WHERE repo_id = ? ORDER BY commit_id",
+                (repo_id,),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def has_branch(self, branch_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM branch_checkpoints WHERE branch_id = ?", (branch_id,)
+            ).fetchone()
+        return row is not None
+
+    def checkpoint(self, repo_id: str, branch_id: str, tips: Iterable[str], commits: int) -> None:
+        """Atomically replace a branch's watermark after a batch is fully loaded."""
+        tips = sorted(set(tips))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM branch_tips WHERE branch_id = ?", (branch_id,))
+                self._conn.executemany(
+                    "INSERT INTO branch_tips (branch_id, repo_id, commit_id) VALUES (?, ?, ?)",
+                    [(branch_id, repo_id, tip) for tip in tips],
+                )
+                self._conn.execute(
+                    "INSERT INTO branch_checkpoints (branch_id, repo_id, commits, updated_at) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(branch_id) DO UPDATE SET "
+                    "commits = commits + excluded.commits, updated_at = excluded.updated_at",
+                    (branch_id, repo_id, commits, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def reset(self, branch_id: str) -> None:
+        """Forget a branch's watermark so the next run ingests its full history."""
+        with self._lock:
+            self._conn.execute("DELETE FROM branch_tips WHERE branch_id = ?", (branch_id,))
+            self._conn.execute("DELETE FROM branch_checkpoints WHERE branch_id = ?", (branch_id,))
+
+    @contextmanager
+    def exclusive(self, branch_id: str) -> Iterator[bool]:
+        """
+        Hold the per-branch run lock for the duration of the block.
+
+        Yields False without waiting if another process is already ingesting
+        the branch; that run re-checks for new commits before it exits.
+        """
+        if fcntl is None or self.path == ":memory:":
+            yield True
+            return
+        digest = hashlib.sha256(branch_id.encode("utf-8")).hexdigest()[:16]
+        lock_path = f"{self.path}.{digest}.lock"
+        with open(lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_state: Optional[IngestState] = None
+
+
+def get_ingest_state() -> IngestState:
+    """
+    Get or create the process-wide ingestion state (lazy initialization).
+
+    Location comes from GLIDE_INGEST_STATE_PATH.
+    """
+    global _state
+    if _state is None:
+        _state = IngestState(os.getenv("GLIDE_INGEST_STATE_PATH", DEFAULT_STATE_PATH))
+    return _state
+
+
+__all__ = [
+    "DEFAULT_STATE_PATH",
+    "IngestState",
+    "get_ingest_state",
+]
@@ -0,0 +1,172 @@
+import os
+import re
+import zlib
+import hashlib
+import itertools
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from helix.embedding.embedder import Embedder
+
+DEFAULT_DIMENSIONS = 1024
+
+# Identifiers, numbers, and runs of punctuation (operators, brackets, diff markers)
+_TOKEN_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]+")
+# Parts of camelCase / snake_case identifiers
+_SUBTOKEN_RE = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+# Hashed features per token are memoized; the memo is dropped when it gets this big
+_MAX_VOCABULARY = 500_000
+# Multiplier used to combine two token hashes into a bigram hash
+_BIGRAM_MIX = np.uint64(0x9E3779B1)
+
+
+class HashingEmbedder(Embedder):
+    """
+    Offline embedder: signed feature hashing of code tokens, with sublinear
+    term frequency and optional IDF weights, L2-normalized.
+
+    Features are the lower-cased tokens, the camelCase/snake_case parts of
+    identifiers, and adjacent-token bigrams. Each feature hashes (crc32, so
+    vectors are stable across processes) to one of `dimensions` buckets with a
+    +/-1 sign. Each distinct token is hashed once per process, and a whole
+    batch is accumulated with a single np.bincount.
+
+    Args:
+        dimensions: Vector length
+        idf: Optional per-bucket IDF weights from fit_idf, shape (dimensions,)
+    """
+
+    def __init__(self, dimensions: int = DEFAULT_DIMENSIONS, idf: Optional[np.ndarray] = None):
+        if idf is not None and idf.shape != (dimensions,):
+            raise RuntimeError(f"IDF weights have shape {idf.shape}, expected ({dimensions},)")
+        self.dimensions = dimensions
+        self.idf = idf
+        self.model = f"local-hash-{dimensions}"
+        if idf is not None:
+            self.model += "-idf" + hashlib.sha256(idf.astype(np.float32).tobytes()).hexdigest()[:8]
+        self._lock = threading.Lock()
+        self._reset_vocabulary()
+
+    def _reset_vocabulary(self) -> None:
+        # token -> id; per id: crc32 of the token, and of its parts if it has several.
+        # Entries are only ever appended, and growing or resetting replaces the
+        # arrays, so a snapshot taken under the lock stays valid without it.
+        self._ids: Dict[str, int] = {}
+        self._heads = np.zeros(4096, dtype=np.uint64)
+        self._part_counts = np.zeros(4096, dtype=np.int64)
+        self._parts: List[Tuple[int, ...]] = []
+
+    def _add_token(self, token: str) -> None:
+        n = len(self._ids)
+        if n == len(self._heads):
+            self._heads = np.concatenate([self._heads, np.zeros(n, dtype=np.uint64)])
+            self._part_counts = np.concatenate([self._part_counts, np.zeros(n, dtype=np.int64)])
+        parts = _SUBTOKEN_RE.findall(token)
+        parts = tuple(zlib.crc32(b"#" + p.lower().encode()) for p in parts) if len(parts) > 1 else ()
+        self._ids[token] = n
+        self._heads[n] = zlib.crc32(token.lower().encode())
+        self._part_counts[n] = len(parts)
+        self._parts.append(parts)
+
+    def _lookup(self, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Tuple[int, ...]]]:
+        """Vocabulary ids of tokens, adding new ones, plus a snapshot of the feature arrays."""
+        with self._lock:
+            new = set(tokens).difference(self._ids)
+            if len(self._ids) + len(new) > _MAX_VOCABULARY:
+                self._reset_vocabulary()
+                new = set(tokens)
+            for token in new:
+                self._add_token(token)
+            ids = np.fromiter(map(self._ids.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+            return ids, self._heads, self._part_counts, self._parts
+
+    def _counts(self, texts: Sequence[str]) -> np.ndarray:
+        """Signed hashed feature counts, shape (len(texts), dimensions)."""
+        per_text = [_TOKEN_RE.findall(text) for text in texts]
+        sizes = np.fromiter(map(len, per_text), dtype=np.int64, count=len(per_text))
+        counts = np.zeros((len(texts), self.dimensions))
+        if not sizes.sum():
+            return counts
+        ids, heads, part_counts, parts = self._lookup(list(itertools.chain.from_iterable(per_text)))
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), sizes)
+
+        # Tokens
+        token_hashes = heads[ids]
+        # Parts of multi-part identifiers
+        multi = np.flatnonzero(part_counts[ids])
+        part_hashes = np.fromiter(
+            itertools.chain.from_iterable(parts[i] for i in ids[multi].tolist()), dtype=np.uint64
+        )
+        part_rows = np.repeat(rows[multi], part_counts[ids[multi]])
+        # Adjacent tokens within the same text
+        same_text = rows[:-1] == rows[1:]
+        bigram_hashes = (token_hashes[:-1] * _BIGRAM_MIX) ^ token_hashes[1:]
+        bigram_hashes = bigram_hashes[same_text] & np.uint64(0xFFFFFFFF)
+        bigram_rows = rows[:-1][same_text]
+
+        hashes = np.concatenate([token_hashes, part_hashes, bigram_hashes])
+        rows = np.concatenate([rows, part_rows, bigram_rows])
+        buckets = (hashes % np.uint64(self.dimensions)).astype(np.int64)
+        signs = np.where(hashes & np.uint64(1 << 31), -1.0, 1.0)
+        counts.flat[:] = np.bincount(
+            rows * self.dimensions + buckets, weights=signs, minlength=counts.size
+        )
+        return counts
+
+    def embed_matrix(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as a float32 matrix with unit-length rows (zero rows for empty texts)."""
+        counts = self._counts(texts)
+        matrix = np.sign(counts) * np.log1p(np.abs(counts))
+        if self.idf is not None:
+            matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix.astype(np.float32)
+
+    def embed(self, data: str) -> List[float]:
+        return self.embed_matrix([data])[0].tolist()
+
+    def embed_batch(self, data_list: List[str]) -> List[List[float]]:
+        return self.embed_matrix(data_list).tolist()
+
+    def fit_idf(self, texts: Sequence[str], batch_size: int = 1000) -> np.ndarray:
+        """
+        Smoothed IDF per hash bucket over a corpus, e.g. a repository's diffs:
+        log((1 + n) / (1 + df)) + 1. Pass the result back to the constructor
+        (or save it for GLIDE_LOCAL_EMBED_IDF) to weight rare features up.
+        """
+        df = np.zeros(self.dimensions)
+        for start in range(0, len(texts), batch_size):
+            df += (self._counts(texts[start : start + batch_size]) != 0).sum(axis=0)
+        return np.log((1 + len(texts)) / (1 + df)) + 1
+
+
+_local_embedder: Optional[HashingEmbedder] = None
+
+
+def get_local_embedder() -> HashingEmbedder:
+    """
+    Get or create the offline embedder (lazy initialization).
+
+    GLIDE_LOCAL_EMBED_DIM sets the dimension (default 1024, the same as the
+    Voyage model) and GLIDE_LOCAL_EMBED_IDF optionally names a .npy file of
+    IDF weights from HashingEmbedder.fit_idf.
+    """
+    global _local_embedder
+    if _local_embedder is None:
+        try:
+            dimensions = max(1, int(os.getenv("GLIDE_LOCAL_EMBED_DIM", "")))
+        except ValueError:
+            dimensions = DEFAULT_DIMENSIONS
+        idf_path = os.getenv("GLIDE_LOCAL_EMBED_IDF")
+        idf = np.load(os.path.expanduser(idf_path)) if idf_path else None
+        _local_embedder = HashingEmbedder(dimensions, idf)
+    return _local_embedder
+
+
+__all__ = [
+    "HashingEmbedder",
+    "get_local_embedder",
+]
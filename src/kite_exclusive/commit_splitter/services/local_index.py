@@ -0,0 +1,637 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+import numpy as np
+
+from src.core.env import env_int
+from src.kite_exclusive.commit_splitter.services.vector_codec import encode_vector, vector_dtype
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "glide", "vector_index"
+)
+# Below this many vectors every search is an exact scan
+DEFAULT_IVF_THRESHOLD = 20_000
+DEFAULT_NPROBE = 8
+# On-disk vector formats; f64 has no local use, so it is stored as f32
+INDEX_DTYPES = ("f32", "int8")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS repositories (
+    repo_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS branches (
+    branch_id TEXT PRIMARY KEY,
+    repo_id TEXT NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commits (
+    commit_id TEXT PRIMARY KEY,
+    branch_id TEXT NOT NULL,
+    short_id TEXT NOT NULL,
+    author TEXT NOT NULL,
+    message TEXT NOT NULL,
+    committed_at TEXT NOT NULL,
+    is_merge INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parents (
+    child_commit_id TEXT NOT NULL,
+    parent_commit_id TEXT NOT NULL,
+    PRIMARY KEY (child_commit_id, parent_commit_id)
+);
+CREATE TABLE IF NOT EXISTS files (
+    file_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    language TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diffs (
+    row INTEGER PRIMARY KEY,
+    diff_id TEXT NOT NULL,
+    repo_id TEXT NOT NULL,
+    commit_id TEXT NOT NULL,
+    commit_message TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    additions INTEGER NOT NULL,
+    deletions INTEGER NOT NULL,
+    summary TEXT NOT NULL
+);
+"""
+
+_RESULT_COLUMNS = (
+    "diff_id",
+    "kind",
+    "additions",
+    "deletions",
+    "summary",
+    "commit_id",
+    "commit_message",
+    "file_path",
+)
+
+
+@dataclass
+class _IVF:
+    """Inverted lists over the first `rows` vectors, stored grouped by list."""
+
+    rows: int
+    centroids: np.ndarray
+    offsets: np.ndarray
+    order: np.ndarray
+    vectors: np.ndarray
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=-1, keepdims=True)
+    return vecs / np.maximum(norms, 1e-12)
+
+
+def _row_dtype(dtype: str, dim: int) -> np.dtype:
+    """
+    One stored vector: float32 components, or for int8 the codes after their
+    float32 scale, laid out like vector_codec.encode_vector.
+    """
+    if dtype == "int8":
+        return np.dtype([("scale", "<f4"), ("codes", "i1", (dim,))])
+    return np.dtype(("<f4", (dim,)))
+
+
+def _scores(block: np.ndarray, q: np.ndarray) -> np.ndarray:
+    """Dot products of stored vectors with a float32 query."""
+    if block.dtype.names:
+        return (block["codes"] @ q) * block["scale"]
+    return block @ q
+
+
+def _dense(block: np.ndarray) -> np.ndarray:
+    """Stored vectors as a float32 matrix."""
+    if block.dtype.names:
+        return block["codes"].astype(np.float32) * block["scale"][:, None]
+    return np.asarray(block, dtype=np.float32)
+
+
+def _top(scores: np.ndarray, ids: np.ndarray, k: int) -> List[int]:
+    """Ids of the k highest scores, best first."""
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[part], ids[part]
+    keep = np.isfinite(scores)
+    scores, ids = scores[keep], ids[keep]
+    return ids[np.argsort(-scores, kind="stable")].tolist()
+
+
+def _kmeans(sample: np.ndarray, n_lists: int, iterations: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        empty = ~sums.any(axis=1)
+        # Re-seed empty lists from random points so every list stays in use
+        sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()))]
+        centroids = _normalize(sums).astype(np.float32)
+    return centroids
+
+
+class LocalVectorIndex:
+    """
+    Offline retrieval backend that answers Helix queries from local files.
+
+    Diff vectors are L2-normalized and appended to a matrix that searches
+    memory-map: float32 (`vectors.f32`), or with `dtype="int8"` int8 codes
+    plus a float32 scale per vector (`vectors.i8`), a quarter of the size
+    with scores computed as codes . query * scale. The format is fixed when
+    an index is created. Everything else Helix would
+    store, including each diff's retrieval fields, goes into a SQLite
+    sidecar (`meta.sqlite3`) whose row numbers match the matrix. A search
+    is a batched matrix multiply with exact top-k. Once the index holds
+    `ivf_threshold` vectors, an IVF index (spherical k-means lists, vectors
+    stored contiguously per list) is built, and only the `nprobe` closest
+    lists are scanned, plus any vectors added since the last build. The
+    index is rebuilt once that tail grows past a quarter of the indexed
+    rows.
+
+    `query(name, payload)` mirrors helix.Client for the queries in db/ that
+    ingestion and split_commit use, so either backend can be passed
+    wherever a Helix client is expected. Several processes can share one
+    directory: writes take a file lock, and readers pick up new rows on
+    their next search.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_INDEX_PATH,
+        *,
+        ivf_threshold: int = DEFAULT_IVF_THRESHOLD,
+        nprobe: int = DEFAULT_NPROBE,
+        dtype: Optional[str] = None,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        self._write_depth = 0
+        self._conn = sqlite3.connect(
+            os.path.join(path, "meta.sqlite3"), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+        # Indexes written before the int8 format existed hold float32 vectors
+        if dtype is None:
+            dtype = "int8" if vector_dtype() == "int8" else "f32"
+        if dtype not in INDEX_DTYPES:
+            raise RuntimeError(f"index dtype must be one of {', '.join(INDEX_DTYPES)}, got {dtype!r}")
+        has_rows = self._conn.execute("SELECT 1 FROM diffs LIMIT 1").fetchone() is not None
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('dtype', ?)",
+            ("f32" if has_rows else dtype,),
+        )
+        self.dtype = self._conn.execute("SELECT value FROM meta WHERE key = 'dtype'").fetchone()[0]
+        self._vectors_path = os.path.join(path, "vectors.i8" if self.dtype == "int8" else "vectors.f32")
+
+        self.dim: Optional[int] = None
+        self._count = 0
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._repo_ids: List[str] = []
+        self._repo_index: Dict[str, int] = {}
+        self._repo_codes = np.zeros(0, dtype=np.int32)
+        self._ivf: Optional[_IVF] = None
+        self._ivf_rows = 0
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "createRepository": self._create_repository,
+            "createBranch": self._create_branch,
+            "createCommit": lambda p: self._create_commits([p]),
+            "createCommitsBatch": lambda p: self._create_commits(p["commits"]),
+            "linkParentCommit": lambda p: self._link_parents([p]),
+            "linkParentCommitsBatch": lambda p: self._link_parents(p["links"]),
+            "createFile": lambda p: self._create_files([p]),
+            "createFilesBatch": lambda p: self._create_files(p["files"]),
+            "createDiff": lambda p: self.add_diffs([p]),
+            "createDiffsBatch": lambda p: self.add_diffs(p["diffs"]),
+            "getRepository": lambda p: self._lookup("repositories", "repo_id", p["repo_id"]),
+            "getBranch": lambda p: self._lookup("branches", "branch_id", p["branch_id"]),
+            "getCommit": lambda p: self._lookup("commits", "commit_id", p["commit_id"]),
+            "getFile": lambda p: self._lookup("files", "file_id", p["file_id"]),
+            "getCommitIdsForRepo": lambda p: self._repo_commit_ids(p["repo_id"]),
+            "getCommitDiffSummaries": lambda p: {
+                "diffs": self._lookup("diffs", "commit_id", p["commit_id"])["diffs"]
+            },
+            "getCommitParents": lambda p: {
+                "parents": [
+                    {"commit_id": r["parent_commit_id"]}
+                    for r in self._lookup("parents", "child_commit_id", p["commit_id"])["parents"]
+                ]
+            },
+            "getSimilarDiffsByVector": lambda p: {"results": self.search([p["vec"]], p["k"])[0]},
+            "getSimilarDiffsLean": lambda p: {"results": self.search([p["vec"]], p["k"])[0]},
+            "getSimilarDiffsInRepo": lambda p: {
+                "results": self.search([p["vec"]], p["k"], p["repo_id"])[0]
+            },
+        }
+        with self._lock:
+            self._sync()
+
+    # helix.Client-compatible entry point
+
+    def query(self, query: str, payload: Any = None) -> List[Any]:
+        """
+        Run one of the supported Helix queries locally.
+
+        Like helix.Client.query, a list payload runs the query once per item,
+        and a failed or unknown query yields None in place of its response.
+        """
+        payloads = payload if isinstance(payload, list) else [payload or {}]
+        handler = self._handlers.get(query)
+        responses = []
+        for item in payloads:
+            try:
+                responses.append(handler(item) if handler else None)
+            except (KeyError, TypeError, ValueError, RuntimeError, sqlite3.Error):
+                responses.append(None)
+        return responses
+
+    # Writes
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Thread and process lock for writers; re-entrant within a thread."""
+        with self._lock:
+            if fcntl is None or self._write_depth:
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                return
+            with open(os.path.join(self.path, "write.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._write_depth += 1
+                try:
+                    yield
+                finally:
+                    self._write_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _execute_many(self, sql: str, rows: List[Sequence[Any]]) -> None:
+        with self._write_lock():
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(sql, rows)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _create_repository(self, p: Dict[str, Any]) -> Dict[str, Any]:
+        self._execute_many(
+            "INSERT OR IGNORE INTO repositories (repo_id, name) VALUES (?, ?)",
+            [(p["repo_id"], p["name"])],
+        )
+        return {"repo": p}
+
+    def _create_branch(self, p: Dict[str, Any]) -> Dict[str, Any]:
+        self._execute_many(
+            "INSERT OR IGNORE INTO branches (branch_id, repo_id, name) VALUES (?, ?, ?)",
+            [(p["branch_id"], p["repo_id"], p["name"])],
+        )
+        return {"branch": p}
+
+    def _create_commits(self, commits: List[Dict[str, Any]]) -> str:
+        self._execute_many(
+            "INSERT OR IGNORE INTO commits "
+            "(commit_id, branch_id, short_id, author, message, committed_at, is_merge) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    c["commit_id"],
+                    c["branch_id"],
+                    c["short_id"],
+                    c["author"],
+                    c.get("message", ""),
+                    c["committed_at"],
+                    int(bool(c["is_merge"])),
+                )
+                for c in commits
+            ],
+        )
+        return "OK"
+
+    def _link_parents(self, links: List[Dict[str, Any]]) -> str:
+        self._execute_many(
+            "INSERT OR IGNORE INTO parents (child_commit_id, parent_commit_id) VALUES (?, ?)",
+            [(link["child_commit_id"], link["parent_commit_id"]) for link in links],
+        )
+        return "OK"
+
+    def _create_files(self, files: List[Dict[str, Any]]) -> str:
+        self._execute_many(
+            "INSERT OR IGNORE INTO files (file_id, path, language) VALUES (?, ?, ?)",
+            [(f["file_id"], f["path"], f["language"]) for f in files],
+        )
+        return "OK"
+
+    def add_diffs(self, diffs: List[Dict[str, Any]]) -> str:
+        """
+        Append diffs and their vectors (createDiff / createDiffsBatch rows).
+
+        Vectors are written at their row offset before the metadata commits,
+        so a crash in between only leaves bytes that the next write overwrites.
+        """
+        if not diffs:
+            return "OK"
+        vecs = _normalize(np.asarray([d["vec"] for d in diffs], dtype=np.float32))
+        with self._write_lock():
+            self._sync()
+            if self.dim is None:
+                self.dim = vecs.shape[1]
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),)
+                )
+            if vecs.shape[1] != self.dim:
+                raise ValueError(f"vector dimension {vecs.shape[1]} does not match index dimension {self.dim}")
+
+            start = self._count
+            mode = "r+b" if os.path.exists(self._vectors_path) else "wb"
+            with open(self._vectors_path, mode) as f:
+                f.seek(start * _row_dtype(self.dtype, self.dim).itemsize)
+                f.write(b"".join(encode_vector(vec, self.dtype) for vec in vecs))
+                f.flush()
+                os.fsync(f.fileno())
+
+            rows = []
+            for offset, d in enumerate(diffs):
+                message, path = d.get("commit_message"), d.get("file_path")
+                if message is None:
+                    found = self._conn.execute(
+                        "SELECT message FROM commits WHERE commit_id = ?", (d["commit_id"],)
+                    ).fetchone()
+                    message = found[0].split("\n", 1)[0] if found else ""
+                if path is None:
+                    found = self._conn.execute(
+                        "SELECT path FROM files WHERE file_id = ?", (d["file_id"],)
+                    ).fetchone()
+                    path = found[0] if found else ""
+                rows.append(
+                    (
+                        start + offset,
+                        d["diff_id"],
+                        d["repo_id"],
+                        d["commit_id"],
+                        message,
+                        d["file_id"],
+                        path,
+                        d["kind"],
+                        d["additions"],
+                        d["deletions"],
+                        d["summary"],
+                    )
+                )
+            self._execute_many(
+                "INSERT INTO diffs (row, diff_id, repo_id, commit_id, commit_message, file_id, "
+                "file_path, kind, additions, deletions, summary) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._sync()
+            if self._count >= self.ivf_threshold and (
+                self._ivf is None or self._count - self._ivf.rows > self._ivf.rows // 4
+            ):
+                self.build_ivf()
+        return "OK"
+
+    def build_ivf(self, iterations: int = 8) -> None:
+        """(Re)build the IVF lists over every vector currently in the index."""
+        with self._write_lock():
+            self._sync()
+            rows = self._count
+            if rows == 0:
+                return
+            matrix = self._matrix[:rows]
+            # About 2*sqrt(n) lists: a probe then scans roughly as many rows as
+            # it scores centroids
+            n_lists = max(1, min(rows, int(2 * np.sqrt(rows))))
+            rng = np.random.default_rng(0)
+            sample_size = min(rows, 32 * n_lists)
+            sample = _dense(matrix[np.sort(rng.choice(rows, size=sample_size, replace=False))])
+            centroids = _kmeans(sample, n_lists, iterations)
+
+            assign = np.empty(rows, dtype=np.int32)
+            for start in range(0, rows, 8192):
+                assign[start : start + 8192] = np.argmax(
+                    _dense(matrix[start : start + 8192]) @ centroids.T, axis=1
+                )
+            order = np.argsort(assign, kind="stable").astype(np.int64)
+            offsets = np.searchsorted(assign[order], np.arange(n_lists + 1)).astype(np.int64)
+
+            arrays = {"centroids": centroids, "offsets": offsets, "order": order}
+            for name, array in arrays.items():
+                np.save(os.path.join(self.path, f"ivf_{name}.tmp.npy"), array)
+            grouped = np.lib.format.open_memmap(
+                os.path.join(self.path, "ivf_vectors.tmp.npy"),
+                mode="w+",
+                dtype=matrix.dtype,
+                shape=matrix.shape,
+            )
+            for start in range(0, rows, 8192):
+                grouped[start : start + 8192] = matrix[order[start : start + 8192]]
+            grouped.flush()
+            del grouped
+            for name in (*arrays, "vectors"):
+                os.replace(
+                    os.path.join(self.path, f"ivf_{name}.tmp.npy"),
+                    os.path.join(self.path, f"ivf_{name}.npy"),
+                )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('ivf_rows', ?)", (str(rows),)
+            )
+            self._ivf_rows = -1  # force a reload
+            self._sync()
+
+    # Reads
+
+    def _sync(self) -> None:
+        """Pick up rows and IVF builds committed by this or another process."""
+        count, dim, ivf_rows = self._conn.execute(
+            "SELECT (SELECT COALESCE(MAX(row) + 1, 0) FROM diffs), "
+            "(SELECT value FROM meta WHERE key = 'dim'), "
+            "(SELECT value FROM meta WHERE key = 'ivf_rows')"
+        ).fetchone()
+        ivf_rows = int(ivf_rows or 0)
+        if count != self._count:
+            self.dim = int(dim)
+            codes = []
+            for (repo_id,) in self._conn.execute(
+                "SELECT repo_id FROM diffs WHERE row >= ? ORDER BY row", (self._count,)
+            ):
+                if repo_id not in self._repo_index:
+                    self._repo_index[repo_id] = len(self._repo_ids)
+                    self._repo_ids.append(repo_id)
+                codes.append(self._repo_index[repo_id])
+            self._repo_codes = np.concatenate([self._repo_codes, np.asarray(codes, dtype=np.int32)])
+            self._matrix = np.memmap(
+                self._vectors_path, dtype=_row_dtype(self.dtype, self.dim), mode="r", shape=(count,)
+            )
+            self._count = count
+        if ivf_rows != self._ivf_rows:
+            self._ivf = None
+            if ivf_rows:
+                load = lambda name: np.load(os.path.join(self.path, f"ivf_{name}.npy"), mmap_mode="r")
+                self._ivf = _IVF(
+                    rows=ivf_rows,
+                    centroids=np.asarray(load("centroids")),
+                    offsets=np.asarray(load("offsets")),
+                    order=np.asarray(load("order")),
+                    vectors=load("vectors"),
+                )
+            self._ivf_rows = ivf_rows
+
+    def _search_one(
+        self, q: np.ndarray, k: int, repo_code: Optional[int], probes: Optional[np.ndarray]
+    ) -> List[int]:
+        matrix, codes, ivf = self._matrix, self._repo_codes, self._ivf
+        if probes is None or ivf is None:
+            scores = _scores(matrix, q)
+            if repo_code is not None:
+                scores = np.where(codes == repo_code, scores, -np.inf)
+            return _top(scores, np.arange(len(scores)), k)
+
+        parts, ids = [], []
+        for l in probes:
+            start, end = ivf.offsets[l], ivf.offsets[l + 1]
+            parts.append(_scores(ivf.vectors[start:end], q))
+            ids.append(ivf.order[start:end])
+        if ivf.rows < len(matrix):
+            parts.append(_scores(matrix[ivf.rows :], q))
+            ids.append(np.arange(ivf.rows, len(matrix)))
+        scores, ids = np.concatenate(parts), np.concatenate(ids)
+        if repo_code is not None:
+            scores = np.where(codes[ids] == repo_code, scores, -np.inf)
+        found = _top(scores, ids, k)
+        if repo_code is not None and len(found) < k:
+            # The repository is too sparse in the probed lists; scan its rows exactly
+            rows = np.flatnonzero(codes == repo_code)
+            return _top(np.asarray(_scores(matrix[rows], q)), rows, k)
+        return found
+
+    def search_rows(
+        self, vecs: Sequence[Sequence[float]], k: int, repo_id: Optional[str] = None
+    ) -> List[List[int]]:
+        """Matrix rows of the k nearest diffs (cosine) for each query vector."""
+        if not len(vecs):
+            return []
+        with self._lock:
+            self._sync()
+            if self._count == 0 or (repo_id is not None and repo_id not in self._repo_index):
+                return [[] for _ in vecs]
+            queries = _normalize(np.asarray(vecs, dtype=np.float32))
+            if queries.shape[1] != self.dim:
+                raise ValueError(f"vector dimension {queries.shape[1]} does not match index dimension {self.dim}")
+            repo_code = self._repo_index[repo_id] if repo_id is not None else None
+            ivf = self._ivf
+            if ivf is None:
+                return [self._search_one(q, k, repo_code, None) for q in queries]
+            nprobe = min(self.nprobe, len(ivf.centroids))
+            probes = np.argpartition(-(queries @ ivf.centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+            return [self._search_one(q, k, repo_code, p) for q, p in zip(queries, probes)]
+
+    def search(
+        self, vecs: Sequence[Sequence[float]], k: int, repo_id: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Nearest diffs for each query vector, as getSimilarDiffsLean rows
+        (diff_id, kind, additions, deletions, summary, commit_id,
+        commit_message, file_path), best first.
+        """
+        groups = self.search_rows(vecs, k, repo_id)
+        wanted = sorted({row for group in groups for row in group})
+        if not wanted:
+            return [[] for _ in groups]
+        with self._lock:
+            found = {
+                r[0]: dict(zip(_RESULT_COLUMNS, r[1:]))
+                for r in self._conn.execute(
+                    f"SELECT row, {', '.join(_RESULT_COLUMNS)} FROM diffs "
+                    f"WHERE row IN ({','.join('?' * len(wanted))})",
+                    wanted,
+                )
+            }
+        return [[found[row] for row in group] for group in groups]
+
+    def _lookup(self, table: str, column: str, value: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            cursor = self._conn.execute(f"SELECT * FROM {table} WHERE {column} = ?", (value,))
+            names = [c[0] for c in cursor.description]
+            return {table: [dict(zip(names, r)) for r in cursor.fetchall()]}
+
+    def _repo_commit_ids(self, repo_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT commit_id FROM commits JOIN branches USING (branch_id) WHERE repo_id = ?",
+                (repo_id,),
+            ).fetchall()
+        return {"commits": [{"commit_id": r[0]} for r in rows]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sync()
+            return {
+                "vectors": self._count,
+                "dim": self.dim,
+                "dtype": self.dtype,
+                "repositories": len(self._repo_ids),
+                "ivf_rows": self._ivf.rows if self._ivf else 0,
+                "ivf_lists": len(self._ivf.centroids) if self._ivf else 0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[LocalVectorIndex] = None
+
+
+def get_local_index() -> LocalVectorIndex:
+    """
+    Get or create the process-wide local index (lazy initialization).
+
+    Location comes from GLIDE_LOCAL_INDEX_PATH; GLIDE_LOCAL_INDEX_IVF_THRESHOLD
+    and GLIDE_LOCAL_INDEX_NPROBE tune when and how the IVF index is used, and
+    GLIDE_VECTOR_DTYPE=int8 stores a new index's vectors quantized.
+    """
+    global _index
+    if _index is None:
+        _index = LocalVectorIndex(
+            os.getenv("GLIDE_LOCAL_INDEX_PATH", DEFAULT_INDEX_PATH),
+            ivf_threshold=env_int("GLIDE_LOCAL_INDEX_IVF_THRESHOLD", DEFAULT_IVF_THRESHOLD),
+            nprobe=env_int("GLIDE_LOCAL_INDEX_NPROBE", DEFAULT_NPROBE),
+        )
+    return _index
+
+
+__all__ = [
+    "DEFAULT_INDEX_PATH",
+    "DEFAULT_IVF_THRESHOLD",
+    "DEFAULT_NPROBE",
+    "INDEX_DTYPES",
+    "LocalVectorIndex",
+    "get_local_index",
+]
@@ -0,0 +1,102 @@
+import os
+from typing import List, Sequence, Tuple, Union
+import numpy as np
+
+# Storage modes for diff embeddings, from full precision to smallest. Helix
+# stores [F64] whatever is sent, so these only change its wire payload; int8
+# storage with a per-vector scale exists in the local index alone
+VECTOR_DTYPES = ("f64", "f32", "int8")
+DEFAULT_VECTOR_DTYPE = "f32"
+
+Vector = Union[Sequence[float], np.ndarray]
+
+
+def vector_dtype() -> str:
+    """Configured storage mode (GLIDE_VECTOR_DTYPE: f64, f32 or int8)."""
+    dtype = os.getenv("GLIDE_VECTOR_DTYPE", DEFAULT_VECTOR_DTYPE).strip().lower()
+    if dtype not in VECTOR_DTYPES:
+        raise RuntimeError(f"GLIDE_VECTOR_DTYPE must be one of {', '.join(VECTOR_DTYPES)}, got {dtype!r}")
+    return dtype
+
+
+def quantize_int8(vec: Vector) -> Tuple[np.ndarray, float]:
+    """
+    Symmetric scalar quantization: vec ~= codes * scale with codes in [-127, 127].
+
+    Returns:
+        (int8 codes, float32 scale); the scale of a zero vector is 0
+    """
+    arr = np.asarray(vec, dtype=np.float32)
+    peak = float(np.max(np.abs(arr))) if arr.size else 0.0
+    scale = peak / 127.0
+    if scale == 0.0:
+        return np.zeros(arr.shape, dtype=np.int8), 0.0
+    codes = np.clip(np.rint(arr / scale), -127, 127).astype(np.int8)
+    return codes, float(np.float32(scale))
+
+
+def dequantize_int8(codes: np.ndarray, scale: float) -> np.ndarray:
+    return codes.astype(np.float32) * np.float32(scale)
+
+
+def encode_vector(vec: Vector, dtype: str) -> bytes:
+    """
+    Binary form of a vector: raw little-endian float64 / float32, or for int8 a
+    float32 scale followed by the codes.
+    """
+    if dtype == "f64":
+        return np.asarray(vec, dtype="<f8").tobytes()
+    if dtype == "f32":
+        return np.asarray(vec, dtype="<f4").tobytes()
+    if dtype == "int8":
+        codes, scale = quantize_int8(vec)
+        return np.float32(scale).astype("<f4").tobytes() + codes.tobytes()
+    raise RuntimeError(f"unknown vector dtype: {dtype}")
+
+
+def decode_vector(blob: bytes, dtype: str) -> np.ndarray:
+    """Inverse of encode_vector; int8 vectors come back dequantized as float32."""
+    if dtype == "f64":
+        return np.frombuffer(blob, dtype="<f8")
+    if dtype == "f32":
+        return np.frombuffer(blob, dtype="<f4")
+    if dtype == "int8":
+        scale = float(np.frombuffer(blob[:4], dtype="<f4")[0])
+        return dequantize_int8(np.frombuffer(blob[4:], dtype=np.int8), scale)
+    raise RuntimeError(f"unknown vector dtype: {dtype}")
+
+
+def wire_dtype() -> str:
+    """
+    Format of vectors sent to Helix: f64, or f32 for the compact modes. Helix
+    has no field for an int8 scale, so int8 vectors go out as f32.
+    """
+    return "f64" if vector_dtype() == "f64" else "f32"
+
+
+def wire_vector(vec: Vector, dtype: str) -> List[float]:
+    """
+    The vector as sent to Helix in a JSON query payload.
+
+    Helix takes [F64] lists; f32 rounds every component to float32 precision,
+    about half the JSON of a full-precision float.
+    """
+    if dtype == "f64":
+        return [float(x) for x in vec]
+    if dtype == "f32":
+        # str() of a float32 is its shortest round-tripping decimal
+        return [float(str(x)) for x in np.asarray(vec, dtype=np.float32)]
+    raise RuntimeError(f"vectors are sent to Helix as f64 or f32, not {dtype}")
+
+
+__all__ = [
+    "DEFAULT_VECTOR_DTYPE",
+    "VECTOR_DTYPES",
+    "decode_vector",
+    "dequantize_int8",
+    "encode_vector",
+    "quantize_int8",
+    "vector_dtype",
+    "wire_dtype",
+    "wire_vector",
+]
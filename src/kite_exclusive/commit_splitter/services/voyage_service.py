@@ -1,59 +1,340 @@
-from helix.embedding.voyageai_client import VoyageAIEmbedder
-from chonkie import Chunk
+from helix.embedding.embedder import Embedder
+from helix.embedding.voyageai_client import VoyageAIEmbedder, DEFAULT_MODEL
+from chonkie import CodeChunker, TokenChunker
 import os
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, TypeVar
+import numpy as np
+from src.kite_exclusive.commit_splitter.languages import language_for_path
+from src.kite_exclusive.commit_splitter.services.embedding_cache import (
+    cache_key,
+    get_embedding_cache,
+)
+from src.kite_exclusive.commit_splitter.services.local_embedder import get_local_embedder
+
+K = TypeVar("K")
+
+# Embedding backends (GLIDE_EMBED_BACKEND): the Voyage API, or the offline
+# feature-hashing embedder in local_embedder
+EMBEDDING_BACKENDS = ("voyage", "local")
 
 # Lazy-loaded embedder - only created when needed
 _voyage_embedder = None
 
 
-def _get_embedder():
-    """Get or create the voyage embedder instance (lazy initialization)."""
+def embedding_backend() -> str:
+    """GLIDE_EMBED_BACKEND: "voyage" (default) or "local", which needs no network."""
+    backend = os.getenv("GLIDE_EMBED_BACKEND", "voyage").strip().lower()
+    if backend not in EMBEDDING_BACKENDS:
+        raise RuntimeError(
+            f"GLIDE_EMBED_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, got {backend!r}"
+        )
+    return backend
+
+
+def _get_embedder() -> Embedder:
+    """Get or create the embedder for the configured backend (lazy initialization)."""
     global _voyage_embedder
+    if embedding_backend() == "local":
+        return get_local_embedder()
     if _voyage_embedder is None:
         _voyage_embedder = VoyageAIEmbedder()
     return _voyage_embedder
 
 
+def embedding_model() -> str:
+    """Name of the model behind the configured backend; part of the cache key."""
+    if embedding_backend() == "local":
+        return get_local_embedder().model
+    return DEFAULT_MODEL
+
+
+# Provider request limits for the default Voyage model (voyage-3.5)
+MAX_BATCH_TEXTS = 1000
+MAX_BATCH_TOKENS = 320_000
+# Inputs longer than the model context are truncated by the provider
+MAX_TEXT_TOKENS = 32_000
+
+# Diffs are embedded as chunks of at most this many characters (~600 tokens),
+# and at most MAX_DIFF_CHUNKS chunks per diff
+CHUNK_CHARS = 2048
+MAX_DIFF_CHUNKS = 64
+# How chunk vectors are combined into one diff vector (GLIDE_EMBED_POOLING)
+POOLING_MODES = ("weighted", "mean")
+
+# Chunkers are built once and reused; languages whose CodeChunker could not be
+# built or failed to chunk are remembered and go straight to the token chunker
+_chunkers: Dict[Optional[str], Tuple[Any, threading.Lock]] = {}
+_bad_languages: Set[str] = set()
+_chunkers_lock = threading.Lock()
+
+
+def _detect_language(file_path: Optional[str]) -> Optional[str]:
+    language = language_for_path(file_path)
+    return None if language in _bad_languages else language
+
+
+def _get_chunker(language: Optional[str]) -> Tuple[Any, threading.Lock]:
+    """
+    Get or create the chunker for a language, or the token chunker for None
+    (lazy initialization). Chunkers are not thread-safe, so each comes with
+    the lock to hold while it runs.
+    """
+    entry = _chunkers.get(language)
+    if entry is None:
+        with _chunkers_lock:
+            entry = _chunkers.get(language)
+            if entry is None:
+                if language is None:
+                    chunker = TokenChunker(chunk_size=CHUNK_CHARS)
+                else:
+                    chunker = CodeChunker(language=language, chunk_size=CHUNK_CHARS)
+                entry = _chunkers[language] = (chunker, threading.Lock())
+    return entry
+
+
+def _chunk(language: Optional[str], code: str) -> List[Any]:
+    chunker, lock = _get_chunker(language)
+    with lock:
+        return chunker.chunk(code)
+
+
+def pooling_mode() -> str:
+    """
+    GLIDE_EMBED_POOLING: "weighted" (default) averages chunk vectors weighted
+    by chunk length, "mean" weights every chunk equally.
+    """
+    mode = os.getenv("GLIDE_EMBED_POOLING", "weighted").strip().lower()
+    if mode not in POOLING_MODES:
+        raise RuntimeError(f"GLIDE_EMBED_POOLING must be one of {', '.join(POOLING_MODES)}, got {mode!r}")
+    return mode
+
+
+def _chunking_mode(language: Optional[str]) -> str:
+    chunker = f"code:{language}" if language else "token"
+    return f"{chunker}/{CHUNK_CHARS}/{pooling_mode()}"
+
+
+def chunking_mode(file_path: Optional[str]) -> str:
+    """Name of the chunking and pooling strategy used for a path; part of the cache key."""
+    return _chunking_mode(_detect_language(file_path))
+
+
+def embedding_cache_key(code: str, file_path: Optional[str] = None) -> str:
+    """
+    Key to look a diff's vector up under, for the chunker chunk_diff would
+    pick right now. Store vectors under the key from chunk_diff_keyed.
+    """
+    return cache_key(code, chunking_mode(file_path), embedding_model())
+
+
+def _estimate_tokens(text: str) -> int:
+    """Cheap, conservative token estimate (code tokenizes at ~3-4 chars/token)."""
+    return min(len(text) // 3 + 1, MAX_TEXT_TOKENS)
+
+
+def chunk_diff(code: str, file_path: Optional[str] = None) -> List[str]:
+    """
+    Split a diff into the texts that are embedded, one per chunk.
+
+    Files in a known language go through chonkie's CodeChunker; anything else,
+    or a language whose grammar cannot be loaded, is split by size with
+    TokenChunker. A language that fails once is not tried again in this
+    process. Returns at least one text, and at most MAX_DIFF_CHUNKS.
+    """
+    return _chunk_diff(code, file_path)[0]
+
+
+def chunk_diff_keyed(code: str, file_path: Optional[str] = None) -> Tuple[List[str], str]:
+    """
+    chunk_diff, plus the cache key of the chunker that actually produced the
+    chunks. This differs from embedding_cache_key when the language's grammar
+    fails for the first time on this diff: the token-chunked vector must not
+    be stored under the code chunker's key.
+    """
+    texts, language = _chunk_diff(code, file_path)
+    return texts, cache_key(code, _chunking_mode(language), embedding_model())
+
+
+def _chunk_diff(code: str, file_path: Optional[str]) -> Tuple[List[str], Optional[str]]:
+    """Chunk texts and the language whose CodeChunker made them (None: token chunker)."""
+    language = _detect_language(file_path)
+    chunks = None
+    if language:
+        try:
+            chunks = _chunk(language, code)
+        except Exception:
+            _bad_languages.add(language)
+            language = None
+    if chunks is None:
+        chunks = _chunk(None, code)
+    texts = [chunk.text for chunk in chunks if chunk.text.strip()]
+    return texts[:MAX_DIFF_CHUNKS] or [code], language
+
+
+def pool_vectors(
+    vectors: Sequence[Sequence[float]],
+    weights: Optional[Sequence[float]] = None,
+) -> List[float]:
+    """Weighted mean of chunk vectors, L2-normalized like a provider embedding."""
+    matrix = np.asarray(vectors, dtype=np.float64)
+    pooled = np.average(matrix, axis=0, weights=weights)
+    norm = np.linalg.norm(pooled)
+    return (pooled / norm if norm else pooled).tolist()
+
+
+@dataclass
+class ChunkedEmbedding:
+    """Pooled diff vector, with the chunks and per-chunk vectors it came from."""
+
+    vector: List[float]
+    chunks: List[str]
+    chunk_vectors: List[List[float]]
+
+
+def iter_batches(
+    items: Iterable[Tuple[K, str]],
+    max_texts: int = MAX_BATCH_TEXTS,
+    max_tokens: int = MAX_BATCH_TOKENS,
+) -> Iterator[List[Tuple[K, str]]]:
+    """
+    Lazily pack (key, text) pairs into provider-sized requests.
+
+    Each batch is yielded as soon as it is full, so callers can start
+    embedding before the whole input has been produced.
+    """
+    current: List[Tuple[K, str]] = []
+    current_tokens = 0
+    for key, text in items:
+        tokens = _estimate_tokens(text)
+        if current and (len(current) >= max_texts or current_tokens + tokens > max_tokens):
+            yield current
+            current, current_tokens = [], 0
+        current.append((key, text))
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def batch_texts(
+    texts: List[str],
+    max_texts: int = MAX_BATCH_TEXTS,
+    max_tokens: int = MAX_BATCH_TOKENS,
+) -> List[List[int]]:
+    """
+    Pack texts into as few provider requests as the batch limits allow.
+
+    Returns:
+        Lists of indices into `texts`, one list per request, in input order
+    """
+    return [
+        [i for i, _ in batch]
+        for batch in iter_batches(enumerate(texts), max_texts, max_tokens)
+    ]
+
+
+def iter_chunk_batches(
+    items: Iterable[Tuple[K, List[str]]],
+    max_texts: int = MAX_BATCH_TEXTS,
+    max_tokens: int = MAX_BATCH_TOKENS,
+) -> Iterator[List[Tuple[K, List[str]]]]:
+    """
+    Like iter_batches for (key, chunks) pairs: counts every chunk against the
+    provider limits and keeps all chunks of one key in the same request.
+    """
+    current: List[Tuple[K, List[str]]] = []
+    current_texts = current_tokens = 0
+    for key, chunks in items:
+        tokens = sum(_estimate_tokens(chunk) for chunk in chunks)
+        if current and (
+            current_texts + len(chunks) > max_texts or current_tokens + tokens > max_tokens
+        ):
+            yield current
+            current, current_texts, current_tokens = [], 0, 0
+        current.append((key, chunks))
+        current_texts += len(chunks)
+        current_tokens += tokens
+    if current:
+        yield current
+
+
+def embed_texts(texts: List[str]) -> List[List[float]]:
+    """Embed already-prepared texts in a single provider call."""
+    return _get_embedder().embed_batch(texts)
+
+
+def embed_chunks(batch: List[Tuple[K, List[str]]]) -> List[ChunkedEmbedding]:
+    """
+    Embed the chunks of several diffs in one provider call and pool them per diff.
+
+    Args:
+        batch: (key, chunks) pairs, e.g. from iter_chunk_batches
+
+    Returns:
+        One ChunkedEmbedding per pair, in order
+    """
+    flat = [chunk for _, chunks in batch for chunk in chunks]
+    return pool_chunk_embeddings(batch, embed_texts(flat) if flat else [])
+
+
+def pool_chunk_embeddings(
+    batch: List[Tuple[K, List[str]]],
+    embedded: List[List[float]],
+) -> List[ChunkedEmbedding]:
+    """Split the flat chunk vectors of a batch back per diff and pool each diff's."""
+    expected = sum(len(chunks) for _, chunks in batch)
+    if len(embedded) != expected:
+        raise RuntimeError(f"expected {expected} chunk embeddings, got {len(embedded)}")
+    weighted = pooling_mode() == "weighted"
+    results = []
+    start = 0
+    for _, chunks in batch:
+        chunk_vectors = [list(vec) for vec in embedded[start : start + len(chunks)]]
+        start += len(chunks)
+        weights = [len(chunk) for chunk in chunks] if weighted else None
+        results.append(ChunkedEmbedding(pool_vectors(chunk_vectors, weights), chunks, chunk_vectors))
+    return results
+
+
+def embed_codes(items: List[Tuple[str, Optional[str]]]) -> List[List[float]]:
+    """
+    Embed many diffs with as few provider calls as possible.
+
+    Each diff is chunked, every chunk is embedded, and the chunk vectors are
+    pooled into one vector per diff. Vectors already in the on-disk embedding
+    cache are returned without a network call; newly embedded ones are added
+    to it.
+
+    Args:
+        items: (diff_text, file_path) pairs
+
+    Returns:
+        One vector per item, in the same order as `items`
+    """
+    cache = get_embedding_cache()
+    keys = [embedding_cache_key(code, file_path) for code, file_path in items]
+    cached = cache.get_many(keys)
+    vectors: List[Optional[List[float]]] = [cached.get(key) for key in keys]
+
+    def missing() -> Iterator[Tuple[Tuple[int, str], List[str]]]:
+        for i, vec in enumerate(vectors):
+            if vec is None:
+                chunks, key = chunk_diff_keyed(*items[i])
+                yield (i, key), chunks
+
+    for batch in iter_chunk_batches(missing()):
+        embedded = embed_chunks(batch)
+        for ((i, _), _), result in zip(batch, embedded):
+            vectors[i] = result.vector
+        cache.put_many((key, result.vector) for ((_, key), _), result in zip(batch, embedded))
+    return vectors
+
+
 def embed_code(code: str, file_path: str = None):
+    return embed_codes([(code, file_path)])
+
 
-    # For diffs, use token_chunk instead of code_chunk since diffs are text format
-    # and code_chunk has API compatibility issues
-    try:
-        # Try code_chunk first if we have a valid language
-        if file_path:
-            ext = os.path.splitext(file_path)[1].lstrip(".")
-            lang_map = {
-                "py": "python",
-                "js": "javascript",
-                "ts": "typescript",
-                "jsx": "javascript",
-                "tsx": "typescript",
-                "java": "java",
-                "cpp": "cpp",
-                "c": "c",
-                "cs": "csharp",
-                "go": "go",
-                "rs": "rust",
-                "rb": "ruby",
-                "php": "php",
-                "swift": "swift",
-                "kt": "kotlin",
-                "scala": "scala",
-                "sh": "bash",
-                "hx": "python",
-            }
-            language = lang_map.get(ext.lower())
-            if language:
-                code_chunks = Chunk.code_chunk(code, language=language)
-            else:
-                code_chunks = Chunk.token_chunk(code)
-        else:
-            code_chunks = Chunk.token_chunk(code)
-    except Exception:
-        # Fallback to token_chunk if code_chunk fails
-        code_chunks = Chunk.token_chunk(code)
-
-    voyage_embedder = _get_embedder()
-    code_embeddings = voyage_embedder.embed_batch([f"{code_chunks}"])
-
-    return code_embeddings
+def embed_code_chunks(code: str, file_path: str = None) -> ChunkedEmbedding:
+    """Embed one diff and keep its per-chunk vectors, e.g. for hunk-level retrieval."""
+    return embed_chunks([(None, chunk_diff(code, file_path))])[0]
@@ -4,6 +4,8 @@ from typing import Optional
 from dotenv import load_dotenv
 import ollama
 
+from src.core.LLM.router import get_router
+
 
 load_dotenv()
 
@@ -50,6 +52,11 @@ async def resolve_merge_conflict(
 ) -> str:
     """
     Resolve a merge conflict using the breeze model.
+
+    When GLIDE_CONFLICT_LLM_PROVIDERS is set and no explicit `model` is
+    given, the request goes through the conflict router instead, with
+    hedging and fallback across the providers listed there. Routed requests
+    use the chat API; the default path keeps `ollama.generate`.
     
     Args:
         conflict_text: Merge conflict text with markers (<<<<<<<, =======, >>>>>>>)
@@ -58,6 +65,12 @@ async def resolve_merge_conflict(
     Returns:
         Resolved content without conflict markers
     """
+    if model is None and os.getenv("GLIDE_CONFLICT_LLM_PROVIDERS"):
+        router = get_router("GLIDE_CONFLICT_LLM_PROVIDERS", f"ollama:{DEFAULT_MODEL_ID}")
+        resolved_content = await router.complete(conflict_text, cache=False)
+        if not resolved_content:
+            raise RuntimeError("LLM returned empty response")
+        return resolved_content.strip()
     return await asyncio.to_thread(
         _resolve_merge_conflict_sync,
         conflict_text,
@@ -1,22 +1,64 @@
-from src.kite_exclusive.commit_splitter.services.voyage_service import embed_code
-from src.core.LLM.cerebras_inference import complete
+from src.kite_exclusive.commit_splitter.services.voyage_service import (
+    ChunkedEmbedding,
+    chunk_diff_keyed,
+    embedding_cache_key,
+    iter_chunk_batches,
+)
+from src.kite_exclusive.commit_splitter.services.embedding_cache import get_embedding_cache
+from src.kite_exclusive.commit_splitter.services.embedding_service import get_embedding_service
+from src.kite_exclusive.commit_splitter.services.helix_service import (
+    get_helix_client,
+    search_similar_diff,
+)
+from src.kite_exclusive.commit_splitter.git_diff import (
+    FileDiff,
+    ancestor_commits,
+    collect_file_diffs,
+)
+from src.kite_exclusive.commit_splitter.compaction import (
+    CompactedDiff,
+    compact_diffs,
+    savings_report,
+    token_budget,
+)
+from src.kite_exclusive.commit_splitter.commit_writer import (
+    CommitSpec,
+    write_commits_plumbing,
+    write_commits_porcelain,
+)
+from src.kite_exclusive.commit_splitter.ingest import (
+    IngestStats,
+    ingest_history,
+    ingest_incremental,
+    repository_id,
+)
+from src.kite_exclusive.commit_splitter.grouping import DEFAULT_HUNK_THRESHOLD, group_files
+from src.kite_exclusive.commit_splitter.pipeline import (
+    StageLimits,
+    StageProgress,
+    StageSemaphores,
+    map_ordered,
+)
+from src.core.LLM.cerebras_inference import first_line, get_cerebras_limiter
+from src.core.LLM.router import get_router
+from src.core.LLM.completion_cache import get_completion_cache
 from src.kite_exclusive.resolve_conflicts.core import resolve_merge_conflict
 from src.kite_exclusive.resolve_conflicts.morph_service import apply_code_edit
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 import subprocess
 import json
 import os
 import asyncio
+import dataclasses
+import itertools
 import re
 from dotenv import load_dotenv
 import helix
-from fastmcp import FastMCP
+from fastmcp import Context, FastMCP
 load_dotenv()
 
 mcp = FastMCP[Any]("glide")
 
-HELIX_API_ENDPOINT = os.getenv("HELIX_API_ENDPOINT", "")
-
 
 async def find_git_root(start_path: str = None) -> str:
     """
@@ -114,197 +156,41 @@ async def run_subprocess(args: List[str], **kwargs) -> subprocess.CompletedProce
     
     return result
 
-@mcp.tool(
-    name="split_commit",
-    description="Splits a large unified diff / commit into smaller semantically-grouped commits.",
-)
-async def split_commit(workspace_root: str = None):
-    """
-    Split a large commit into smaller semantic commits.
-    
-    Args:
-        workspace_root: Optional path to the workspace root directory. 
-                        If not provided, will attempt to detect from environment variables or current directory.
-    """
-    try:
-        if workspace_root:
-            detected_root = await find_git_root(workspace_root)
-            if detected_root:
-                workspace_root = detected_root
-            elif not os.path.isdir(workspace_root):
-                return f"error: provided workspace_root '{workspace_root}' does not exist or is not a directory."
-        else:
-            workspace_root = await find_git_root()
-            if not workspace_root:
-                cwd = os.getcwd()
-                return (
-                    f"error: could not detect git repository root.\n"
-                    f"Current working directory: {cwd}\n"
-                    f"Please either:\n"
-                    f"  1. Run this tool from within a git repository, or\n"
-                    f"  2. Provide the workspace_root parameter with the path to your git repository root."
-                )
-        
-        staged_proc = await run_subprocess(
-            ["git", "diff", "--cached", "--name-only"], 
-            capture_output=True, 
-            text=True,
-            cwd=workspace_root
-        )
-        unstaged_proc = await run_subprocess(
-            ["git", "diff", "--name-only"], 
-            capture_output=True, 
-            text=True,
-            cwd=workspace_root
-        )
-        untracked_proc = await run_subprocess(
-            ["git", "ls-files", "--others", "--exclude-standard"],
-            capture_output=True,
-            text=True,
-            cwd=workspace_root
-        )
-        
-        error_messages = []
-        if staged_proc.returncode != 0 and staged_proc.stderr:
-            error_messages.append(staged_proc.stderr)
-        if "not a git repository" in " ".join(error_messages).lower():
-            error_msg = f"error: '{workspace_root}' is not a git repository.\n"
-            error_msg += f"Git error: {error_messages[0] if error_messages else 'Unknown error'}\n"
-            error_msg += "Please provide the correct path to your git repository root."
-            return error_msg
-
-        changed_files = set()
-        if staged_proc.returncode == 0:
-            changed_files.update(
-                f.strip() for f in staged_proc.stdout.splitlines() if f.strip()
-            )
-        if unstaged_proc.returncode == 0:
-            changed_files.update(
-                f.strip() for f in unstaged_proc.stdout.splitlines() if f.strip()
-            )
-        if untracked_proc.returncode == 0:
-            changed_files.update(
-                f.strip() for f in untracked_proc.stdout.splitlines() if f.strip()
-            )
-
-        if not changed_files:
-            return "no changes detected (working tree clean)"
-
-        file_to_diff: Dict[str, str] = {}
-        for path in changed_files:
-            p = await run_subprocess(
-                ["git", "diff", "--cached", "--", path], 
-                capture_output=True, 
-                text=True,
-                cwd=workspace_root
-            )
-            if p.returncode == 0 and p.stdout.strip():
-                file_to_diff[path] = p.stdout
-            else:
-                p = await run_subprocess(
-                    ["git", "diff", "--", path], 
-                    capture_output=True, 
-                    text=True,
-                    cwd=workspace_root
-                )
-                if p.returncode == 0 and p.stdout.strip():
-                    file_to_diff[path] = p.stdout
-                else:
-                    file_path = os.path.join(workspace_root, path) if not os.path.isabs(path) else path
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-                            file_to_diff[path] = (
-                                f"diff --git a/{path} b/{path}\nnew file mode 100644\n--- /dev/null\n+++ b/{path}\n@@ -0,0 +1,{len(content.splitlines())} @@\n+{chr(10).join('+'+line for line in content.splitlines())}"
-                            )
-                    except (FileNotFoundError, UnicodeDecodeError):
-                        continue
-
-        if not file_to_diff:
-            return "no per-file diffs produced"
 
-        suggestions: List[Tuple[str, str]] = []
-
-        use_local = os.getenv("HELIX_LOCAL", "false").lower() == "true"
-        
-        if use_local:
-            db = helix.Client(local=True)
-        else:
-            api_endpoint = os.getenv("HELIX_API_ENDPOINT", "")
-            if not api_endpoint:
-                return "error: HELIX_API_ENDPOINT is not set"
-            db = helix.Client(local=False, api_endpoint=api_endpoint)
+def is_generic_message(msg: str) -> bool:
+    """Check if a commit message is too generic."""
+    if not msg:
+        return True
+    msg_lower = msg.lower().strip()
+    
+    # Reject reasoning tag patterns
+    if ("redacted_reasoning" in msg_lower or 
+        "<think>" in msg_lower or 
+        "</think>" in msg_lower):
+        return True
+    
+    generic_patterns = [
+        "update ",
+        "fix bug",
+        "fix issue",
+        "refactor code",
+        "changes",
+        "wip",
+        "misc",
+        "cleanup",
+        "minor",
+        "temporary",
+    ]
+    for pattern in generic_patterns:
+        if msg_lower.startswith(pattern):
+            return True
+    if msg_lower.startswith("update ") and len(msg_lower.split()) <= 3:
+        return True
+    return False
 
-        for file_path, diff_text in file_to_diff.items():
-            try:
-                vec_batch = await asyncio.wait_for(
-                    asyncio.to_thread(embed_code, diff_text, file_path=file_path),
-                    timeout=5
-                )
-            except asyncio.TimeoutError:
-                return f"error: embedding timed out for {file_path}"
-            except Exception as embed_exc:
-                return f"error: embedding failed for {file_path}: {str(embed_exc)}"
-            
-            if not vec_batch:
-                return f"error: embedding returned empty result for {file_path}"
-            vec = vec_batch[0]
 
-            try:
-                res = await asyncio.wait_for(
-                    asyncio.to_thread(db.query, "getSimilarDiffsByVector", {"vec": vec, "k": 8}),
-                    timeout=5
-                )
-            except (asyncio.TimeoutError, Exception):
-                res = []
-            
-            examples = []
-            if isinstance(res, list):
-                for row in res[:5]:
-                    if isinstance(row, dict):
-                        ex_msg = row.get("commit_message") or ""
-                        ex_sum = row.get("summary") or ""
-                        ex_path = row.get("file_path") or ""
-                        if ex_msg or ex_sum:
-                            examples.append(
-                                f"file:{ex_path}\nmessage:{ex_msg}\nsummary:{ex_sum}"
-                            )
-
-            example_block = "\n\n".join(examples) if examples else ""
-            
-            def is_generic_message(msg: str) -> bool:
-                """Check if a commit message is too generic."""
-                if not msg:
-                    return True
-                msg_lower = msg.lower().strip()
-                
-                # Reject reasoning tag patterns
-                if ("redacted_reasoning" in msg_lower or 
-                    "<think>" in msg_lower or 
-                    "</think>" in msg_lower):
-                    return True
-                
-                generic_patterns = [
-                    "update ",
-                    "fix bug",
-                    "fix issue",
-                    "refactor code",
-                    "changes",
-                    "wip",
-                    "misc",
-                    "cleanup",
-                    "minor",
-                    "temporary",
-                ]
-                for pattern in generic_patterns:
-                    if msg_lower.startswith(pattern):
-                        return True
-                if msg_lower.startswith("update ") and len(msg_lower.split()) <= 3:
-                    return True
-                return False
-            
-            system_prompt = (
-                """You are a senior engineer writing conventional commit messages. Analyze the diff carefully to understand what actually changed.
+COMMIT_SYSTEM_PROMPT = (
+    """You are a senior engineer writing conventional commit messages. Analyze the diff carefully to understand what actually changed.
 
 CRITICAL REQUIREMENTS:
 - Write ONLY a single, concise commit title (under 50 characters preferred)
@@ -345,81 +231,606 @@ EXAMPLES OF BAD MESSAGES (DO NOT USE):
 - "Changes"
 
 Remember: Your output must be SPECIFIC and describe WHAT changed, not generic file operations."""
-            )
-            user_prompt = (
-                "/no_think\n\nGenerate a commit message for this diff. Consider similar past changes if given.\n\n"
-                f"DIFF (truncated if long):\n{diff_text}\n\n"
-                f"SIMILAR EXAMPLES:\n{example_block}\n\n"
-                "Output ONLY the commit message title, nothing else."
-            )
-            
+)
+
+
+def commit_llm_router():
+    """Router for commit-message generation; providers come from GLIDE_COMMIT_LLM_PROVIDERS."""
+    return get_router("GLIDE_COMMIT_LLM_PROVIDERS", "cerebras")
+
+
+def clean_commit_message(raw_response: str) -> Optional[str]:
+    """Strip reasoning tags and quotes from an LLM reply and return its first line."""
+    # Strip reasoning tags from response (e.g., <think>, </think>, <think>, etc.)
+    cleaned_response = raw_response.strip()
+    # Remove XML-like reasoning tags
+    cleaned_response = re.sub(r'<[^>]*think[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
+    cleaned_response = re.sub(r'<[^>]*reasoning[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
+    cleaned_response = re.sub(r'<[^>]*redacted[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
+    
+    # Extract first non-empty line after cleaning
+    lines = [line.strip() for line in cleaned_response.splitlines() if line.strip()]
+    if not lines:
+        return None
+    
+    commit_message = lines[0]
+    
+    if commit_message.startswith('"') and commit_message.endswith('"'):
+        commit_message = commit_message[1:-1]
+    if commit_message.startswith("'") and commit_message.endswith("'"):
+        commit_message = commit_message[1:-1]
+    return commit_message
+
+
+async def embed_file_diffs(
+    unit_diffs: Dict[str, FileDiff],
+    stages: StageSemaphores,
+    progress: Optional[StageProgress] = None,
+) -> Dict[str, Any]:
+    """
+    Embed every diff (or hunk) with as few provider calls as the batch limits allow.
+
+    Diffs found in the embedding cache skip the network entirely. The rest are
+    chunked lazily in a worker thread and their chunks packed into batches;
+    each batch goes through the shared embedding service under the embed stage
+    semaphore, which rate-limits and retries provider calls, and the chunk
+    vectors are pooled into one vector per unit. At most as many batches as the
+    embed stage allows are in flight, and the next one is only chunked when a
+    slot frees up, so the chunk texts of a large change are never all held at
+    once. Units whose batch failed map to a RuntimeError instead of a vector.
+
+    Args:
+        unit_diffs: unit id -> its diff; unit ids are file paths unless hunks are split
+        stages: Per-backend concurrency limits
+        progress: Reports "embedded" progress as cached lookups and batches finish
+    """
+    cache = get_embedding_cache()
+    keys = await asyncio.to_thread(
+        lambda: {u: embedding_cache_key(d.text, file_path=d.path) for u, d in unit_diffs.items()}
+    )
+    cached = await asyncio.to_thread(cache.get_many, keys.values())
+    vectors: Dict[str, Any] = {u: cached[k] for u, k in keys.items() if k in cached}
+    progress = progress or StageProgress()
+    done = len(vectors)
+    await progress.update("embedded", done, len(unit_diffs))
+
+    service = get_embedding_service()
+
+    async def run_batch(batch: List[Tuple[str, List[str]]]) -> List[ChunkedEmbedding]:
+        nonlocal done
+        try:
+            async with stages.embed:
+                return await service.embed_chunked(batch)
+        finally:
+            done += len(batch)
+            await progress.update("embedded", done, len(unit_diffs))
+
+    # Vectors are stored under the key of the chunker that actually ran
+    store_keys: Dict[str, str] = {}
+
+    def chunked() -> Iterator[Tuple[str, List[str]]]:
+        for unit, diff in unit_diffs.items():
+            if unit not in vectors:
+                chunks, store_keys[unit] = chunk_diff_keyed(diff.text, file_path=diff.path)
+                yield unit, chunks
+
+    fresh: List[Tuple[str, List[float]]] = []
+
+    def collect(batch: List[Tuple[str, List[str]]], job: asyncio.Future) -> None:
+        error = job.exception()
+        result = job.result() if error is None else []
+        for pos, (unit, _) in enumerate(batch):
+            if error is not None:
+                vectors[unit] = RuntimeError(f"error: embedding failed for {unit}: {str(error)}")
+            elif pos >= len(result) or not result[pos].vector:
+                vectors[unit] = RuntimeError(f"error: embedding returned empty result for {unit}")
+            else:
+                vectors[unit] = result[pos].vector
+                fresh.append((store_keys[unit], result[pos].vector))
+
+    batches = iter_chunk_batches(chunked())
+    jobs: Dict[asyncio.Future, List[Tuple[str, List[str]]]] = {}
+    try:
+        while (batch := await asyncio.to_thread(next, batches, None)) is not None:
+            jobs[asyncio.ensure_future(run_batch(batch))] = batch
+            if len(jobs) >= stages.limits.embed:
+                finished, _ = await asyncio.wait(jobs, return_when=asyncio.FIRST_COMPLETED)
+                for job in finished:
+                    collect(jobs.pop(job), job)
+        if jobs:
+            finished, _ = await asyncio.wait(jobs)
+            for job in finished:
+                collect(jobs.pop(job), job)
+    finally:
+        for job in jobs:
+            job.cancel()
+    await asyncio.to_thread(cache.put_many, fresh)
+    return vectors
+
+
+SEARCH_SCOPES = ("branch", "repo", "all")
+# Candidates fetched per file for branch scope, before the ancestor filter
+BRANCH_SEARCH_K = 24
+
+
+async def find_similar_examples(
+    vectors: Dict[str, Any],
+    db: helix.Client,
+    stages: StageSemaphores,
+    workspace_root: Optional[str] = None,
+    scope: str = "branch",
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Look up similar past diffs for every embedded file.
+
+    One search per file, at most `stages.limits.search` in flight, each with
+    its own timeout. Search is best-effort: a file whose search fails or times
+    out simply gets no examples, without affecting the others. Files whose
+    embedding failed are skipped.
+
+    Args:
+        vectors: unit id -> embedding (or the exception that replaced it)
+        db: Helix client
+        stages: Per-backend concurrency limits
+        workspace_root: Repository whose history scopes the search
+        scope: "all" searches every repository in the instance; "repo" only
+               this repository's diffs (pre-filtered inside Helix); "branch"
+               additionally drops diffs whose commit is not an ancestor of HEAD
+               in the local history. That filter runs after the search, so
+               branch scope over-fetches; if more than BRANCH_SEARCH_K
+               closer hits come from other branches, a file can still end up
+               with fewer examples than the other scopes give it
+    """
+    paths = [p for p, vec in vectors.items() if not isinstance(vec, BaseException)]
+    repo_id = None
+    if scope != "all" and workspace_root:
+        repo_id = await asyncio.to_thread(repository_id, workspace_root)
+    # Only the repo-scoped search returns exactly the candidates we can use;
+    # the others over-fetch to leave room for filtering and foreign results
+    k = {"repo": 5, "branch": BRANCH_SEARCH_K}.get(scope, 8)
+
+    async def search(vec: Any) -> List[Dict[str, Any]]:
+        async with stages.search:
             try:
-                raw_response = await asyncio.wait_for(
-                    complete(user_prompt, system=system_prompt, temperature=0.0),
-                    timeout=30.0
+                return await asyncio.wait_for(
+                    asyncio.to_thread(search_similar_diff, db, vec, k, repo_id),
+                    timeout=5
                 )
-            except asyncio.TimeoutError:
-                return f"error: Cerebras inference timed out for {file_path}"
-            except Exception as llm_exc:
-                return f"error: Cerebras inference failed for {file_path}: {str(llm_exc)}"
-            
-            if not raw_response:
-                return f"error: Cerebras inference returned empty response for {file_path}"
-            
-            # Strip reasoning tags from response (e.g., <think>, </think>, <think>, etc.)
-            cleaned_response = raw_response.strip()
-            # Remove XML-like reasoning tags
-            cleaned_response = re.sub(r'<[^>]*think[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
-            cleaned_response = re.sub(r'<[^>]*reasoning[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
-            cleaned_response = re.sub(r'<[^>]*redacted[^>]*>', '', cleaned_response, flags=re.IGNORECASE)
-            
-            # Extract first non-empty line after cleaning
-            lines = [line.strip() for line in cleaned_response.splitlines() if line.strip()]
-            if not lines:
-                return f"error: No valid commit message found in response for {file_path} after cleaning reasoning tags"
-            
-            commit_message = lines[0]
-            
-            if commit_message.startswith('"') and commit_message.endswith('"'):
-                commit_message = commit_message[1:-1]
-            if commit_message.startswith("'") and commit_message.endswith("'"):
-                commit_message = commit_message[1:-1]
-            
-            if not commit_message or is_generic_message(commit_message):
+            except (asyncio.TimeoutError, Exception):
+                return []
+
+    groups = await asyncio.gather(*(search(vectors[p]) for p in paths))
+    similar = {p: rows for p, rows in zip(paths, groups)}
+
+    if scope == "branch" and workspace_root:
+        ancestors = await ancestor_commits(
+            workspace_root,
+            (row.get("commit_id") for rows in similar.values() for row in rows),
+        )
+        similar = {
+            p: [row for row in rows if row.get("commit_id") in ancestors]
+            for p, rows in similar.items()
+        }
+    return similar
+
+
+async def suggest_commit_message(
+    paths: List[str],
+    diff_text: str,
+    similar: Dict[str, List[Dict[str, Any]]],
+    stages: StageSemaphores,
+) -> Tuple[List[str], str]:
+    """
+    Run the LLM for one commit group (a single file unless grouping is on),
+    given the group's compacted diff and similar past diffs. Files without an
+    embedding simply contribute no examples.
+
+    The LLM call goes through the commit-message router (hedged across the
+    configured providers), and the reply is streamed and cancelled as soon as
+    its first complete line arrives. The call holds the llm stage semaphore so the number of
+    in-flight requests stays bounded when groups run concurrently.
+
+    Returns:
+        (paths, commit_message)
+
+    Raises:
+        RuntimeError: with a user-facing error message if the LLM stage fails
+    """
+    file_path = ", ".join(paths)
+
+    # Interleave each file's neighbours so every file contributes examples
+    rows: List[Dict[str, Any]] = []
+    seen = set()
+    for group in itertools.zip_longest(*(similar.get(path, []) for path in paths)):
+        for row in group:
+            if row is not None and row.get("diff_id") not in seen:
+                seen.add(row.get("diff_id"))
+                rows.append(row)
+
+    examples = []
+    for row in rows[:5]:
+        ex_msg = row.get("commit_message") or ""
+        ex_sum = row.get("summary") or ""
+        ex_path = row.get("file_path") or ""
+        if ex_msg or ex_sum:
+            examples.append(
+                f"file:{ex_path}\nmessage:{ex_msg}\nsummary:{ex_sum}"
+            )
+
+    example_block = "\n\n".join(examples) if examples else ""
+    
+    user_prompt = (
+        "/no_think\n\nGenerate a commit message for this diff. Consider similar past changes if given.\n\n"
+        f"DIFF (context collapsed and large files summarized to fit the prompt):\n{diff_text}\n\n"
+        f"SIMILAR EXAMPLES:\n{example_block}\n\n"
+        "Output ONLY the commit message title, nothing else."
+    )
+    
+    try:
+        async with stages.llm:
+            raw_response = await asyncio.wait_for(
+                commit_llm_router().complete(
+                    user_prompt, system=COMMIT_SYSTEM_PROMPT, temperature=0.0, until=first_line
+                ),
+                timeout=30.0
+            )
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"error: LLM inference timed out for {file_path}")
+    except Exception as llm_exc:
+        raise RuntimeError(f"error: LLM inference failed for {file_path}: {str(llm_exc)}")
+    
+    if not raw_response:
+        raise RuntimeError(f"error: LLM inference returned empty response for {file_path}")
+    
+    commit_message = clean_commit_message(raw_response)
+    if commit_message is None:
+        raise RuntimeError(
+            f"error: No valid commit message found in response for {file_path} after cleaning reasoning tags"
+        )
+    
+    if not commit_message or is_generic_message(commit_message):
+        raise RuntimeError(
+            f"error: LLM inference generated generic message '{commit_message}' for {file_path}"
+        )
+
+    return paths, commit_message
+
+
+def build_commit_specs(
+    suggestions: List[Tuple[List[str], str]],
+    file_diffs: Dict[str, FileDiff],
+    unit_hunks: Dict[str, Tuple[str, int]],
+) -> List[CommitSpec]:
+    """
+    Turn grouped units into commit specs.
+
+    Whole-file units (plus the old path of renames) are staged from the
+    working tree; hunk units become partial patches rebased onto the hunks
+    of the same file committed by earlier groups.
+    """
+    specs: List[CommitSpec] = []
+    applied: Dict[str, List[int]] = {}
+    for units, message in suggestions:
+        spec = CommitSpec(message=message)
+        hunks: Dict[str, List[int]] = {}
+        for unit in units:
+            if unit in unit_hunks:
+                path, index = unit_hunks[unit]
+                hunks.setdefault(path, []).append(index)
+            else:
+                spec.paths.append(unit)
+                if file_diffs[unit].status == "renamed":
+                    spec.paths.append(file_diffs[unit].old_path)
+        for path, indices in hunks.items():
+            spec.patches.append(file_diffs[path].partial_patch(indices, applied.get(path, [])))
+            applied.setdefault(path, []).extend(indices)
+        specs.append(spec)
+    return specs
+
+
+@mcp.tool(
+    name="split_commit",
+    description="Splits a large unified diff / commit into smaller semantically-grouped commits.",
+)
+async def split_commit(
+    workspace_root: str = None,
+    embed_concurrency: Optional[int] = None,
+    search_concurrency: Optional[int] = None,
+    llm_concurrency: Optional[int] = None,
+    similarity_threshold: Optional[float] = None,
+    path_weight: float = 0.2,
+    split_hunks: bool = False,
+    prompt_token_budget: Optional[int] = None,
+    atomic: bool = True,
+    run_hooks: bool = True,
+    search_scope: str = "branch",
+    ctx: Optional[Context] = None,
+):
+    """
+    Split a large commit into smaller semantic commits.
+    
+    Files are processed concurrently; each backend (embedding, Helix search,
+    LLM) has its own in-flight limit. Commits are created in path order.
+
+    Progress is reported to the MCP client per stage (diffed, embedded,
+    searched, generated, committed), including each commit message as soon as
+    it is ready. A group whose message cannot be generated is left uncommitted
+    and listed under "failed"; the other groups are still committed.
+    
+    Args:
+        workspace_root: Optional path to the workspace root directory. 
+                        If not provided, will attempt to detect from environment variables or current directory.
+        embed_concurrency: Max concurrent embedding calls (default GLIDE_EMBED_CONCURRENCY or 4)
+        search_concurrency: Max concurrent Helix searches (default GLIDE_SEARCH_CONCURRENCY or 8)
+        llm_concurrency: Max concurrent LLM calls (default GLIDE_LLM_CONCURRENCY or 4)
+        similarity_threshold: If set, cluster files whose diff embeddings have at least
+                              this cosine similarity (e.g. 0.8) into multi-file commits.
+                              If omitted, every file gets its own commit.
+        path_weight: Weight in [0, 1] given to directory proximity when grouping
+        split_hunks: Split modified files into hunks and group hunks instead of whole
+                     files, so one file's edits can land in several commits. Implies
+                     grouping (similarity_threshold defaults to 0.8).
+        prompt_token_budget: Max diff tokens per commit-message prompt
+                             (default GLIDE_PROMPT_TOKEN_BUDGET or 6000)
+        atomic: Build all commits with git plumbing in a temporary index and move
+                the branch once at the end, so a failure leaves HEAD untouched.
+                If False, commits are made one by one with `git commit`.
+        run_hooks: Run the pre-commit and commit-msg hooks for each commit
+                   (`git commit` always runs them when atomic is False)
+        search_scope: Which past diffs may serve as examples: "branch" (commits
+                      reachable from HEAD), "repo" (this repository) or "all"
+        ctx: MCP request context, injected by FastMCP; used for progress reporting
+    """
+    try:
+        if search_scope not in SEARCH_SCOPES:
+            return f"error: search_scope must be one of {', '.join(SEARCH_SCOPES)}."
+        if workspace_root:
+            detected_root = await find_git_root(workspace_root)
+            if detected_root:
+                workspace_root = detected_root
+            elif not os.path.isdir(workspace_root):
+                return f"error: provided workspace_root '{workspace_root}' does not exist or is not a directory."
+        else:
+            workspace_root = await find_git_root()
+            if not workspace_root:
+                cwd = os.getcwd()
                 return (
-                    f"error: Cerebras inference generated generic message '{commit_message}' for {file_path}"
+                    f"error: could not detect git repository root.\n"
+                    f"Current working directory: {cwd}\n"
+                    f"Please either:\n"
+                    f"  1. Run this tool from within a git repository, or\n"
+                    f"  2. Provide the workspace_root parameter with the path to your git repository root."
                 )
+        
+        try:
+            file_diffs = await collect_file_diffs(workspace_root)
+        except RuntimeError as git_exc:
+            if "not a git repository" in str(git_exc).lower():
+                error_msg = f"error: '{workspace_root}' is not a git repository.\n"
+                error_msg += f"Git error: {git_exc}\n"
+                error_msg += "Please provide the correct path to your git repository root."
+                return error_msg
+            raise
+
+        if not file_diffs:
+            return "no changes detected (working tree clean)"
+
+        # Commit units are whole files, or single hunks when split_hunks is on
+        unit_diffs: Dict[str, FileDiff] = {}
+        unit_hunks: Dict[str, Tuple[str, int]] = {}
+        for path, file_diff in file_diffs.items():
+            if split_hunks and file_diff.splittable:
+                n = len(file_diff.hunks)
+                for i, hunk in enumerate(file_diff.hunks):
+                    unit = f"{path} (hunk {i + 1}/{n})"
+                    unit_diffs[unit] = dataclasses.replace(file_diff, hunks=[hunk])
+                    unit_hunks[unit] = (path, i)
+            else:
+                unit_diffs[path] = file_diff
+        progress = StageProgress(ctx)
+        await progress.update("diffed", len(unit_diffs), len(unit_diffs))
+        if split_hunks and similarity_threshold is None:
+            similarity_threshold = DEFAULT_HUNK_THRESHOLD
+
+        suggestions: List[Tuple[List[str], str]] = []
+
+        try:
+            db = get_helix_client()
+        except RuntimeError as helix_exc:
+            return f"error: {helix_exc}"
 
-            suggestions.append((file_path, commit_message))
+        stages = StageSemaphores(
+            StageLimits.from_env(
+                embed=embed_concurrency,
+                search=search_concurrency,
+                llm=llm_concurrency,
+            )
+        )
+        vectors = await embed_file_diffs(unit_diffs, stages, progress)
+        similar = await find_similar_examples(vectors, db, stages, workspace_root, search_scope)
+        await progress.update("searched", len(similar), len(unit_diffs))
+        if similarity_threshold is not None:
+            embedded = [p for p, vec in vectors.items() if not isinstance(vec, BaseException)]
+            groups = group_files(
+                embedded,
+                [vectors[p] for p in embedded],
+                similarity_threshold,
+                path_weight,
+                file_paths=[unit_diffs[p].path for p in embedded],
+            )
+            groups += [[p] for p in unit_diffs if p not in embedded]
+            order = {unit: i for i, unit in enumerate(unit_diffs)}
+            groups.sort(key=lambda g: order[g[0]])
+        else:
+            groups = [[p] for p in unit_diffs]
 
-        if not suggestions:
-            return "no commit suggestions could be generated"
+        budget = prompt_token_budget or token_budget()
+        compacted: Dict[str, CompactedDiff] = {}
+        prompt_diffs: List[str] = []
+        for group in groups:
+            parts = compact_diffs([unit_diffs[unit] for unit in group], budget)
+            compacted.update(zip(group, parts))
+            prompt_diffs.append("\n".join(part.text for part in parts))
 
-        for file_path, message in suggestions:
+        def describe(paths: List[str]) -> Dict[str, Any]:
+            return {"file": paths[0]} if len(paths) == 1 else {"files": paths}
+
+        generated = 0
+
+        async def generate(i: int) -> Tuple[List[str], str]:
+            nonlocal generated
             try:
-                await run_subprocess(
-                    ["git", "add", "--", file_path], 
-                    check=True,
-                    cwd=workspace_root
-                )
-                await run_subprocess(
-                    ["git", "commit", "-m", message], 
-                    check=True,
-                    cwd=workspace_root
+                paths, message = await suggest_commit_message(
+                    groups[i], prompt_diffs[i], similar, stages
                 )
+            except Exception:
+                generated += 1
+                await progress.update("generated", generated, len(groups), f"{', '.join(groups[i])} failed")
+                raise
+            generated += 1
+            await progress.update("generated", generated, len(groups), f"{', '.join(paths)} -> {message}")
+            return paths, message
+
+        # Units without an embedding still get a message, just without examples
+        warnings = [str(vec) for vec in vectors.values() if isinstance(vec, BaseException)]
+        failed: List[Dict[str, Any]] = []
+        results = await map_ordered(range(len(groups)), generate)
+        for group, result in zip(groups, results):
+            if isinstance(result, Exception):
+                failed.append({**describe(group), "error": str(result)})
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                suggestions.append(result)
+
+        commit_error = None
+        committed = suggestions
+        if suggestions:
+            specs = build_commit_specs(suggestions, file_diffs, unit_hunks)
+            head = await run_subprocess(
+                ["git", "rev-parse", "-q", "--verify", "HEAD"], text=True, cwd=workspace_root
+            )
+            try:
+                if atomic:
+                    await write_commits_plumbing(workspace_root, specs, run_hooks=run_hooks)
+                else:
+                    await write_commits_porcelain(workspace_root, specs)
             except subprocess.CalledProcessError as e:
-                return (
-                    f"Failed to add or commit '{file_path}' with message '{message}'.\n"
-                    f"Git error: {e}\n"
-                    "Ensure the file exists, is not conflicted, and git is functioning properly."
+                details = "\n".join(
+                    part for part in (f"Git error: {e}", (e.stderr or "").strip()) if part
+                )
+                commit_error = (
+                    f"Failed to write the split commits"
+                    f"{' (HEAD was left unchanged)' if atomic else ''}.\n"
+                    f"{details}\n"
+                    "Ensure the files are not conflicted and git is functioning properly."
                 )
+                landed = 0
+                if not atomic and head.returncode == 0:
+                    count = await run_subprocess(
+                        ["git", "rev-list", "--count", f"{head.stdout.strip()}..HEAD"],
+                        text=True,
+                        cwd=workspace_root,
+                    )
+                    landed = int(count.stdout.strip() or 0) if count.returncode == 0 else 0
+                committed = suggestions[:landed]
+        await progress.update("committed", len(committed), len(suggestions))
 
-        report = {"commits": [{"file": f, "message": m} for f, m in suggestions]}
+        report: Dict[str, Any] = {
+            "commits": [{**describe(p), "message": m} for p, m in committed],
+        }
+        if len(committed) < len(suggestions):
+            report["uncommitted"] = [
+                {**describe(p), "message": m} for p, m in suggestions[len(committed):]
+            ]
+        if commit_error:
+            report["commit_error"] = commit_error
+        if failed:
+            report["failed"] = failed
+        if warnings:
+            report["warnings"] = warnings
+        report["embedding_cache"] = get_embedding_cache().stats()
+        report["embedding_service"] = get_embedding_service().stats()
+        report["llm_cache"] = get_completion_cache().stats()
+        report["llm_router"] = commit_llm_router().stats()
+        report["llm_limiter"] = get_cerebras_limiter().stats()
+        report["compaction"] = savings_report(compacted)
         return json.dumps(report, indent=2)
 
     except Exception as e:
         return f"failed to split commit: {str(e)}"
 
+@mcp.tool(
+    name="ingest_history",
+    description="Loads a repository's git history (commits, files, diffs and their embeddings) into the Helix graph used to find similar past changes.",
+)
+async def ingest_git_history(
+    workspace_root: Optional[str] = None,
+    rev: str = "HEAD",
+    branch: Optional[str] = None,
+    batch_size: int = 64,
+    concurrency: int = 8,
+    incremental: bool = True,
+    ctx: Optional[Context] = None,
+):
+    """
+    Stream a repository's history into Helix so split_commit can retrieve
+    similar past diffs as examples.
+
+    Incremental runs only read commits beyond the branch's recorded watermark
+    and checkpoint after every batch, so repeated or interrupted runs are cheap.
+
+    Args:
+        workspace_root: Path to the git repository; detected from the environment if omitted
+        rev: Revision whose history is ingested; other than HEAD, implies a full run
+        branch: Branch name to record (default: current branch)
+        batch_size: Commits embedded and loaded per batch
+        concurrency: Max in-flight Helix requests
+        incremental: Resume from the branch watermark (GLIDE_INGEST_STATE_PATH)
+        ctx: MCP request context, injected by FastMCP; used for progress reporting
+    """
+    try:
+        detected_root = await find_git_root(workspace_root)
+        if not detected_root:
+            return f"error: could not find a git repository at '{workspace_root or os.getcwd()}'."
+
+        try:
+            db = get_helix_client()
+        except RuntimeError as helix_exc:
+            return f"error: {helix_exc}"
+
+        async def report(stats: IngestStats, total: int) -> None:
+            if ctx is None:
+                return
+            try:
+                await ctx.report_progress(
+                    stats.commits + stats.skipped,
+                    total or None,
+                    f"{stats.commits} commits loaded, {stats.skipped} already present, "
+                    f"{stats.diffs} diffs, {stats.commits_per_s:.1f} commits/s",
+                )
+            except Exception:
+                pass
+
+        options = dict(
+            branch=branch,
+            db=db,
+            batch_size=max(1, batch_size),
+            concurrency=max(1, concurrency),
+            on_batch=report,
+        )
+        if incremental and rev == "HEAD":
+            stats = await ingest_incremental(detected_root, **options)
+            if stats is None:
+                return "error: another ingestion of this branch is already running."
+        else:
+            stats = await ingest_history(detected_root, rev, **options)
+        return json.dumps(stats.as_dict(), indent=2)
+
+    except Exception as e:
+        return f"failed to ingest history: {str(e)}"
+
+
 async def get_conflicted_files(workspace_root: str) -> List[str]:
     """
     Find all files with merge conflicts in the git repository.
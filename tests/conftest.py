@@ -0,0 +1,80 @@
+import json
+import asyncio
+from typing import Awaitable, Callable, List
+
+import pytest
+import pytest_asyncio
+
+import src.core.LLM.completion_cache as completion_cache
+import src.kite_exclusive.commit_splitter.services.embedding_cache as embedding_cache
+from src.core.LLM.router import OpenAICompatibleProvider
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(monkeypatch):
+    """Keep the process-wide completion and embedding caches in memory, fresh per test."""
+    monkeypatch.setattr(completion_cache, "_cache", completion_cache.CompletionCache(":memory:"))
+    monkeypatch.setattr(embedding_cache, "_cache", embedding_cache.EmbeddingCache(":memory:"))
+
+
+class ChatStub:
+    """Minimal OpenAI-style streaming chat completions endpoint."""
+
+    def __init__(self, reply: str, delay_s: float = 0.0, status: int = 200):
+        self.reply = reply
+        self.delay_s = delay_s
+        self.status = status
+        self.requests = 0
+        self.port = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.requests += 1
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            for line in head.decode("latin-1").split("\r\n"):
+                if line.lower().startswith("content-length:"):
+                    await reader.readexactly(int(line.split(":", 1)[1]))
+            await asyncio.sleep(self.delay_s)
+            if self.status != 200:
+                payload = json.dumps({"error": {"message": "stub error", "type": "server_error"}}).encode()
+                writer.write(
+                    f"HTTP/1.1 {self.status} Error\r\nContent-Type: application/json\r\n".encode()
+                    + f"Connection: close\r\nContent-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+            else:
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nConnection: close\r\n\r\n")
+                chunk = {
+                    "id": "stub",
+                    "object": "chat.completion.chunk",
+                    "created": 0,
+                    "model": "stub",
+                    "choices": [{"index": 0, "delta": {"content": self.reply}}],
+                }
+                writer.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def provider(self) -> OpenAICompatibleProvider:
+        return OpenAICompatibleProvider("stub", base_url=f"http://127.0.0.1:{self.port}/v1")
+
+
+@pytest_asyncio.fixture
+async def chat_stub() -> Callable[..., Awaitable[ChatStub]]:
+    """Start ChatStub servers on free local ports; all are closed after the test."""
+    servers: List[asyncio.AbstractServer] = []
+
+    async def start(reply: str, delay_s: float = 0.0, status: int = 200) -> ChatStub:
+        stub = ChatStub(reply, delay_s, status)
+        server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+        stub.port = server.sockets[0].getsockname()[1]
+        servers.append(server)
+        return stub
+
+    yield start
+    for server in servers:
+        server.close()
+        await server.wait_closed()
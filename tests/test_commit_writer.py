@@ -0,0 +1,112 @@
+import subprocess
+
+import pytest
+
+from src.kite_exclusive.commit_splitter.commit_writer import (
+    CommitSpec,
+    write_commits_plumbing,
+    write_commits_porcelain,
+)
+from src.kite_exclusive.commit_splitter.git_diff import parse_unified_diff
+
+
+def _git(repo, *args, input=None) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=repo, input=input, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository with two unstaged hunks in module.py and a new file notes.md."""
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    _git(tmp_path, "config", "user.name", "test")
+    original = [f"line {i}" for i in range(1, 41)]
+    (tmp_path / "module.py").write_text("\n".join(original) + "\n")
+    (tmp_path / "other.py").write_text("other\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-qm", "init")
+
+    changed = list(original)
+    changed[2] = "line 3 changed"
+    changed[35] = "line 36 changed"
+    (tmp_path / "module.py").write_text("\n".join(changed) + "\n")
+    (tmp_path / "notes.md").write_text("notes\n")
+    return tmp_path
+
+
+def _committed_paths(repo, commit) -> list:
+    return _git(repo, "show", "--name-only", "--format=", commit).split()
+
+
+@pytest.mark.asyncio
+async def test_porcelain_keeps_unrelated_staged_changes(repo):
+    # Staged by the user but not part of any spec, e.g. a dropped group
+    (repo / "other.py").write_text("other staged\n")
+    _git(repo, "add", "other.py")
+
+    (diff,) = parse_unified_diff(_git(repo, "diff", "--no-color", "--", "module.py"))
+    first = diff.partial_patch([0])
+    specs = [
+        CommitSpec("feat: first hunk", patches=[first]),
+        CommitSpec("docs: notes", paths=["notes.md"]),
+    ]
+    commits = await write_commits_porcelain(str(repo), specs)
+
+    assert [_committed_paths(repo, c) for c in commits] == [["module.py"], ["notes.md"]]
+    assert "line 36 changed" not in _git(repo, "show", f"{commits[0]}:module.py")
+    assert _git(repo, "diff", "--cached", "--name-only").split() == ["other.py"]
+    assert _git(repo, "show", ":other.py") == "other staged\n"
+    # The hunk left out stays in the working tree only
+    assert "line 36 changed" in _git(repo, "diff", "--", "module.py")
+
+
+def _module_hunks(repo):
+    (diff,) = parse_unified_diff(_git(repo, "diff", "--no-color", "--", "module.py"))
+    return diff.partial_patch([0]), diff.partial_patch([1], applied=[0])
+
+
+@pytest.mark.asyncio
+async def test_plumbing_spreads_one_file_over_several_commits(repo):
+    head = _git(repo, "rev-parse", "HEAD").strip()
+    (repo / "other.py").write_text("other staged\n")
+    _git(repo, "add", "other.py")
+
+    first, second = _module_hunks(repo)
+    specs = [
+        CommitSpec("feat: first hunk", patches=[first]),
+        CommitSpec("feat: second hunk", paths=["notes.md"], patches=[second]),
+    ]
+    commits = await write_commits_plumbing(str(repo), specs)
+
+    assert _git(repo, "rev-parse", "HEAD").strip() == commits[-1]
+    assert _git(repo, "rev-list", "--reverse", f"{head}..HEAD").split() == commits
+    assert _git(repo, "log", "--format=%s", "-2").splitlines() == ["feat: second hunk", "feat: first hunk"]
+    assert "line 36 changed" not in _git(repo, "show", f"{commits[0]}:module.py")
+    assert _git(repo, "show", f"{commits[1]}:module.py") == (repo / "module.py").read_text()
+    # Committed paths match the new HEAD; the unrelated staged file is untouched
+    assert _git(repo, "diff", "--cached", "--name-only").split() == ["other.py"]
+    assert _git(repo, "diff", "--name-only") == ""
+    assert _git(repo, "show", ":other.py") == "other staged\n"
+
+
+@pytest.mark.asyncio
+async def test_plumbing_failure_leaves_head_and_index(repo):
+    head = _git(repo, "rev-parse", "HEAD").strip()
+    hook = repo / ".git" / "hooks" / "commit-msg"
+    hook.write_text("#!/bin/sh\ngrep -q '^fix' \"$1\"\n")
+    hook.chmod(0o755)
+
+    first, second = _module_hunks(repo)
+    specs = [
+        CommitSpec("fix: first hunk", patches=[first]),
+        CommitSpec("feat: rejected by the hook", patches=[second]),
+    ]
+    with pytest.raises(subprocess.CalledProcessError):
+        await write_commits_plumbing(str(repo), specs)
+
+    assert _git(repo, "rev-parse", "HEAD").strip() == head
+    assert _git(repo, "diff", "--cached", "--name-only") == ""
+    assert "line 36 changed" in _git(repo, "diff", "--", "module.py")
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from src.core.LLM.concurrency import AdaptiveLimiter
+
+
+async def _fill(limiter: AdaptiveLimiter):
+    return [await limiter.acquire() for _ in range(int(limiter.limit))]
+
+
+@pytest.mark.asyncio
+async def test_successes_at_full_window_grow_limit():
+    limiter = AdaptiveLimiter(4, max_limit=8)
+    for permit in await _fill(limiter):
+        permit.release()
+    # Only the first release happens with the window full
+    assert limiter.limit == 4.25
+
+
+@pytest.mark.asyncio
+async def test_successes_below_limit_do_not_grow_it():
+    limiter = AdaptiveLimiter(4)
+    permit = await limiter.acquire()
+    permit.release()
+    assert limiter.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_growth_is_capped_at_max_limit():
+    limiter = AdaptiveLimiter(4, max_limit=5)
+    for _ in range(20):
+        for permit in await _fill(limiter):
+            permit.release()
+    assert limiter.limit == 5
+
+
+@pytest.mark.asyncio
+async def test_overload_halves_limit_once_per_window():
+    limiter = AdaptiveLimiter(8)
+    permits = await _fill(limiter)
+    for permit in permits[:4]:
+        permit.release(overloaded=True)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+    assert limiter.overloads == 4
+
+    # Permits taken after the decrease belong to a new window
+    for permit in permits[4:]:
+        permit.release(ok=False)
+    permit = await limiter.acquire()
+    permit.release(overloaded=True)
+    assert limiter.limit == 2
+    assert limiter.decreases == 2
+
+
+@pytest.mark.asyncio
+async def test_backoff_stops_at_min_limit():
+    limiter = AdaptiveLimiter(4, min_limit=2)
+    for _ in range(5):
+        permit = await limiter.acquire()
+        permit.release(overloaded=True)
+    assert limiter.limit == 2
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_admitted_when_slots_free():
+    limiter = AdaptiveLimiter(2, max_limit=2)
+    held = await _fill(limiter)
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+    assert limiter.stats()["queued"] == 1
+
+    held[0].release()
+    permit = await asyncio.wait_for(waiter, 1.0)
+    assert limiter.in_flight == 2
+    permit.release()
+    held[1].release()
+    assert limiter.peak_in_flight == 2
+
+
+@pytest.mark.asyncio
+async def test_retry_after_pauses_admissions():
+    limiter = AdaptiveLimiter(4)
+    permit = await limiter.acquire()
+    permit.release(overloaded=True, retry_after=0.1)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    (await limiter.acquire()).release()
+    assert loop.time() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_rejects_beyond_max_queue():
+    limiter = AdaptiveLimiter(1, max_limit=1, max_queue=1)
+    held = await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        await limiter.acquire()
+    assert limiter.rejections == 1
+    held.release()
+    (await waiter).release()
+
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_oldest_waiter():
+    limiter = AdaptiveLimiter(1, max_limit=1)
+    held = await limiter.acquire()
+    first = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+
+    # A newcomer arriving right after the release must not take the slot
+    held.release()
+    newcomer = asyncio.ensure_future(limiter.acquire())
+    permit = await asyncio.wait_for(first, 1.0)
+    await asyncio.sleep(0.01)
+    assert not newcomer.done()
+    assert limiter.in_flight == 1
+
+    permit.release()
+    (await asyncio.wait_for(newcomer, 1.0)).release()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_passes_its_slot_on():
+    limiter = AdaptiveLimiter(1, max_limit=1)
+    held = await limiter.acquire()
+    first = asyncio.ensure_future(limiter.acquire())
+    second = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0.01)
+
+    # The slot is reserved for `first`, which is cancelled before it runs
+    held.release()
+    first.cancel()
+    (await asyncio.wait_for(second, 1.0)).release()
+    assert limiter.in_flight == 0
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.kite_exclusive.commit_splitter.services.embedding_service import EmbeddingService, TokenBucket
+
+
+class _Provider:
+    """Fake embed_fn: one vector per text, recording each batch it was sent."""
+
+    def __init__(self, failures=()):
+        self.batches = []
+        self.failures = list(failures)
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            if self.failures:
+                raise self.failures.pop(0)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+class _RateLimited(Exception):
+    http_status = 429
+
+
+@pytest.mark.asyncio
+async def test_bucket_allows_burst_of_a_tenth_per_minute():
+    bucket = TokenBucket(600)
+    waits = [await bucket.acquire() for _ in range(60)]
+    assert max(waits) < 0.05
+
+
+@pytest.mark.asyncio
+async def test_bucket_waits_for_refill():
+    bucket = TokenBucket(600)  # 10 per second, 60 at most
+    await bucket.acquire(60)
+    waited = await bucket.acquire(2)
+    assert waited == pytest.approx(0.2, abs=0.08)
+
+
+@pytest.mark.asyncio
+async def test_bucket_lets_oversize_request_through_and_goes_negative():
+    bucket = TokenBucket(600)
+    assert await bucket.acquire(61) < 0.05
+    # One token in debt, so the next one takes two tokens' refill
+    waited = await bucket.acquire(1)
+    assert waited == pytest.approx(0.2, abs=0.08)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_batches():
+    provider = _Provider()
+    service = EmbeddingService(provider, rpm=None, tpm=None, window=0.05)
+    results = await asyncio.gather(*(service.embed([f"text {i}", "x" * i]) for i in range(10)))
+
+    assert [r[1][0] for r in results] == [float(i) for i in range(10)]
+    assert len(provider.batches) == 1
+    assert service.stats()["requests"] == 10
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_max_texts():
+    provider = _Provider()
+    service = EmbeddingService(provider, rpm=None, tpm=None, window=0.05, max_texts=4)
+    vectors = await service.embed([f"t{i}" for i in range(10)])
+
+    assert len(vectors) == 10
+    assert all(len(batch) <= 4 for batch in provider.batches)
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    provider = _Provider(failures=[_RateLimited(), ConnectionError()])
+    service = EmbeddingService(provider, rpm=None, tpm=None, base_delay=0.01)
+
+    assert await service.embed(["a"]) == [[1.0, 1.0]]
+    assert service.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_other_errors_fail_only_their_batch():
+    provider = _Provider(failures=[ValueError("bad input")])
+    service = EmbeddingService(provider, rpm=None, tpm=None, base_delay=0.01)
+
+    with pytest.raises(ValueError):
+        await service.embed(["a"])
+    assert await service.embed(["b"]) == [[1.0, 1.0]]
+    assert service.retries == 0
+    assert service.failures == 1
+
+
+@pytest.mark.asyncio
+async def test_rpm_bucket_throttles_provider_calls():
+    provider = _Provider()
+    # A burst of 12 calls, then 2 per second
+    service = EmbeddingService(provider, rpm=120, tpm=None, window=0.0, max_texts=1, concurrency=8)
+    await service.embed([f"t{i}" for i in range(14)])
+
+    assert len(provider.batches) == 14
+    assert service.stats()["throttled_s"] > 0.5
+
+
+@pytest.mark.asyncio
+async def test_embed_codes_reuses_cached_vectors():
+    provider = _Provider()
+    service = EmbeddingService(provider, rpm=None, tpm=None)
+    items = [("+def f():\n+    return 1\n", "a.py"), ("+x = 2\n", "b.txt")]
+
+    first = await service.embed_codes(items)
+    sent = len(provider.batches)
+    assert sent > 0
+    # The cache stores float32
+    cached = await service.embed_codes(items)
+    assert [pytest.approx(vec, rel=1e-6) for vec in first] == cached
+    assert len(provider.batches) == sent
@@ -0,0 +1,97 @@
+import subprocess
+from itertools import permutations
+
+import pytest
+
+from src.kite_exclusive.commit_splitter.git_diff import FileDiff, ancestor_commits, parse_unified_diff
+
+
+def _git(repo, *args, input=None) -> str:
+    result = subprocess.run(
+        ["git", *args], cwd=repo, input=input, capture_output=True, text=True, check=True
+    )
+    return result.stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A repository whose module.py has a replacement, an insertion and a deletion unstaged."""
+    _git(tmp_path, "init", "-q")
+    _git(tmp_path, "config", "user.email", "test@example.com")
+    _git(tmp_path, "config", "user.name", "test")
+    original = [f"line {i}" for i in range(1, 61)]
+    (tmp_path / "module.py").write_text("\n".join(original) + "\n")
+    _git(tmp_path, "add", "module.py")
+    _git(tmp_path, "commit", "-qm", "init")
+
+    changed = list(original)
+    changed[2] = "line 3 changed"
+    changed[30:30] = ["inserted a", "inserted b"]
+    del changed[55]
+    (tmp_path / "module.py").write_text("\n".join(changed) + "\n")
+    return tmp_path
+
+
+def _file_diff(repo) -> FileDiff:
+    (diff,) = parse_unified_diff(_git(repo, "diff", "--no-color", "--", "module.py"))
+    return diff
+
+
+def test_parses_hunks(repo):
+    diff = _file_diff(repo)
+    assert diff.status == "modified"
+    assert diff.splittable
+    assert [(h.additions, h.deletions) for h in diff.hunks] == [(1, 1), (2, 0), (0, 1)]
+
+
+@pytest.mark.parametrize("order", list(permutations(range(3))))
+def test_hunks_apply_one_at_a_time_in_any_order(repo, order):
+    diff = _file_diff(repo)
+    applied = []
+    for index in order:
+        patch = diff.partial_patch([index], applied)
+        # git apply tolerates offsets, so check the rebased pre-image range
+        # against git's own diff of the index at this point
+        (rendered,) = parse_unified_diff(patch)
+        pending = {tuple(h.lines): h for h in _file_diff(repo).hunks}
+        expected = pending[tuple(diff.hunks[index].lines)]
+        assert (rendered.hunks[0].old_start, rendered.hunks[0].old_lines) == (
+            expected.old_start,
+            expected.old_lines,
+        )
+        _git(repo, "apply", "--cached", "-", input=patch)
+        applied.append(index)
+    assert _git(repo, "diff", "--", "module.py") == ""
+
+
+@pytest.mark.parametrize("indices", [[0, 2], [1], [1, 2]])
+def test_partial_patch_stages_only_selected_hunks(repo, indices):
+    diff = _file_diff(repo)
+    _git(repo, "apply", "--cached", "-", input=diff.partial_patch(indices))
+    (staged,) = parse_unified_diff(_git(repo, "diff", "--cached", "--", "module.py"), staged=True)
+    assert [h.lines for h in staged.hunks] == [diff.hunks[i].lines for i in indices]
+
+    rest = [i for i in range(len(diff.hunks)) if i not in indices]
+    _git(repo, "apply", "--cached", "-", input=diff.partial_patch(rest, indices))
+    assert _git(repo, "diff", "--", "module.py") == ""
+
+
+@pytest.mark.asyncio
+async def test_ancestor_commits(tmp_path):
+    for args in (("init", "-q"), ("config", "user.email", "t@example.com"), ("config", "user.name", "t")):
+        _git(tmp_path, *args)
+
+    def commit(name: str) -> str:
+        (tmp_path / name).write_text(f"{name}\n")
+        _git(tmp_path, "add", name)
+        _git(tmp_path, "commit", "-qm", name)
+        return _git(tmp_path, "rev-parse", "HEAD").strip()
+
+    main = [commit("a"), commit("b"), commit("c")]
+    _git(tmp_path, "checkout", "-qb", "side", main[1])
+    side = commit("d")
+
+    candidates = [*main, side, "0" * 40, ""]
+    assert await ancestor_commits(str(tmp_path), candidates, "side") == {main[0], main[1], side}
+    assert await ancestor_commits(str(tmp_path), candidates, main[2]) == set(main)
+    assert await ancestor_commits(str(tmp_path), []) == set()
@@ -0,0 +1,24 @@
+import numpy as np
+
+from src.kite_exclusive.commit_splitter.grouping import group_files, path_proximity_matrix
+
+
+def test_path_proximity_counts_shared_directories():
+    prox = path_proximity_matrix(["src/a/x.py", "src/a/y.py", "src/b/z.py", "README.md"])
+    assert prox[0, 1] == 1.0
+    assert prox[0, 2] == 0.5
+    assert prox[0, 3] == 0.0
+
+
+def test_hunks_of_one_file_are_grouped_by_their_file_path():
+    units = ["src/app/views.py (hunk 1/2)", "src/app/views.py (hunk 2/2)", "docs/guide.md"]
+    files = ["src/app/views.py", "src/app/views.py", "docs/guide.md"]
+    # Unrelated embeddings, so only path proximity can pull units together
+    vectors = np.eye(3).tolist()
+
+    groups = group_files(units, vectors, threshold=0.5, path_weight=0.6, file_paths=files)
+    assert groups == [units[:2], units[2:]]
+
+    # The "/" in "(hunk i/n)" must not be read as a directory
+    assert path_proximity_matrix(files)[0, 1] == 1.0
+    assert path_proximity_matrix(units)[0, 1] < 1.0
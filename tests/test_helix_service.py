@@ -0,0 +1,41 @@
+import pytest
+
+from src.kite_exclusive.commit_splitter.services.helix_service import search_similar_diff
+
+ROW = {"diff_id": "c1:a.py", "commit_id": "c1", "commit_message": "feat: a", "file_path": "a.py"}
+
+
+class _Client:
+    """Answers each query with the rows configured for it; None when it has none."""
+
+    def __init__(self, **rows):
+        self.rows = rows
+        self.queries = []
+
+    def query(self, query, payload=None):
+        self.queries.append(query)
+        rows = self.rows.get(query)
+        return [None if rows is None else {"results": rows}]
+
+
+def test_unscoped_search_uses_lean_query():
+    db = _Client(getSimilarDiffsLean=[ROW], getSimilarDiffsByVector=[ROW])
+    assert search_similar_diff(db, [0.1, 0.2], k=3) == [ROW]
+    assert db.queries == ["getSimilarDiffsLean"]
+
+
+@pytest.mark.parametrize(
+    "lean",
+    [None, [{"diff_id": "c1:a.py", "commit_id": "", "commit_message": "", "file_path": ""}]],
+    ids=["not-deployed", "no-denormalized-fields"],
+)
+def test_unscoped_search_falls_back_to_traversal(lean):
+    db = _Client(getSimilarDiffsLean=lean, getSimilarDiffsByVector=[ROW])
+    assert search_similar_diff(db, [0.1, 0.2], k=3) == [ROW]
+    assert db.queries == ["getSimilarDiffsLean", "getSimilarDiffsByVector"]
+
+
+def test_repo_scoped_search_falls_back_to_lean():
+    db = _Client(getSimilarDiffsLean=[ROW])
+    assert search_similar_diff(db, [0.1, 0.2], k=3, repo_id="repo") == [ROW]
+    assert db.queries == ["getSimilarDiffsInRepo", "getSimilarDiffsLean"]
@@ -0,0 +1,107 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import helix
+import pytest
+
+from src.kite_exclusive.commit_splitter.ingest import IngestStats, _Loader
+from src.kite_exclusive.commit_splitter.services.helix_service import insert_batch, iter_row_batches
+
+ROWS = [{"commit_id": f"c{i}", "message": "x" * 10} for i in range(5)]
+
+
+class _HelixStub(BaseHTTPRequestHandler):
+    """Answers every query with 200 except *Batch queries, which get `batch_status`."""
+
+    batch_status = 200
+    requests: list = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query = self.path.strip("/")
+        self.requests.append((query, body, self.headers.get("x-api-key")))
+        status = self.batch_status if query.endswith("Batch") else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+
+@pytest.fixture
+def helix_stub():
+    handler = type("Handler", (_HelixStub,), {"requests": []})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = helix.Client(
+        local=False, api_endpoint=f"http://127.0.0.1:{server.server_port}", api_key="key", verbose=False
+    )
+    yield handler, client
+    server.shutdown()
+    server.server_close()
+
+
+def test_row_batches_respect_row_and_byte_limits():
+    assert [len(b) for b in iter_row_batches(ROWS, max_rows=2)] == [2, 2, 1]
+    size = len(json.dumps(ROWS[0]))
+    assert [len(b) for b in iter_row_batches(ROWS, max_bytes=2 * size + 4)] == [2, 2, 1]
+    # A row larger than the byte limit still goes out, alone
+    assert [len(b) for b in iter_row_batches(ROWS[:2], max_bytes=1)] == [1, 1]
+
+
+def test_insert_batch_reports_http_status(helix_stub):
+    handler, client = helix_stub
+    handler.batch_status = 404
+    assert insert_batch(client, "createCommitsBatch", "commits", ROWS) == 404
+    ((query, body, key),) = handler.requests
+    assert (query, body, key) == ("createCommitsBatch", {"commits": ROWS}, "key")
+
+    unreachable = helix.Client(local=False, api_endpoint="http://127.0.0.1:1", verbose=False)
+    assert insert_batch(unreachable, "createCommitsBatch", "commits", ROWS) == 0
+
+
+@pytest.mark.asyncio
+async def test_loader_sends_one_request_per_batch(helix_stub):
+    handler, client = helix_stub
+    stats = IngestStats()
+    await _Loader(client, 4, stats).run("createCommit", ROWS)
+
+    assert [q for q, _, _ in handler.requests] == ["createCommitsBatch"]
+    assert stats.failed_rows == 0
+
+
+@pytest.mark.asyncio
+async def test_loader_falls_back_to_single_rows_on_404(helix_stub):
+    handler, client = helix_stub
+    handler.batch_status = 404
+    stats = IngestStats()
+    loader = _Loader(client, 4, stats)
+
+    await loader.run("createCommit", ROWS)
+    await loader.run("createCommit", ROWS)
+
+    queries = [q for q, _, _ in handler.requests]
+    # The batched query is tried once; every row then goes out on its own
+    assert queries.count("createCommitsBatch") == 1
+    assert queries.count("createCommit") == 2 * len(ROWS)
+    assert sorted(b["commit_id"] for q, b, _ in handler.requests if q == "createCommit") == sorted(
+        2 * [r["commit_id"] for r in ROWS]
+    )
+    assert stats.failed_rows == 0
+
+
+@pytest.mark.asyncio
+async def test_loader_does_not_retry_rejected_batches(helix_stub):
+    handler, client = helix_stub
+    handler.batch_status = 500
+    stats = IngestStats()
+    await _Loader(client, 4, stats).run("createCommit", ROWS)
+
+    # Part of the batch may have been applied, so its rows are not resent
+    assert [q for q, _, _ in handler.requests] == ["createCommitsBatch"]
+    assert stats.failed_rows == len(ROWS)
@@ -0,0 +1,187 @@
+import subprocess
+
+import pytest
+
+import asyncio
+from collections import Counter
+
+from src.kite_exclusive.commit_splitter.ingest import branch_identity, ingest_history, ingest_incremental
+from src.kite_exclusive.commit_splitter.services.ingest_state import IngestState
+from src.kite_exclusive.commit_splitter.services.local_index import LocalVectorIndex
+
+
+@pytest.fixture
+def state(tmp_path):
+    state = IngestState(str(tmp_path / "state" / "ingest.sqlite3"))
+    yield state
+    state.close()
+
+
+def test_checkpoint_replaces_tips(state):
+    state.checkpoint("repo", "repo:main", ["b", "a", "a"], commits=3)
+    assert state.tips("repo:main") == ["a", "b"]
+    state.checkpoint("repo", "repo:main", ["c"], commits=2)
+    assert state.tips("repo:main") == ["c"]
+    assert state.has_branch("repo:main")
+    assert not state.has_branch("repo:dev")
+
+
+def test_repo_tips_span_branches(state):
+    state.checkpoint("repo", "repo:main", ["a"], commits=1)
+    state.checkpoint("repo", "repo:dev", ["a", "b"], commits=2)
+    state.checkpoint("other", "other:main", ["z"], commits=1)
+    assert state.repo_tips("repo") == ["a", "b"]
+
+
+def test_reset_forgets_branch(state):
+    state.checkpoint("repo", "repo:main", ["a"], commits=1)
+    state.checkpoint("repo", "repo:dev", ["b"], commits=1)
+    state.reset("repo:main")
+    assert state.tips("repo:main") == []
+    assert not state.has_branch("repo:main")
+    assert state.tips("repo:dev") == ["b"]
+
+
+def test_checkpoints_survive_reopen(state):
+    state.checkpoint("repo", "repo:main", ["a"], commits=1)
+    reopened = IngestState(state.path)
+    try:
+        assert reopened.tips("repo:main") == ["a"]
+    finally:
+        reopened.close()
+
+
+def test_exclusive_is_per_branch(state):
+    other = IngestState(state.path)
+    try:
+        with state.exclusive("repo:main") as first:
+            with other.exclusive("repo:main") as second, other.exclusive("repo:dev") as third:
+                assert (first, second, third) == (True, False, True)
+        with other.exclusive("repo:main") as again:
+            assert again
+    finally:
+        other.close()
+
+
+def _git(repo, *args) -> str:
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def _commit(repo, n: int, start: int = 0) -> None:
+    for i in range(start, start + n):
+        with open(repo / f"f{i % 3}.py", "a") as f:
+            f.write(f"x{i} = {i}\n")
+        _git(repo, "add", "-A")
+        _git(repo, "commit", "-qm", f"change {i}")
+
+
+class _FailingDiffs:
+    """Wraps a client so that every diff insert fails while `down` is set."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.down = False
+
+    def query(self, query, payload=None):
+        if self.down and query.startswith("createDiff"):
+            return [None]
+        return self.inner.query(query, payload)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    monkeypatch.setenv("GLIDE_EMBED_BACKEND", "local")
+    root = tmp_path / "repo"
+    root.mkdir()
+    _git(root, "init", "-q")
+    _git(root, "config", "user.email", "test@example.com")
+    _git(root, "config", "user.name", "test")
+    _commit(root, 6)
+    return root
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = LocalVectorIndex(str(tmp_path / "index"))
+    yield index
+    index.close()
+
+
+@pytest.mark.asyncio
+async def test_incremental_runs_resume_from_watermark(repo, state, index):
+    branch_id = branch_identity(str(repo))[2]
+
+    stats = await ingest_incremental(str(repo), db=index, state=state, batch_size=4)
+    assert stats.commits == 6
+    assert state.tips(branch_id) == [_git(repo, "rev-parse", "HEAD")]
+
+    _commit(repo, 3, start=6)
+    stats = await ingest_incremental(str(repo), db=index, state=state, batch_size=4)
+    assert stats.commits == 3
+    assert state.tips(branch_id) == [_git(repo, "rev-parse", "HEAD")]
+    assert index.stats()["vectors"] == 9
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_not_checkpointed(repo, state, index):
+    branch_id = branch_identity(str(repo))[2]
+    db = _FailingDiffs(index)
+
+    db.down = True
+    with pytest.raises(RuntimeError, match="failed to load"):
+        await ingest_incremental(str(repo), db=db, state=state, batch_size=4)
+    assert state.tips(branch_id) == []
+
+    # The commit nodes from the failed batch exist; the retry fills in their diffs
+    db.down = False
+    stats = await ingest_incremental(str(repo), db=db, state=state, batch_size=4)
+    assert stats.failed_rows == 0
+    assert state.tips(branch_id) == [_git(repo, "rev-parse", "HEAD")]
+    assert index.stats()["vectors"] == 6
+
+
+class _Counting:
+    """Wraps a client and counts the queries sent through it."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.counts = Counter()
+
+    def query(self, query, payload=None):
+        self.counts[query] += 1
+        return self.inner.query(query, payload)
+
+
+@pytest.mark.asyncio
+async def test_skip_existing_fetches_commit_ids_once(repo, index):
+    await ingest_history(str(repo), db=index, batch_size=4)
+
+    db = _Counting(index)
+    stats = await ingest_history(str(repo), db=db, batch_size=4)
+    assert (stats.commits, stats.skipped) == (0, 6)
+    assert db.counts["getCommitIdsForRepo"] == 1
+    assert db.counts["getCommit"] == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_load_stops_git_log(repo, index, monkeypatch):
+    processes = []
+    popen = subprocess.Popen
+
+    def tracked(*args, **kwargs):
+        process = popen(*args, **kwargs)
+        processes.append(process)
+        return process
+
+    monkeypatch.setattr(subprocess, "Popen", tracked)
+
+    async def fail(stats, total):
+        raise RuntimeError("stop")
+
+    # One commit per batch, so the producer is blocked on the full queue
+    # with the rest of the history still unread when loading fails
+    with pytest.raises(RuntimeError, match="stop"):
+        await asyncio.wait_for(
+            ingest_history(str(repo), db=index, batch_size=1, on_batch=fail), timeout=30
+        )
+    assert processes and all(p.returncode is not None for p in processes)
@@ -0,0 +1,67 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.kite_exclusive.commit_splitter.services.local_index import LocalVectorIndex
+
+
+def _diffs(vectors, repo_id="repo"):
+    return [
+        {
+            "repo_id": repo_id,
+            "commit_id": f"c{i}",
+            "commit_message": f"change {i}",
+            "file_id": f"{repo_id}:f{i}.py",
+            "file_path": f"f{i}.py",
+            "diff_id": f"{repo_id}:d{i}",
+            "kind": "modified",
+            "additions": 1,
+            "deletions": 0,
+            "summary": "",
+            "vec": vec.tolist(),
+        }
+        for i, vec in enumerate(vectors)
+    ]
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((8, 32))
+    return (centers[rng.integers(0, 8, 600)] + 0.5 * rng.standard_normal((600, 32))).astype(np.float32)
+
+
+def _search(index, queries, k=5):
+    return [[row["diff_id"] for row in rows] for rows in index.search(queries, k)]
+
+
+@pytest.mark.parametrize("ivf_threshold", [10**9, 100])
+def test_int8_storage_keeps_rankings(tmp_path, vectors, ivf_threshold):
+    exact = LocalVectorIndex(str(tmp_path / "f32"), dtype="f32", ivf_threshold=10**9)
+    quantized = LocalVectorIndex(str(tmp_path / "int8"), dtype="int8", ivf_threshold=ivf_threshold)
+    rows = _diffs(vectors)
+    for index in (exact, quantized):
+        index.add_diffs(rows[:300])
+        index.add_diffs(rows[300:])
+
+    queries = vectors[:40] + 0.05
+    assert quantized.stats()["dtype"] == "int8"
+    # Codes plus a float32 scale per vector: a quarter of float32, plus 4 bytes
+    assert os.path.getsize(tmp_path / "int8" / "vectors.i8") == 600 * (32 + 4)
+    recall = np.mean(
+        [len(set(a) & set(b)) / 5 for a, b in zip(_search(exact, queries), _search(quantized, queries))]
+    )
+    assert recall >= 0.9
+
+
+def test_format_is_fixed_when_index_is_created(tmp_path, vectors):
+    path = str(tmp_path / "index")
+    index = LocalVectorIndex(path, dtype="int8")
+    index.add_diffs(_diffs(vectors[:10]))
+    index.close()
+
+    reopened = LocalVectorIndex(path, dtype="f32")
+    assert reopened.dtype == "int8"
+    assert _search(reopened, vectors[:1], 1) == [["repo:d0"]]
+    reopened.close()
@@ -0,0 +1,89 @@
+import time
+import asyncio
+
+import pytest
+
+from src.core.LLM.router import LLMRouter, parse_provider, CerebrasProvider, OllamaProvider
+
+
+@pytest.mark.asyncio
+async def test_falls_back_when_primary_fails(chat_stub):
+    broken = await chat_stub("unused", status=500)
+    healthy = await chat_stub("fix(io): handle short reads")
+    router = LLMRouter([broken.provider(), healthy.provider()], hedge=False)
+
+    assert await router.complete("diff", cache=False) == "fix(io): handle short reads"
+    stats = router.stats()["providers"]
+    assert stats[broken.provider().name]["errors"] == 1
+    assert stats[healthy.provider().name]["wins"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_provider_is_tried_last(chat_stub):
+    broken = await chat_stub("unused", status=500)
+    healthy = await chat_stub("ok")
+    router = LLMRouter([broken.provider(), healthy.provider()], hedge=False)
+
+    await router.complete("first", cache=False)
+    await router.complete("second", cache=False)
+    assert broken.requests == 1
+    assert healthy.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_raises_when_all_providers_fail(chat_stub):
+    first = await chat_stub("unused", status=500)
+    second = await chat_stub("unused", status=503)
+    router = LLMRouter([first.provider(), second.provider()], hedge=False)
+
+    with pytest.raises(RuntimeError, match="All LLM providers failed"):
+        await router.complete("diff", cache=False)
+
+
+@pytest.mark.asyncio
+async def test_hedges_slow_primary(chat_stub):
+    slow = await chat_stub("slow", delay_s=0.5)
+    fast = await chat_stub("fast")
+    router = LLMRouter([slow.provider(), fast.provider()], initial_hedge_s=0.05)
+
+    start = time.monotonic()
+    assert await router.complete("diff", cache=False) == "fast"
+    assert time.monotonic() - start < 0.4
+    assert router.hedged == 1
+    assert router.hedge_wins == 1
+
+    # The cancelled primary still leaves a (lower-bound) latency sample
+    await asyncio.sleep(0.05)
+    assert router.stats()["providers"][slow.provider().name]["p50_s"] >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_when_primary_answers_in_time(chat_stub):
+    primary = await chat_stub("primary")
+    backup = await chat_stub("backup")
+    router = LLMRouter([primary.provider(), backup.provider()], initial_hedge_s=1.0)
+
+    assert await router.complete("diff", cache=False) == "primary"
+    assert router.hedged == 0
+    assert backup.requests == 0
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_known_latency(chat_stub):
+    slow = await chat_stub("slow", delay_s=0.2)
+    backup = await chat_stub("backup")
+    router = LLMRouter([slow.provider(), backup.provider()])
+
+    assert await router.complete("diff", cache=False) == "slow"
+    assert router.hedged == 0
+
+
+def test_parse_provider():
+    assert isinstance(parse_provider("cerebras"), CerebrasProvider)
+    ollama = parse_provider("ollama:qwen3:4b@http://gpu-box:11434")
+    assert isinstance(ollama, OllamaProvider)
+    assert ollama.model == "qwen3:4b"
+    with pytest.raises(RuntimeError):
+        parse_provider("openai:gpt-4o-mini")
+    with pytest.raises(RuntimeError):
+        parse_provider("bogus:model")
@@ -0,0 +1,81 @@
+import json
+import subprocess
+
+import pytest
+import pytest_asyncio
+
+import src.mcp.app as app
+from src.core.LLM.router import LLMRouter
+from src.kite_exclusive.commit_splitter.services.local_index import LocalVectorIndex
+
+split_commit = getattr(app.split_commit, "fn", app.split_commit)
+
+
+def _git(repo, *args) -> str:
+    return subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True, check=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A repository with two far-apart hunks in src/module.py and one in docs/guide.md."""
+    monkeypatch.setenv("GLIDE_EMBED_BACKEND", "local")
+    root = tmp_path / "repo"
+    (root / "src").mkdir(parents=True)
+    (root / "docs").mkdir()
+    _git(root, "init", "-q")
+    _git(root, "config", "user.email", "test@example.com")
+    _git(root, "config", "user.name", "test")
+    module = [f"value_{i} = {i}" for i in range(60)]
+    guide = [f"Step {i}." for i in range(10)]
+    (root / "src" / "module.py").write_text("\n".join(module) + "\n")
+    (root / "docs" / "guide.md").write_text("\n".join(guide) + "\n")
+    _git(root, "add", "-A")
+    _git(root, "commit", "-qm", "init")
+
+    module[2] = "value_2 = compute_default()"
+    module[50] = "value_50 = None  # unset until configured"
+    guide[5] = "Step 5, now with a note on configuration."
+    (root / "src" / "module.py").write_text("\n".join(module) + "\n")
+    (root / "docs" / "guide.md").write_text("\n".join(guide) + "\n")
+    return root
+
+
+@pytest_asyncio.fixture
+async def llm(chat_stub, monkeypatch):
+    stub = await chat_stub("feat(core): adjust module defaults")
+    router = LLMRouter([stub.provider()], hedge=False)
+    monkeypatch.setattr(app, "commit_llm_router", lambda: router)
+    return stub
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("atomic", [True, False], ids=["plumbing", "porcelain"])
+async def test_split_hunks_commits_each_hunk_separately(repo, llm, tmp_path, monkeypatch, atomic):
+    index = LocalVectorIndex(str(tmp_path / "index"))
+    monkeypatch.setattr(app, "get_helix_client", lambda: index)
+    try:
+        # A threshold no pair can reach keeps every hunk in its own commit
+        raw = await split_commit(
+            workspace_root=str(repo), split_hunks=True, similarity_threshold=1.01, atomic=atomic
+        )
+    finally:
+        index.close()
+    report = json.loads(raw)
+
+    assert "commit_error" not in report and "failed" not in report
+    assert len(report["commits"]) == 3
+    commits = _git(repo, "rev-list", "--reverse", "HEAD~3..HEAD").split()
+    hunks = []
+    for commit in commits:
+        (path,) = _git(repo, "show", "--name-only", "--format=", commit).split()
+        patch = _git(repo, "show", "--format=", "-U0", commit)
+        assert patch.count("\n@@ ") == 1
+        (added,) = [l for l in patch.splitlines() if l.startswith("+") and not l.startswith("+++")]
+        hunks.append((path, added))
+    assert hunks == [
+        ("docs/guide.md", "+Step 5, now with a note on configuration."),
+        ("src/module.py", "+value_2 = compute_default()"),
+        ("src/module.py", "+value_50 = None  # unset until configured"),
+    ]
+    # Everything landed; nothing is left staged or modified
+    assert _git(repo, "status", "--porcelain") == ""